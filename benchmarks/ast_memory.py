@@ -0,0 +1,42 @@
+"""
+AST memory and generic-visitor throughput on a large flattened program.
+
+Measures the memory held by a freshly parsed Program (tracemalloc) and
+the time ExpressionSimplifier and ControlFlowSimplifier take over it.
+To compare node layouts, run it in checkouts before and after a change:
+
+    python -m benchmarks.ast_memory [copies]
+"""
+import contextlib
+import gc
+import io
+import sys
+import tracemalloc
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator import fast_parser
+from deobfuscator.techniques.control_flow_simplifier import ControlFlowSimplifier
+from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier
+
+
+def main(copies=300):
+    source = large_source(copies)
+    print(f"{source.count(chr(10))} lines")
+
+    gc.collect()
+    tracemalloc.start()
+    prog = fast_parser.parse(source)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del prog
+    print(f"AST memory: {held / 1e6:.1f} MB")
+
+    for name, run in (("ExpressionSimplifier", lambda p: ExpressionSimplifier().simplify(p)),
+                      ("ControlFlowSimplifier", lambda p: ControlFlowSimplifier().visit(p))):
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = best_of(3, run, lambda: fast_parser.parse(source))
+        print(f"{name}: {seconds * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
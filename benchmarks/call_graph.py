@@ -0,0 +1,63 @@
+"""
+SemanticNameRecoverer.recover() renaming call sites by walking every
+statement of every function, as it did before the call graph, against
+renaming them through a CallGraph: one built from scratch (a direct
+recover() call) and the one PassManager has kept (the rename pass).
+
+The program is the large generated one after dead, expr, control and
+inline, as the rename pass sees it.
+
+    python -m benchmarks.call_graph [copies]
+"""
+import sys
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator import fast_parser, serialization
+from deobfuscator.call_graph import CallGraph
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.pass_manager import default_pass_manager
+from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+
+
+class WalkingRecoverer(SemanticNameRecoverer):
+
+    def _update_all_func_calls(self, prog, func_name_map):
+        for f in prog.functions:
+            self._update_func_calls(f, func_name_map)
+
+
+def walk(prog):
+    WalkingRecoverer().recover(prog, call_graph=CallGraph())
+
+
+def rebuilt(prog):
+    SemanticNameRecoverer().recover(prog)
+
+
+def kept(prog):
+    SemanticNameRecoverer().recover(prog, call_graph=prog.call_graph)
+
+
+def main(copies=300):
+    source = large_source(copies)
+    prog = fast_parser.parse(source)
+    default_pass_manager().run(prog, ["dead", "expr", "control", "inline"])
+    data = serialization.dumps(prog)
+    print(f"{source.count(chr(10))} lines, {len(CallGraph(prog.functions))} call sites")
+
+    def setup():
+        prog = serialization.loads(data)
+        CallGraph.of(prog)
+        return prog
+
+    code = set()
+    for name, run in (("walk", walk), ("rebuilt", rebuilt), ("kept", kept)):
+        prog = setup()
+        run(prog)
+        code.add(CodeGenerator().generate(prog))
+        print(f"{name:8} {best_of(7, run, setup) * 1000:6.1f} ms")
+    assert len(code) == 1
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""Large Mini-C inputs for the benchmarks, built from the input/*.mc corpus."""
+import glob
+import os
+import re
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNC_RE = re.compile(r"^\w+ (\w+)\(", re.M)
+
+
+def corpus():
+    """Sources of input/*.mc, in name order."""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "input", "*.mc"))):
+        with open(path) as f:
+            sources.append(f.read())
+    return sources
+
+
+def large_source(copies):
+    """
+    `copies` renamed copies of every corpus file in one program, with a
+    single main(): function names get a per-copy suffix so they stay
+    distinct, and the flattened bodies are kept as they are.
+    """
+    sources = corpus()
+    parts = []
+    for i in range(copies):
+        for j, source in enumerate(sources):
+            for name in set(FUNC_RE.findall(source)):
+                source = re.sub(rf"\b{name}\b", f"{name}_{i}_{j}", source)
+            parts.append(source)
+    parts.append(sources[0])
+    return "\n".join(parts)
+
+
+def best_of(repeat, run, setup=lambda: None):
+    """Fastest of `repeat` timed calls of run(setup())."""
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
@@ -0,0 +1,68 @@
+"""
+PassManager.run_fixpoint() against one run of the passes and against a
+naive loop that re-runs dead, expr and inline on every function until
+none of them changes anything.  control runs once in all three (it must
+not see a function twice) and rename once at the end.
+
+  - the large generated program, which one run already settles
+  - n functions in which folding exposes more work, for each n given
+  - the large program with 100 of those added: only they need re-runs
+
+    python -m benchmarks.fixpoint [n ...]
+"""
+import sys
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator import fast_parser, serialization
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.pass_manager import PASS_NAMES, default_pass_manager
+
+
+def unsettled(n, prefix="f"):
+    funcs = [f"int {prefix}{i}(int a) {{ int r = a; if (a * 0) {{ r = {i}; }} return r - (-0); }}"
+             for i in range(n)]
+    return "\n".join(funcs) + f"\nint main() {{ return {prefix}0(1); }}"
+
+
+def once(prog):
+    default_pass_manager().run(prog, PASS_NAMES)
+
+
+def fixpoint(prog):
+    default_pass_manager().run_fixpoint(prog, PASS_NAMES)
+
+
+def naive(prog):
+    pm = default_pass_manager()
+    pm.run(prog, ["dead", "expr", "control"])
+    loop = pm.schedule(["dead", "expr", "inline"])
+    while True:
+        pm.invalidate()
+        if not any([pm.run_pass(prog, p) for p in loop]):
+            break
+    pm.invalidate()
+    pm.run(prog, ["rename"])
+
+
+def compare(label, source, repeat):
+    data = serialization.dumps(fast_parser.parse(source))
+    row, code = [], []
+    for run in (once, fixpoint, naive):
+        prog = serialization.loads(data)
+        run(prog)
+        code.append(CodeGenerator().generate(prog))
+        row.append(f"{best_of(repeat, run, lambda: serialization.loads(data)):8.3f}s")
+    assert code[1] == code[2], label
+    print(f"{label:>16} {' '.join(row)}")
+
+
+def main(*sizes):
+    print(f"{'':>16} {'once':>9} {'fixpoint':>9} {'naive':>9}")
+    compare("91k-line input", large_source(300), 3)
+    for n in sizes or (1000, 4000):
+        compare(f"{n} unsettled", unsettled(n), 3)
+    compare("91k + 100", large_source(300) + "\n" + unsettled(100, "u"), 3)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
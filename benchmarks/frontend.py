@@ -0,0 +1,42 @@
+"""
+Frontend benchmark: parse the same large program with each frontend and
+check that they build the same AST.
+
+    python -m benchmarks.frontend [copies]
+"""
+import sys
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator.frontend import load_source
+
+CONFIGS = [
+    ("antlr, ll", dict(frontend="antlr", mode="ll")),
+    ("antlr, auto", dict(frontend="antlr", mode="auto")),
+    ("antlr, auto, bulk lexer", dict(frontend="antlr", mode="auto", lexer="bulk")),
+    ("fast", dict(frontend="fast")),
+]
+
+
+def shape(node):
+    if isinstance(node, list):
+        return [shape(item) for item in node]
+    fields = getattr(type(node), "_fields", None)
+    if fields is None:
+        return node
+    return (type(node).__name__,) + tuple((f, shape(getattr(node, f))) for f in fields)
+
+
+def main(copies=20):
+    source = large_source(copies)
+    print(f"{len(source) // 1024} KB, {source.count(chr(10))} lines")
+    expected = shape(load_source(source, "antlr"))
+    baseline = None
+    for name, options in CONFIGS:
+        assert shape(load_source(source, **options)) == expected, name
+        seconds = best_of(3, lambda _: load_source(source, **options))
+        baseline = baseline or seconds
+        print(f"{name:25} {seconds:.3f}s  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
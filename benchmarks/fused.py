@@ -0,0 +1,41 @@
+"""
+Fused dead code + expression walk against the two passes run one after
+the other, on the same large program.
+
+    python -m benchmarks.fused [copies]
+"""
+import sys
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator import fast_parser, serialization
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.techniques.dead_code_remover import DeadCodeRemover
+from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier
+from deobfuscator.techniques.fused_simplifier import FusedSimplifier
+
+
+def sequential(prog):
+    DeadCodeRemover().remove(prog)
+    ExpressionSimplifier().simplify(prog)
+
+
+def fused(prog):
+    FusedSimplifier().simplify(prog)
+
+
+def main(copies=300):
+    source = large_source(copies)
+    data = serialization.dumps(fast_parser.parse(source))
+    print(f"{source.count(chr(10))} lines")
+    code = {}
+    for name, run in (("sequential", sequential), ("fused", fused)):
+        prog = serialization.loads(data)
+        run(prog)
+        code[name] = CodeGenerator().generate(prog)
+        seconds = best_of(5, run, lambda: serialization.loads(data))
+        print(f"{name:10} {seconds * 1000:.0f} ms")
+    assert code["fused"] == code["sequential"]
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
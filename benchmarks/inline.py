@@ -0,0 +1,79 @@
+"""
+InlineReconstructor matching blocks through its structural index against
+trying every function in turn (indexed=False), on parsed programs of m
+two-parameter helpers and n inlined blocks in one function.  Both must
+reconstruct the same calls.
+
+  - blocks with `int result = EXPR;`, for a few (m, n)
+  - blocks with `int result;`, matched by parameter count alone
+  - n blocks and a single helper, per block, to show that keeping the
+    function's symbol table current costs the same for every block; with
+    the collector on, its passes over the growing heap add to that
+
+    python -m benchmarks.inline
+"""
+import gc
+
+from benchmarks.corpus import best_of
+from deobfuscator import fast_parser, serialization
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
+
+OPS = "+-*/"
+
+
+def inlined(helpers, blocks, initialized=True):
+    funcs = [f"int h{i}(int p, int q) {{ int r = ((p {OPS[i % 4]} q) + {i}); return r; }}"
+             for i in range(helpers)]
+    body = ["int k = 0;"]
+    for s in range(blocks):
+        i = (s * 7919) % helpers
+        init = f" = ((a_{s} {OPS[i % 4]} b_{s}) + {i})" if initialized else ""
+        body.append(f"int a_{s} = k; int b_{s} = {s}; int result_{s}{init}; k = result_{s};")
+    funcs.append("int main() { " + " ".join(body) + " return k; }")
+    return "\n".join(funcs)
+
+
+def compare(label, source, repeat=3):
+    data = serialization.dumps(fast_parser.parse(source))
+    row, code = [], set()
+    for indexed in (False, True):
+        prog = serialization.loads(data)
+        inl = InlineReconstructor(indexed)
+        inl.reconstruct(prog)
+        code.add(CodeGenerator().generate(prog))
+        seconds = best_of(repeat, lambda p: InlineReconstructor(indexed).reconstruct(p),
+                          lambda: serialization.loads(data))
+        row.append(f"{seconds:8.3f}s")
+    assert len(code) == 1, label
+    print(f"{label:>24} {row[0]} {row[1]}  {inl.rule_hits['inlined call reconstructed']} calls")
+
+
+def per_block(blocks):
+    data = serialization.dumps(fast_parser.parse(inlined(1, blocks)))
+    row = []
+    for collect in (True, False):
+        def run(prog):
+            if not collect:
+                gc.disable()
+            try:
+                InlineReconstructor().reconstruct(prog)
+            finally:
+                gc.enable()
+        seconds = best_of(3, run, lambda: serialization.loads(data))
+        row.append(f"{seconds * 1e6 / blocks:7.1f}us")
+    print(f"{f'm=1 n={blocks}':>24} {row[0]} {row[1]}")
+
+
+def main():
+    print(f"{'':>24} {'scan':>9} {'indexed':>9}")
+    for helpers, blocks in ((100, 1000), (1000, 1000), (2000, 4000)):
+        compare(f"m={helpers} n={blocks}", inlined(helpers, blocks))
+    compare("int r; m=2000 n=4000", inlined(2000, 4000, initialized=False))
+    print(f"\n{'':>24} {'gc on':>9} {'gc off':>9}  per block")
+    for blocks in (4000, 16000, 64000):
+        per_block(blocks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Peak memory of the ANTLR frontend with each AST builder: the visitor
+builds a full parse tree and walks it afterwards, the listener builds the
+AST as rules complete and keeps no parse tree.
+
+Peaks are traced with tracemalloc, so they cover Python allocations
+only; each builder's AST is checked against the visitor's.
+
+    python -m benchmarks.listener_memory [copies]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import large_source
+from deobfuscator.frontend import load_source
+
+
+def shape(node):
+    if isinstance(node, list):
+        return [shape(item) for item in node]
+    fields = getattr(type(node), "_fields", None)
+    if fields is None:
+        return node
+    return (type(node).__name__,) + tuple((f, shape(getattr(node, f))) for f in fields)
+
+
+def traced(run):
+    """run()'s result, traced peak in bytes and seconds."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, seconds
+
+
+def main(copies=300):
+    source = large_source(copies)
+    print(f"{source.count(chr(10))} lines")
+    expected = None
+    for builder in ("visitor", "listener"):
+        prog, peak, seconds = traced(lambda: load_source(source, "antlr", mode="auto",
+                                                         builder=builder))
+        prog = shape(prog)
+        expected = expected or prog
+        assert prog == expected, builder
+        del prog
+        print(f"{builder:9} peak {peak / 1e6:6.1f} MB  {seconds:6.1f}s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""
+Up-front cost of opening a source for ObfuMiniCLexer: antlr4.FileStream
+decodes the whole file into a str and a code-point list, MmapInputStream
+maps it and decodes on demand.
+
+Memory still held once the stream is open is traced with tracemalloc;
+lexing the whole file checks that both streams give the same tokens.
+
+    python -m benchmarks.mmap_stream [copies]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from antlr4 import FileStream, Token
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator.mmap_stream import MmapInputStream
+from deobfuscator.parser.ObfuMiniCLexer import ObfuMiniCLexer
+
+
+def held(open_stream):
+    """The opened stream and the bytes it holds."""
+    gc.collect()
+    tracemalloc.start()
+    stream = open_stream()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return stream, size
+
+
+def lex(stream):
+    lexer = ObfuMiniCLexer(stream)
+    count = 0
+    while lexer.nextToken().type != Token.EOF:
+        count += 1
+    return count
+
+
+def main(copies=300):
+    source = large_source(copies)
+    fd, path = tempfile.mkstemp(suffix=".mc")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(source)
+        print(f"{len(source) / 1e6:.1f} MB, {source.count(chr(10))} lines")
+        counts = set()
+        for name, cls in (("FileStream", FileStream), ("MmapInputStream", MmapInputStream)):
+            stream, size = held(lambda: cls(path))
+            seconds = best_of(3, lambda _: cls(path))
+            start = time.perf_counter()
+            counts.add(lex(stream))
+            lexing = time.perf_counter() - start
+            print(f"{name:16} open {size / 1e6:6.2f} MB {seconds * 1000:7.1f} ms"
+                  f"   lex {lexing:5.1f}s")
+            del stream
+        assert len(counts) == 1, counts
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
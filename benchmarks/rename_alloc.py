@@ -0,0 +1,52 @@
+"""
+Allocation and GC pressure of SemanticNameRecoverer.recover() on the
+large generated program, in both renaming modes: peak traced memory,
+memory still held by name_recoverer.py allocations afterwards, garbage
+collector runs, and time.
+
+    python -m benchmarks.rename_alloc [copies]
+"""
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator import fast_parser, serialization
+from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+
+
+def measure(data, composed):
+    collections = 0
+
+    def count(phase, info):
+        nonlocal collections
+        collections += phase == "start"
+
+    prog = serialization.loads(data)
+    gc.collect()
+    gc.callbacks.append(count)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    SemanticNameRecoverer(composed).recover(prog)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.callbacks.remove(count)
+    held = sum(stat.size_diff for stat in after.compare_to(before, "filename")
+               if stat.traceback[0].filename.endswith("name_recoverer.py"))
+    return peak, held, collections
+
+
+def main(copies=300):
+    data = serialization.dumps(fast_parser.parse(large_source(copies)))
+    print(f"{'':9} {'peak':>8} {'held':>8} {'gc runs':>8} {'time':>8}")
+    for composed in (False, True):
+        peak, held, collections = measure(data, composed)
+        seconds = best_of(11, lambda p: SemanticNameRecoverer(composed).recover(p),
+                          lambda: serialization.loads(data))
+        print(f"{'composed' if composed else 'pairwise':9} {peak / 1e6:6.1f}MB {held / 1e6:6.2f}MB "
+              f"{collections:8} {seconds:7.3f}s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,30 @@
+"""
+deobfuscator.serialization against pickle (highest protocol) on a large
+parsed program: encoded size, dumps and loads time.  Both are timed
+with the collector in its default state, as callers run them.
+
+    python -m benchmarks.serialization [copies]
+"""
+import pickle
+import sys
+
+from benchmarks.corpus import best_of, large_source
+from deobfuscator import fast_parser, serialization
+
+
+def main(copies=300):
+    prog = fast_parser.parse(large_source(copies))
+    data = serialization.dumps(prog)
+    assert serialization.dumps(serialization.loads(data)) == data
+    print(f"{'':8} {'size':>9} {'dumps':>9} {'loads':>9}")
+    for name, dumps, loads in (
+            ("pickle", lambda p: pickle.dumps(p, pickle.HIGHEST_PROTOCOL), pickle.loads),
+            ("mcast", serialization.dumps, serialization.loads)):
+        encoded = dumps(prog)
+        dump_s = best_of(5, lambda _: dumps(prog))
+        load_s = best_of(5, lambda _: loads(encoded))
+        print(f"{name:8} {len(encoded) / 1e6:7.2f}MB {dump_s * 1000:7.0f}ms {load_s * 1000:7.0f}ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -1,53 +1,250 @@
 import argparse
+import contextlib
+import functools
+import io
+import json
+import logging
 import os
 import subprocess
-from antlr4 import *
-from deobfuscator.parser.ObfuMiniCLexer import ObfuMiniCLexer
-from deobfuscator.parser.ObfuMiniCParser import ObfuMiniCParser
-from deobfuscator.ast_builder import ASTBuilder
-from deobfuscator.code_generator import CodeGenerator
-from deobfuscator.techniques.dead_code_remover import DeadCodeRemover
-from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier
-from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
-from deobfuscator.techniques.control_flow_simplifier import ControlFlowSimplifier 
-from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
-
-
-def run_pipeline(input_path, output_path, stages, check_runtime=False):
-    # Step 1: Parse input file
-    input_stream = FileStream(input_path)
-    lexer = ObfuMiniCLexer(input_stream)
-    stream = CommonTokenStream(lexer)
-    parser = ObfuMiniCParser(stream)
-    tree = parser.compilationUnit()
-
-    # Step 2: Build AST
-    ast = ASTBuilder().visit(tree)
-
-    # Step 3: Apply deobfuscation stages
-    if "dead" in stages:
-        DeadCodeRemover().remove(ast)
-    if "expr" in stages:
-        ExpressionSimplifier().simplify(ast)
-    if "rename" in stages:
-        SemanticNameRecoverer().recover(ast)
-    if "control" in stages:
-        ControlFlowSimplifier().visit(ast)
-    if "inline" in stages:
-        InlineReconstructor().reconstruct(ast)
-
-    # Step 4: Generate clean code
-    code = CodeGenerator().generate(ast)
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from deobfuscator.frontend import BUILDERS, FRONTENDS, LEXERS, PARSE_MODES
+from deobfuscator.ast_cache import ASTCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from deobfuscator.mmap_stream import map_file
+from deobfuscator.pass_manager import DEFAULT_MAX_ITERATIONS, PASS_NAMES
+from deobfuscator.api import run_source
+from deobfuscator.metrics import METRICS_FORMATS, Metrics, logger
+from deobfuscator import client, server
+
+LOG_LEVELS = ("debug", "info", "warning")
+LOG_FORMAT = "%(levelname)s: %(message)s"
+
+
+class _StderrHandler(logging.StreamHandler):
+    # Writes to whatever sys.stderr is at the time, so the batch and server
+    # workers can capture a file's log with redirect_stderr
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+def configure_logging(level="info"):
+    """Send the deobfuscator's log to stderr, from `level` up."""
+    if not any(isinstance(h, _StderrHandler) for h in logger.handlers):
+        handler = _StderrHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+    logger.setLevel(level.upper())
+
+
+def run_pipeline(input_path, output_path, stages, check_runtime=False,
+                 parse_mode="auto", builder="visitor", frontend="antlr",
+                 lexer="antlr", cache=None, fuse=False, fixpoint=False,
+                 max_iterations=DEFAULT_MAX_ITERATIONS, jobs=1):
+    # Step 1-4: Parse, deobfuscate and generate code, all in memory
+    with map_file(input_path) as source:
+        result = run_source(source, stages, frontend, parse_mode, builder, lexer,
+                            cache, fuse, fixpoint, max_iterations, jobs)
+    for line in stats_lines(result, max_iterations):
+        print(line)
 
     # Step 5: Save
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, "w") as f:
-        f.write(code)
+        f.write(result.code)
     print(f"[✓] Deobfuscated code saved to {output_path}")
 
     # Step 6: Runtime check
     if check_runtime:
         run_and_compare(input_path, output_path)
+    return result
+
+
+def write_metrics(metrics, fmt="table", path=None):
+    """Print `metrics` in `fmt`, or save them to `path`."""
+    text = metrics.render(fmt)
+    if path is None:
+        print(text, end="")
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    print(f"[✓] Metrics saved to {path}")
+
+
+def stats_lines(result, max_iterations=DEFAULT_MAX_ITERATIONS):
+    """The timing report printed for a run_source() Result."""
+    lines = []
+    for stage, seconds in result.timings.items():
+        line = f"[*] {stage}: {seconds:.4f}s"
+        if stage.startswith("pass/") and result.runs.get(stage[5:], 1) > 1:
+            line += f" ({result.runs[stage[5:]]} runs)"
+        elif stage.startswith("workers/"):
+            line += " wall"
+        lines.append(line)
+    if result.capped:
+        lines.append(f"[*] fixed point not reached after {max_iterations} iterations of: "
+                     f"{', '.join(result.capped)}")
+    return lines
+
+
+# Options a client may pass to the daemon; anything touching the client's
+# filesystem (output path, --check) stays on the client
+SERVER_OPTIONS = ("parse_mode", "builder", "frontend", "lexer", "fuse", "fixpoint",
+                  "max_iterations")
+
+_server_cache = None
+
+
+def _warm_worker(cache):
+    # Runs once in each daemon worker: set the shared AST cache and push a
+    # tiny program through both frontends so the parser's ATN and DFA
+    # caches are built before the first request
+    global _server_cache
+    _server_cache = cache
+    configure_logging()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        _serve_one({"source": "int main() { int a = 1 + 0; return a; }", "args": ["--all"]})
+        _serve_one({"source": "int main() { return 0; }", "options": {"frontend": "fast"}})
+
+
+def _serve_one(request):
+    source = request["source"]
+    if "args" in request:
+        parser = argparse.ArgumentParser(prog="cli.py serve", add_help=False)
+        add_pipeline_args(parser)
+        try:
+            args, unknown = parser.parse_known_args(request["args"])
+        except SystemExit:
+            raise ValueError(f"bad arguments: {' '.join(request['args'])}") from None
+        if unknown:
+            raise ValueError(f"unsupported arguments: {' '.join(unknown)}")
+        stages, options = selected_stages(args), pipeline_options(args)
+        level = args.log_level
+    else:
+        stages, options = list(request.get("stages", [])), dict(request.get("options", {}))
+        level = request.get("log_level", "info")
+    if level not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level: {level}")
+
+    out = io.StringIO()
+    options = {k: v for k, v in options.items() if k in SERVER_OPTIONS}
+    logger.setLevel(level.upper())
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+        result = run_source(source, stages, cache=_server_cache, **options)
+    log = out.getvalue() + "".join(line + "\n" for line in
+                                   stats_lines(result, options.get("max_iterations",
+                                                                   DEFAULT_MAX_ITERATIONS)))
+    return {"code": result.code, "log": log, "timings": result.timings,
+            "metrics": result.metrics.to_dict()}
+
+
+def find_inputs(in_dir):
+    """All .mc files under `in_dir`, as paths relative to it, in sorted order."""
+    found = []
+    for root, dirs, files in os.walk(in_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".mc"):
+                found.append(os.path.relpath(os.path.join(root, name), in_dir))
+    return found
+
+
+def _batch_worker(level):
+    # Runs once in each batch worker.  Under the spawn start method (the
+    # default on macOS and Windows) a worker inherits none of the parent's
+    # logging setup, so the per-file logs would be silently dropped.
+    configure_logging()
+    logger.setLevel(level)
+
+
+def _batch_file(input_path, output_path, stages, options):
+    # Runs in a pool worker: the per-file chatter is captured so status
+    # lines from concurrent files don't interleave
+    out, err = io.StringIO(), io.StringIO()
+    start = time.perf_counter()
+    result = {"input": input_path, "output": output_path}
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            run = run_pipeline(input_path, output_path, stages, **options)
+        result["timings"] = run.timings
+        result["metrics"] = run.metrics.to_dict()
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    if err.getvalue():
+        result["log"] = err.getvalue()
+    return result
+
+
+def run_batch(in_dir, out_dir, stages, jobs=1, summary_path=None, **options):
+    """
+    Deobfuscate every .mc file under `in_dir` into the same relative path
+    under `out_dir`, `jobs` files at a time.  A file that fails is recorded
+    and skipped; a JSON summary of all files, with their metrics summed
+    over the corpus, is written at the end and returned.
+    """
+    inputs = find_inputs(in_dir)
+    summary_path = summary_path or os.path.join(out_dir, "summary.json")
+    print(f"[*] {len(inputs)} files in {in_dir}")
+
+    start = time.perf_counter()
+    tasks = [(os.path.join(in_dir, rel), os.path.join(out_dir, rel), stages, options)
+             for rel in inputs]
+    results = []
+
+    def report(result):
+        results.append(result)
+        done = f"[{len(results)}/{len(tasks)}]"
+        if result["status"] == "ok":
+            print(f"[✓] {done} {result['input']} -> {result['output']} ({result['seconds']:.3f}s)")
+        else:
+            print(f"[✗] {done} {result['input']}: {result['error']}")
+        sys.stdout.flush()
+
+    if jobs > 1:
+        # Workers are reused across files, so imports and the ANTLR
+        # runtime's setup are paid once per worker, not once per file
+        with ProcessPoolExecutor(jobs, initializer=_batch_worker,
+                                 initargs=(logger.getEffectiveLevel(),)) as pool:
+            futures = [pool.submit(_batch_file, *task) for task in tasks]
+            for future in as_completed(futures):
+                report(future.result())
+    else:
+        for task in tasks:
+            report(_batch_file(*task))
+
+    results.sort(key=lambda r: r["input"])
+    failed = [r for r in results if r["status"] != "ok"]
+    metrics = Metrics()
+    for r in results:
+        if "metrics" in r:
+            metrics.merge_all(Metrics.from_dict(r["metrics"]))
+    summary = {
+        "input_dir": in_dir,
+        "output_dir": out_dir,
+        "stages": stages,
+        "jobs": jobs,
+        "files": len(results),
+        "ok": len(results) - len(failed),
+        "failed": len(failed),
+        "seconds": time.perf_counter() - start,
+        "metrics": metrics.to_dict(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"[✓] {summary['ok']} ok, {summary['failed']} failed in {summary['seconds']:.2f}s; "
+          f"summary saved to {summary_path}")
+    return summary
 
 
 def run_and_compare(obfus_path, clean_path):
@@ -78,15 +275,8 @@ def run_and_compare(obfus_path, clean_path):
         print("Clean:", clean_output)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Mini-C Deobfuscator CLI")
-    parser.add_argument("input", help="Path to obfuscated .mc file")
-    parser.add_argument(
-        "-o",
-        "--output",
-        default="output/output_clean.mc",
-        help="Output file path (default: output/output_clean.mc)",
-    )
+def add_pipeline_args(parser):
+    """Options shared by single-file and batch mode."""
     parser.add_argument("--rename", action="store_true", help="Recover variable names")
     parser.add_argument("--dead", action="store_true", help="Remove dead code")
     parser.add_argument("--expr", action="store_true", help="Simplify expressions")
@@ -94,20 +284,203 @@ def main():
     parser.add_argument("--inline", action="store_true", help="Reconstruct inlined functions")
     parser.add_argument("--all", action="store_true", help="Apply all transformations")
     parser.add_argument("--check", action="store_true", help="Run GCC equivalence check")
+    parser.add_argument(
+        "--fixpoint",
+        action="store_true",
+        help="Re-run stages on the functions that changed until nothing changes",
+    )
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        default=DEFAULT_MAX_ITERATIONS,
+        help=f"Most runs of any one stage in --fixpoint mode (default: {DEFAULT_MAX_ITERATIONS})",
+    )
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="Run dead code removal and expression simplification as one tree walk",
+    )
+    parser.add_argument(
+        "--frontend",
+        choices=FRONTENDS,
+        default="antlr",
+        help="Parser frontend: antlr (generated parser) or fast (hand-written recursive descent)",
+    )
+    parser.add_argument(
+        "--lexer",
+        choices=LEXERS,
+        default="antlr",
+        help="Lexer for the antlr frontend: antlr (ObfuMiniCLexer) or bulk (single regex pass)",
+    )
+    parser.add_argument(
+        "--parse-mode",
+        choices=PARSE_MODES,
+        default="auto",
+        help="Parser prediction mode: sll, ll, or auto (SLL first, LL on failure; default: auto)",
+    )
+    parser.add_argument(
+        "--builder",
+        choices=BUILDERS,
+        default="visitor",
+        help="AST construction: visitor (over a full parse tree) or listener (streaming, no parse tree)",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help=f"Cache parsed ASTs on disk (default dir: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Size limit of the AST cache in MB; least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default="info",
+        help="info: rule counts once per run; debug: also per function (default: info)",
+    )
+
+
+def add_metrics_args(parser, what="the run"):
+    parser.add_argument(
+        "--metrics",
+        choices=METRICS_FORMATS,
+        help=f"Report per-pass counters of {what}: visited and rewritten nodes, "
+             f"rule hits, time",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        metavar="PATH",
+        help="Write the --metrics report to PATH instead of stdout",
+    )
 
-    args = parser.parse_args()
 
-    selected_stages = []
+def selected_stages(args):
     if args.all:
-        selected_stages = ["dead", "expr", "rename", "control", "inline"]
-    else:
-        if args.dead: selected_stages.append("dead")
-        if args.expr: selected_stages.append("expr")
-        if args.rename: selected_stages.append("rename")
-        if args.control: selected_stages.append("control")
-        if args.inline: selected_stages.append("inline")
+        return list(PASS_NAMES)
+    stages = []
+    if args.dead: stages.append("dead")
+    if args.expr: stages.append("expr")
+    if args.rename: stages.append("rename")
+    if args.control: stages.append("control")
+    if args.inline: stages.append("inline")
+    return stages
+
+
+def pipeline_options(args):
+    cache = ASTCache(args.cache, args.cache_max_mb * 1024 * 1024) if args.cache else None
+    return dict(check_runtime=args.check, parse_mode=args.parse_mode, builder=args.builder,
+                frontend=args.frontend, lexer=args.lexer, cache=cache, fuse=args.fused,
+                fixpoint=args.fixpoint, max_iterations=args.max_iterations)
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="cli.py batch", description="Deobfuscate every .mc file in a directory"
+    )
+    parser.add_argument("in_dir", help="Directory searched recursively for .mc files")
+    parser.add_argument("out_dir", help="Directory the deobfuscated files are written to")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Files processed in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--summary",
+        metavar="PATH",
+        help="Where to write the JSON summary (default: <out_dir>/summary.json)",
+    )
+    add_pipeline_args(parser)
+    add_metrics_args(parser, "the whole batch")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
+
+    summary = run_batch(args.in_dir, args.out_dir, selected_stages(args), args.jobs,
+                        args.summary, **pipeline_options(args))
+    if args.metrics:
+        write_metrics(Metrics.from_dict(summary["metrics"]), args.metrics, args.metrics_out)
+    sys.exit(1 if summary["failed"] else 0)
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="cli.py serve",
+        description="Run a local deobfuscation daemon with warm worker processes",
+    )
+    parser.add_argument("--host", default=client.DEFAULT_HOST,
+                        help=f"Address to listen on (default: {client.DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=client.DEFAULT_PORT,
+                        help=f"Port to listen on (default: {client.DEFAULT_PORT})")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Warm worker processes, i.e. requests handled in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help=f"Cache parsed ASTs on disk (default dir: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Size limit of the AST cache in MB; least recently used entries are evicted",
+    )
+    args = parser.parse_args(argv)
+
+    cache = ASTCache(args.cache, args.cache_max_mb * 1024 * 1024) if args.cache else None
+    server.serve(_serve_one, args.host, args.port, args.jobs,
+                 functools.partial(_warm_worker, cache))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["batch"]:
+        return batch_main(argv[1:])
+    if argv[:1] == ["serve"]:
+        return serve_main(argv[1:])
+
+    parser = argparse.ArgumentParser(
+        description="Mini-C Deobfuscator CLI",
+        epilog="Batch mode: cli.py batch <in_dir> <out_dir> [--jobs N]; "
+               "daemon: cli.py serve [--port P] [--jobs N], used by client.py "
+               "(see cli.py batch/serve -h)",
+    )
+    parser.add_argument("input", help="Path to obfuscated .mc file")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="output/output_clean.mc",
+        help="Output file path (default: output/output_clean.mc)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Worker processes for the per-function part of the stages (default: 1, no workers)",
+    )
+    add_pipeline_args(parser)
+    add_metrics_args(parser)
+
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level)
 
-    run_pipeline(args.input, args.output, selected_stages, args.check)
+    result = run_pipeline(args.input, args.output, selected_stages(args), jobs=args.jobs,
+                          **pipeline_options(args))
+    if args.metrics:
+        write_metrics(result.metrics, args.metrics, args.metrics_out)
 
 
 if __name__ == "__main__":
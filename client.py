@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+
+from deobfuscator.client import DEFAULT_HOST, DEFAULT_PORT, ServerError, request
+from deobfuscator.metrics import METRICS_FORMATS, Metrics
+
+
+def main(argv=None):
+    """
+    Thin client for a `cli.py serve` daemon.  Takes the same arguments as
+    cli.py; the file is read and written here, everything else runs in the
+    daemon's warm workers.  With no daemon listening, cli.py runs in this
+    process instead.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        description="Mini-C Deobfuscator client",
+        epilog="Any other cli.py flag (--all, --fused, ...) is passed to the server.",
+    )
+    parser.add_argument("input", help="Path to obfuscated .mc file")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="output/output_clean.mc",
+        help="Output file path (default: output/output_clean.mc)",
+    )
+    parser.add_argument(
+        "--server",
+        default=f"{DEFAULT_HOST}:{DEFAULT_PORT}",
+        metavar="HOST:PORT",
+        help=f"Daemon address (default: {DEFAULT_HOST}:{DEFAULT_PORT})",
+    )
+    parser.add_argument("--check", action="store_true", help="Run GCC equivalence check")
+    parser.add_argument("--metrics", choices=METRICS_FORMATS,
+                        help="Report per-pass counters of the run")
+    parser.add_argument("--metrics-out", metavar="PATH",
+                        help="Write the --metrics report to PATH instead of stdout")
+    args, passthrough = parser.parse_known_args(argv)
+
+    host, _, port = args.server.rpartition(":")
+    with open(args.input) as f:
+        source = f.read()
+    try:
+        result = request(source, args=passthrough, host=host or DEFAULT_HOST, port=int(port))
+    except ServerError as e:
+        print(f"[✗] Error: {e}")
+        sys.exit(1)
+
+    if result is None:
+        # Only now pay for the parser and pipeline imports
+        print(f"[*] No server at {args.server}, running in-process")
+        import cli
+        local = [args.input, "-o", args.output] + (["--check"] if args.check else [])
+        if args.metrics:
+            local += ["--metrics", args.metrics]
+        if args.metrics_out:
+            local += ["--metrics-out", args.metrics_out]
+        return cli.main(local + passthrough)
+
+    print(result["log"], end="")
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        f.write(result["code"])
+    print(f"[✓] Deobfuscated code saved to {args.output} (by server at {args.server})")
+    if args.check:
+        from cli import run_and_compare
+        run_and_compare(args.input, args.output)
+    if args.metrics:
+        text = Metrics.from_dict(result["metrics"]).render(args.metrics)
+        if args.metrics_out:
+            with open(args.metrics_out, "w") as f:
+                f.write(text)
+            print(f"[✓] Metrics saved to {args.metrics_out}")
+        else:
+            print(text, end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.frontend import load_source
+from deobfuscator.pass_manager import DEFAULT_MAX_ITERATIONS, Cancelled, default_pass_manager
+
+
+class Result:
+    """
+    What run_source() and deobfuscate() return: the generated code, the
+    deobfuscated AST and the run's metrics.
+
+      - metrics: the passes' counters (see Metrics)
+      - timings: seconds per frontend stage, per pass ("pass/<name>"), per
+                 worker batch with jobs > 1 ("workers/<passes>", wall
+                 time) and for code generation ("codegen")
+      - runs:    how many times each pass ran
+      - capped:  passes that hit max_iterations in fixpoint mode
+      - seconds: wall time of the whole run, queueing excluded
+    """
+
+    __slots__ = ("code", "ast", "metrics", "timings", "runs", "capped", "seconds")
+
+    def __init__(self, code, ast, metrics, timings, runs, capped, seconds):
+        self.code = code
+        self.ast = ast
+        self.metrics = metrics
+        self.timings = timings
+        self.runs = runs
+        self.capped = capped
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"Result({len(self.code)} chars of code in {self.seconds:.4f}s)"
+
+
+def run_source(source, stages, frontend="antlr", parse_mode="auto", builder="visitor",
+               lexer="antlr", cache=None, fuse=False, fixpoint=False,
+               max_iterations=DEFAULT_MAX_ITERATIONS, jobs=1, cancelled=None):
+    """
+    Deobfuscate Mini-C `source` (str or bytes) with `stages` and return a
+    Result.  Nothing is printed and nothing touches the disk unless an
+    ASTCache is passed; the rule counts are logged once, at INFO level, on
+    the "deobfuscator" logger.  `cancelled` is polled between passes (see
+    PassManager.cancelled).
+    """
+    start = time.perf_counter()
+    timings = {}
+    ast = load_source(source, frontend, parse_mode, builder, timings, lexer, cache)
+
+    pm = default_pass_manager(jobs)
+    pm.cancelled = cancelled
+    try:
+        if fixpoint:
+            pm.run_fixpoint(ast, stages, fuse, max_iterations)
+        else:
+            pm.run(ast, stages, fuse)
+    finally:
+        pm.close()
+    for name, seconds in pm.timings.items():
+        timings[f"pass/{name}"] = seconds
+    for batch, seconds in pm.batch_timings.items():
+        timings[f"workers/{batch}"] = seconds
+    if cancelled is not None and cancelled():
+        raise Cancelled()
+    pm.metrics.log()
+
+    t = time.perf_counter()
+    code = CodeGenerator().generate(ast)
+    timings["codegen"] = time.perf_counter() - t
+    return Result(code, ast, pm.metrics, timings, dict(pm.runs), list(pm.capped),
+                  time.perf_counter() - start)
+
+
+async def deobfuscate(source, stages, *, executor=None, timeout=None, frontend="antlr",
+                      parse_mode="auto", builder="visitor", lexer="antlr", cache=None,
+                      fuse=False, fixpoint=False, max_iterations=DEFAULT_MAX_ITERATIONS):
+    """
+    Deobfuscate Mini-C `source` (str or bytes) with `stages` off the event
+    loop and return a Result; nothing is read from or written to disk
+    unless an ASTCache is passed.
+
+    The work runs on `executor`, the loop's default thread pool if None.
+    A ProcessPoolExecutor runs requests truly in parallel; a thread pool
+    only keeps the loop responsive.
+
+    When the awaiting task is cancelled or `timeout` seconds pass
+    (asyncio.TimeoutError), a run on a thread stops before its next pass.
+    A run on a process pool cannot be reached and finishes in the
+    background; its result is dropped.  Results from a process pool come
+    back without the AST, to save pickling it.
+    """
+    in_process = not isinstance(executor, ProcessPoolExecutor)
+    cancel = threading.Event() if in_process else None
+    options = dict(frontend=frontend, parse_mode=parse_mode, builder=builder, lexer=lexer,
+                   cache=cache, fuse=fuse, fixpoint=fixpoint, max_iterations=max_iterations)
+    run = functools.partial(_deobfuscate, source, list(stages), options, cancel, in_process)
+    future = asyncio.get_running_loop().run_in_executor(executor, run)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except BaseException:
+        if cancel is not None:
+            cancel.set()
+        raise
+
+
+def _deobfuscate(source, stages, options, cancel, keep_ast):
+    # Runs on the executor
+    result = run_source(source, stages, cancelled=cancel and cancel.is_set, **options)
+    if not keep_ast:
+        result.ast = None
+    return result
@@ -1,4 +1,5 @@
 from typing import List, Optional
+from deobfuscator.symbols import SymbolTable
 
 """ Base AST Node """
 
@@ -8,14 +9,23 @@ class Node:
 
 
 class ASTNode:
+    """
+    Base of all AST nodes.  Subclasses list their attributes once in
+    `_fields` (constructor order) and use it as `__slots__`, so nodes carry
+    no per-instance __dict__ and generic visitors can walk `_fields`.
+    """
+
+    _fields = ()
+    __slots__ = ()
+
     def __repr__(self):
         return self._repr()
 
     def _repr(self, indent=0):
         pad = "  " * indent
-        fields = vars(self)
         result = f"{pad}{self.__class__.__name__}:\n"
-        for k, v in fields.items():
+        for k in self._fields:
+            v = getattr(self, k)
             result += f"{pad}  {k}: "
             if isinstance(v, ASTNode):
                 result += "\n" + v._repr(indent + 2)
@@ -36,11 +46,20 @@ class ASTNode:
 
 
 class Program(ASTNode):
-    def __init__(self, functions: List["Function"]):
+    _fields = ("functions",)
+    __slots__ = _fields + ("symbols", "call_graph")
+
+    def __init__(self, functions: List["Function"], symbols: Optional[SymbolTable] = None):
         self.functions = functions
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        # CallGraph, built on first use (see CallGraph.of)
+        self.call_graph = None
 
 
 class Function(ASTNode):
+    _fields = ("return_type", "name", "params", "body")
+    __slots__ = _fields
+
     def __init__(
         self,
         return_type: str,
@@ -55,6 +74,9 @@ class Function(ASTNode):
 
 
 class Parameter(ASTNode):
+    _fields = ("param_type", "name")
+    __slots__ = _fields
+
     def __init__(self, param_type: str, name: str):
         self.param_type = param_type
         self.name = name
@@ -64,17 +86,20 @@ class Parameter(ASTNode):
 
 
 class Statement(ASTNode):
-    pass
+    __slots__ = ()
 
 
 class Expression(ASTNode):
-    pass
+    __slots__ = ()
 
 
 """ Statements """
 
 
 class VariableDecl(Statement):
+    _fields = ("var_type", "name", "init_expr")
+    __slots__ = _fields
+
     def __init__(self, var_type: str, name: str, init_expr: Optional[Expression]):
         self.var_type = var_type
         self.name = name
@@ -82,16 +107,25 @@ class VariableDecl(Statement):
 
 
 class ExpressionStmt(Statement):
+    _fields = ("expr",)
+    __slots__ = _fields
+
     def __init__(self, expr: Optional[Expression]):
         self.expr = expr
 
 
 class Return(Statement):
+    _fields = ("value",)
+    __slots__ = _fields
+
     def __init__(self, value: Optional[Expression]):
         self.value = value
 
 
 class IfStmt(Statement):
+    _fields = ("condition", "then_branch", "else_branch")
+    __slots__ = _fields
+
     def __init__(
         self,
         condition: Expression,
@@ -104,12 +138,18 @@ class IfStmt(Statement):
 
 
 class WhileStmt(Statement):
+    _fields = ("condition", "body")
+    __slots__ = _fields
+
     def __init__(self, condition: Expression, body: Statement):
         self.condition = condition
         self.body = body
 
 
 class ForStmt(Statement):
+    _fields = ("init", "cond", "update", "body")
+    __slots__ = _fields
+
     def __init__(
         self,
         init: Optional[Expression],
@@ -124,23 +164,35 @@ class ForStmt(Statement):
 
 
 class Block(Statement):
+    _fields = ("items",)
+    __slots__ = _fields
+
     def __init__(self, items: List[Statement]):
         self.items = items
 
 
 class Print(Statement):
+    _fields = ("format_str", "args")
+    __slots__ = _fields
+
     def __init__(self, format_str: str, args: List[Expression]):
         self.format_str = format_str
         self.args = args
 
 
 class Scan(Statement):
+    _fields = ("format_str", "args")
+    __slots__ = _fields
+
     def __init__(self, format_str: str, args: List[str]):
         self.format_str = format_str
         self.args = args
 
 
 class Assignment(Statement):
+    _fields = ("target", "value")
+    __slots__ = _fields
+
     def __init__(self, target: str, value: Expression):
         self.target = target
         self.value = value
@@ -150,6 +202,9 @@ class Assignment(Statement):
 
 
 class BinaryOp(Expression):
+    _fields = ("op", "left", "right")
+    __slots__ = _fields
+
     def __init__(self, op: str, left: Expression, right: Expression):
         self.op = op
         self.left = left
@@ -157,37 +212,58 @@ class BinaryOp(Expression):
 
 
 class UnaryOp(Expression):
+    _fields = ("op", "operand")
+    __slots__ = _fields
+
     def __init__(self, op: str, operand: Expression):
         self.op = op
         self.operand = operand
 
 
 class Literal(Expression):
+    _fields = ("value",)
+    __slots__ = _fields
+
     def __init__(self, value):
         self.value = value
 
 
 class Variable(Expression):
+    _fields = ("name",)
+    __slots__ = _fields
+
     def __init__(self, name: str):
         self.name = name
 
 
 class FuncCall(Expression):
+    _fields = ("name", "args")
+    __slots__ = _fields
+
     def __init__(self, name: str, args: List[Expression]):
         self.name = name
         self.args = args
 
 
 class Label(Statement):
+    _fields = ("name",)
+    __slots__ = _fields
+
     def __init__(self, name):
         self.name = name
 
 class Goto(Statement):
+    _fields = ("label",)
+    __slots__ = _fields
+
     def __init__(self, label):
         self.label = label
 
 
 class SwitchCase:
+    _fields = ("value", "label", "body")
+    __slots__ = _fields
+
     def __init__(self, value, label, body):
         self.value = value
         self.label = label
@@ -195,6 +271,9 @@ class SwitchCase:
 
 
 class Switch:
+    _fields = ("expr", "cases", "default")
+    __slots__ = _fields
+
     def __init__(self, expr, cases, default=None):
         self.expr = expr
         self.cases = cases
@@ -24,9 +24,16 @@ from deobfuscator.ast import (
     Switch,
     SwitchCase 
 )
+from deobfuscator.symbols import SymbolTable
 
 
 class ASTBuilder(ObfuMiniCVisitor):
+    def __init__(self):
+        self.symbols = SymbolTable()
+
+    def _name(self, node):
+        return self.symbols.intern(node.getText())
+
     def visitSwitchStmt(self, ctx):
         expr = self.visit(ctx.expr())
         cases = []
@@ -76,7 +83,7 @@ class ASTBuilder(ObfuMiniCVisitor):
         return SwitchCase(value, label)
 
     def visitLabelStmt(self, ctx):
-        name = ctx.ID().getText()
+        name = self._name(ctx.ID())
         return Label(name)
 
     def visitCompilationUnit(self, ctx):
@@ -85,11 +92,11 @@ class ASTBuilder(ObfuMiniCVisitor):
             result = self.visit(child)
             if isinstance(result, Function):
                 functions.append(result)
-        return Program(functions)
+        return Program(functions, self.symbols)
 
     def visitFuncDef(self, ctx):
-        return_type = ctx.type_().getText()
-        name = ctx.ID().getText()
+        return_type = self._name(ctx.type_())
+        name = self._name(ctx.ID())
         params = self.visit(ctx.paramList()) if ctx.paramList() else []
         block = self.visit(ctx.blockStmt())
         return Function(
@@ -100,7 +107,7 @@ class ASTBuilder(ObfuMiniCVisitor):
         return [self.visit(p) for p in ctx.param()]
 
     def visitParam(self, ctx):
-        return Parameter(ctx.type_().getText(), ctx.ID().getText())
+        return Parameter(self._name(ctx.type_()), self._name(ctx.ID()))
 
     def visitBlockStmt(self, ctx):
         stmts = []
@@ -115,10 +122,10 @@ class ASTBuilder(ObfuMiniCVisitor):
         return Block(stmts)
 
     def visitVarDecl(self, ctx):
-        var_type = ctx.type_().getText()
+        var_type = self._name(ctx.type_())
         decls = []
         for init in ctx.initList().init():
-            name = init.ID().getText()
+            name = self._name(init.ID())
             expr = self.visit(init.expr()) if init.expr() else None
             decls.append(VariableDecl(var_type, name, expr))
         return decls
@@ -156,14 +163,14 @@ class ASTBuilder(ObfuMiniCVisitor):
             return Print(fmt, args)
         elif ctx.SCANF():
             fmt = ctx.STRING().getText().strip('"')
-            args = [tok.getText().replace("&", "") for tok in ctx.ID()]
+            args = [self.symbols.intern(tok.getText().replace("&", "")) for tok in ctx.ID()]
             return Scan(fmt, args)
 
     # === Expressions ===
 
     def visitAssignExpr(self, ctx):
         if ctx.getChildCount() == 3:
-            target_text = ctx.getChild(0).getText()
+            target_text = self._name(ctx.getChild(0))
             target_node = Variable(target_text)   # ALWAYS use Variable
             value_node = self.visit(ctx.assignExpr())
             return Assignment(target_node, value_node)
@@ -228,16 +235,16 @@ class ASTBuilder(ObfuMiniCVisitor):
 
     def visitPrimaryExpr(self, ctx):
         if ctx.ID() and ctx.LPAREN():
-            name = ctx.ID().getText()
+            name = self._name(ctx.ID())
             args = self.visit(ctx.argList()) if ctx.argList() else []
             return FuncCall(name, args)
 
         if ctx.ID() and ctx.expr():
             return FuncCall(
-                ctx.ID().getText(), self.visit(ctx.argList()) if ctx.argList() else []
+                self._name(ctx.ID()), self.visit(ctx.argList()) if ctx.argList() else []
             )
         elif ctx.ID():
-            return Variable(ctx.ID().getText())
+            return Variable(self._name(ctx.ID()))
         elif ctx.NUMBER():
             return Literal(int(ctx.NUMBER().getText()))
         elif ctx.BOOL():
@@ -256,9 +263,9 @@ class ASTBuilder(ObfuMiniCVisitor):
     
 
     def visitGotoStmt(self, ctx: ObfuMiniCParser.GotoStmtContext):
-        label_name = ctx.ID().getText()
+        label_name = self._name(ctx.ID())
         return Goto(label_name)
 
     def visitLabelStmt(self, ctx: ObfuMiniCParser.LabelStmtContext):
-        label_name = ctx.ID().getText()
+        label_name = self._name(ctx.ID())
         return Label(label_name)
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import tempfile
+
+from deobfuscator import serialization
+
+DEFAULT_CACHE_DIR = ".deobf_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Everything that decides which AST a source produces; editing any of these
+# changes the frontend version and so invalidates old entries.
+_FRONTEND_FILES = (
+    "frontend.py",
+    "mmap_stream.py",
+    "ast.py",
+    "ast_builder.py",
+    "streaming_ast_builder.py",
+    "fast_lexer.py",
+    "fast_parser.py",
+    "serialization.py",
+    "symbols.py",
+    os.path.join("parser", "ObfuMiniCParser.py"),
+    os.path.join("parser", "ObfuMiniCLexer.py"),
+    os.path.join("parser", "ObfuMiniCVisitor.py"),
+    os.path.join("parser", "ObfuMiniCListener.py"),
+)
+
+
+def frontend_version() -> str:
+    base = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for name in _FRONTEND_FILES:
+        with open(os.path.join(base, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class ASTCache:
+    """
+    On-disk cache of built Programs, one file per entry in the binary
+    format of deobfuscator.serialization, keyed by the SHA-256 of the
+    source bytes, the frontend options that built it and the frontend
+    version.
+
+    Entries are touched on every hit, and the least recently used ones are
+    evicted after each store until the directory fits in `max_bytes`.
+    Several processes may share a directory: an entry removed by another
+    one between listing and use is treated as already gone.
+    """
+
+    SUFFIX = ".ast"
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._version = frontend_version().encode()
+
+    def key(self, source: bytes, options=()) -> str:
+        """Key of `source` (any bytes-like object) built with `options` (strings)."""
+        h = hashlib.sha256(self._version)
+        for option in options:
+            h.update(option.encode() + b"\0")
+        h.update(b"\0")
+        h.update(source)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                prog = serialization.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # truncated or stale entry: drop it and rebuild
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process since we read it
+            pass
+        return prog
+
+    def put(self, key, prog):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                serialization.dump(prog, f)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,115 @@
+from typing import Dict, List
+
+from deobfuscator.ast import FuncCall, Function, Program
+
+
+class CallGraph:
+    """
+    Program-wide index of calls: the FuncCall nodes in every function
+    body, by caller and by callee name.
+
+    CallGraph.of(prog) builds it on first use and keeps it on the Program;
+    from then on it has to follow every edit that adds, removes or
+    replaces a FuncCall node.  PassManager re-indexes the functions each
+    pass reports as changed, and rename() renames call sites through the
+    index, so finding a function's callers or call sites is a lookup.
+    Code that edits a program by hand, or runs passes outside a
+    PassManager, should drop `prog.call_graph` or call update();
+    SemanticNameRecoverer.recover() rebuilds it unless handed the graph.
+    """
+
+    __slots__ = ("_calls", "_sites")
+
+    def __init__(self, functions=()):
+        # caller -> its FuncCall nodes in walk order
+        self._calls: Dict[Function, List[FuncCall]] = {}
+        # callee name -> caller -> FuncCall nodes
+        self._sites: Dict[str, Dict[Function, List[FuncCall]]] = {}
+        for func in functions:
+            self._add(func)
+
+    @classmethod
+    def of(cls, prog: Program) -> "CallGraph":
+        # a Program made without __init__ (Program.__new__, an unpickled
+        # one from before the slot existed) has no call_graph at all
+        graph = getattr(prog, "call_graph", None)
+        if graph is None:
+            graph = prog.call_graph = cls(prog.functions)
+        return graph
+
+    def __len__(self):
+        return sum(len(calls) for calls in self._calls.values())
+
+    def sites(self, name: str) -> List[FuncCall]:
+        """Every call of `name`."""
+        return [call for calls in self._sites.get(name, {}).values() for call in calls]
+
+    def callers(self, name: str) -> List[Function]:
+        return list(self._sites.get(name, ()))
+
+    def callees(self, func: Function) -> List[str]:
+        """Names `func` calls, each once, in order of first call."""
+        return list(dict.fromkeys(call.name for call in self._calls.get(func, ())))
+
+    def update(self, functions):
+        """Re-index `functions` after their bodies changed."""
+        for func in functions:
+            self._remove(func)
+            self._add(func)
+
+    def reset(self, functions):
+        """Re-index from scratch, e.g. after functions were added or removed."""
+        self.__init__(functions)
+
+    def rename(self, mapping: Dict[str, str]) -> int:
+        """
+        Rename the call sites of every old name in `mapping` to its new
+        name, all at once (a call renamed to a name that is itself renamed
+        is not renamed again).  Returns the number of call sites changed.
+        """
+        moved = [(self._sites.pop(old), new) for old, new in mapping.items()
+                 if old != new and old in self._sites]
+        count = 0
+        for by_caller, new in moved:
+            into = self._sites.setdefault(new, {})
+            for caller, calls in by_caller.items():
+                for call in calls:
+                    call.name = new
+                count += len(calls)
+                into.setdefault(caller, []).extend(calls)
+        return count
+
+    def _add(self, func: Function):
+        calls = _calls_in(func.body)
+        self._calls[func] = calls
+        for call in calls:
+            self._sites.setdefault(call.name, {}).setdefault(func, []).append(call)
+
+    def _remove(self, func: Function):
+        for call in self._calls.pop(func, ()):
+            by_caller = self._sites.get(call.name)
+            if by_caller is not None:
+                by_caller.pop(func, None)
+                if not by_caller:
+                    del self._sites[call.name]
+
+
+def _calls_in(stmts) -> List[FuncCall]:
+    # FuncCall nodes anywhere under `stmts`, in pre-order
+    calls = []
+    stack = [stmts]
+    while stack:
+        node = stack.pop()
+        if type(node) is list:
+            stack.extend(reversed(node))
+            continue
+        fields = getattr(node, "_fields", None)
+        if not fields:
+            continue
+        if type(node) is FuncCall:
+            calls.append(node)
+        for field in reversed(fields):
+            value = getattr(node, field)
+            if value is not None and type(value) is not str:
+                stack.append(value)
+    return calls
@@ -0,0 +1,48 @@
+import http.client
+import json
+
+# Kept free of parser and pipeline imports, so a client process only pays
+# for the standard library
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Seconds to wait for the daemon to accept a connection before giving up
+# on it
+CONNECT_TIMEOUT = 0.5
+
+
+class ServerError(Exception):
+    """The daemon was reached but could not deobfuscate the request."""
+
+
+def request(source, stages=None, options=None, args=None, host=DEFAULT_HOST,
+            port=DEFAULT_PORT, timeout=None):
+    """
+    Send one file's source to a `cli.py serve` daemon and return its JSON
+    result ({"code", "log", "timings"}), or None if no daemon is listening
+    on host:port.  The stages and pipeline options are given either as
+    `stages` and `options` (run_pipeline's keyword arguments) or as `args`,
+    a list of cli.py flags such as ["--all", "--fused"].
+    """
+    body = {"source": source}
+    if args is not None:
+        body["args"] = list(args)
+    else:
+        body["stages"] = list(stages or [])
+        body["options"] = dict(options or {})
+
+    conn = http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+    try:
+        try:
+            conn.connect()
+        except OSError:
+            return None
+        conn.sock.settimeout(timeout)
+        conn.request("POST", "/deobfuscate", json.dumps(body),
+                     {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        result = json.loads(response.read())
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise ServerError(result.get("error", f"HTTP {response.status}"))
+    return result
@@ -0,0 +1,162 @@
+import re
+from array import array
+
+""" Token types (same numbering as the generated ObfuMiniCLexer) """
+
+EOF = -1
+ASSIGN = 1
+SWITCH = 2
+GOTO = 3
+COLON = 4
+CASE = 5
+DEFAULT = 6
+AMP = 7
+OR = 8
+AND = 9
+EQ = 10
+NE = 11
+LT = 12
+LE = 13
+GT = 14
+GE = 15
+PLUS = 16
+MINUS = 17
+STAR = 18
+SLASH = 19
+PERCENT = 20
+BANG = 21
+BOOL = 22
+CHAR = 23
+STRING = 24
+INT = 25
+CHAR_TOK = 26
+BOOL_TOK = 27
+PRINTF = 28
+SCANF = 29
+WHILE = 30
+FOR = 31
+IF = 32
+ELSE = 33
+RETURN = 34
+LPAREN = 35
+RPAREN = 36
+LBRACE = 37
+RBRACE = 38
+SEMI = 39
+COMMA = 40
+NUMBER = 41
+ID = 42
+
+KEYWORDS = {
+    "switch": SWITCH, "goto": GOTO, "case": CASE, "default": DEFAULT,
+    "true": BOOL, "false": BOOL,
+    "int": INT, "char": CHAR_TOK, "bool": BOOL_TOK,
+    "printf": PRINTF, "scanf": SCANF,
+    "while": WHILE, "for": FOR, "if": IF, "else": ELSE, "return": RETURN,
+}
+
+OPERATORS = {
+    "=": ASSIGN, ":": COLON, "&": AMP, "||": OR, "&&": AND,
+    "==": EQ, "!=": NE, "<": LT, "<=": LE, ">": GT, ">=": GE,
+    "+": PLUS, "-": MINUS, "*": STAR, "/": SLASH, "%": PERCENT, "!": BANG,
+    "(": LPAREN, ")": RPAREN, "{": LBRACE, "}": RBRACE, ";": SEMI, ",": COMMA,
+}
+
+# One alternative per token class; comments come before '/' and two-char
+# operators before their one-char prefixes so the leftmost match is also the
+# longest, as in the ANTLR lexer.
+MASTER_RE = re.compile(
+    r"""
+    (?P<skip>[ \t\r\n]+|//[^\r\n]*|/\*.*?\*/)
+  | (?P<word>[a-zA-Z_][a-zA-Z0-9_]*)
+  | (?P<number>[0-9]+)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<char>'.')
+  | (?P<op>\|\||&&|==|!=|<=|>=|[=:&<>+\-*/%!(){};,])
+  | (?P<error>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+NEWLINE_RE = re.compile("\n")
+
+
+class LexError(Exception):
+    pass
+
+
+class TokenArray:
+    """
+    Compact token buffer: parallel array('i') columns for type, start,
+    stop (inclusive, as in ANTLR) and line, indexed by token number.
+    Token text is sliced from the source on demand; the last entry is EOF.
+    Columns are computed from the start offset of each line, found with
+    one scan of the source the first time a column is asked for.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.types = array("i")
+        self.starts = array("i")
+        self.stops = array("i")
+        self.lines = array("i")
+        # offset of the first character of each line, built by column()
+        self._line_starts = None
+
+    def __len__(self):
+        return len(self.types)
+
+    def text(self, i):
+        if self.types[i] == EOF:
+            return "<EOF>"
+        return self.source[self.starts[i]:self.stops[i] + 1]
+
+    def column(self, i):
+        line_starts = self._line_starts
+        if line_starts is None:
+            line_starts = array("i", [0])
+            line_starts.extend(m.end() for m in NEWLINE_RE.finditer(self.source))
+            self._line_starts = line_starts
+        return self.starts[i] - line_starts[self.lines[i] - 1]
+
+
+def tokenize(text: str) -> TokenArray:
+    """
+    Tokenize Mini-C source in a single regex pass into a TokenArray;
+    whitespace and comments are dropped.
+    """
+    tokens = TokenArray(text)
+    types = tokens.types
+    starts = tokens.starts
+    stops = tokens.stops
+    lines = tokens.lines
+    line = 1
+    keywords = KEYWORDS
+    operators = OPERATORS
+    for m in MASTER_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "skip":
+            line += m.group().count("\n")
+            continue
+        if kind == "word":
+            types.append(keywords.get(m.group(), ID))
+        elif kind == "op":
+            types.append(operators[m.group()])
+        elif kind == "number":
+            types.append(NUMBER)
+        elif kind == "string":
+            types.append(STRING)
+        elif kind == "char":
+            types.append(CHAR)
+        else:
+            raise LexError(f"line {line}: token recognition error at: '{m.group()}'")
+        starts.append(m.start())
+        stops.append(m.end() - 1)
+        lines.append(line)
+        if kind == "string" or kind == "char":
+            line += m.group().count("\n")
+    types.append(EOF)
+    starts.append(len(text))
+    stops.append(len(text) - 1)
+    lines.append(line)
+    return tokens
@@ -0,0 +1,357 @@
+from deobfuscator.fast_lexer import *
+from deobfuscator.symbols import SymbolTable
+from deobfuscator.ast import (
+    Program,
+    Function,
+    Parameter,
+    VariableDecl,
+    ExpressionStmt,
+    Return,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    Block,
+    Print,
+    Scan,
+    Assignment,
+    BinaryOp,
+    UnaryOp,
+    FuncCall,
+    Variable,
+    Literal,
+    Goto,
+    Label,
+    Switch,
+    SwitchCase,
+)
+
+TYPE_TOKENS = (INT, CHAR_TOK, BOOL_TOK)
+EQUALITY_OPS = (EQ, NE)
+RELATIONAL_OPS = (LT, LE, GT, GE)
+ADD_OPS = (PLUS, MINUS)
+MUL_OPS = (STAR, SLASH, PERCENT)
+UNARY_OPS = (PLUS, MINUS, BANG)
+
+
+class ParseError(Exception):
+    pass
+
+
+def parse(text: str) -> Program:
+    return FastParser(tokenize(text)).compilation_unit()
+
+
+class FastParser:
+    """
+    Hand-written recursive-descent parser for grammar/ObfuMiniC.g4.
+
+    Builds the same deobfuscator.ast nodes as ASTBuilder directly from the
+    TokenArray produced by fast_lexer.tokenize, without an ANTLR parse
+    tree.  One method per grammar rule; at most two tokens of lookahead are
+    needed (labelStmt vs. exprStmt, funcDef vs. varDecl).
+    """
+
+    def __init__(self, tokens: TokenArray):
+        self.tokens = tokens
+        self.types = tokens.types
+        self.pos = 0
+        self.symbols = SymbolTable()
+
+    # === Token helpers ===
+
+    def _la(self, k=0):
+        return self.types[self.pos + k]
+
+    def _next(self):
+        text = self.tokens.text(self.pos)
+        self.pos += 1
+        return text
+
+    def _expect(self, ttype):
+        if self.types[self.pos] != ttype:
+            self._error()
+        return self._next()
+
+    def _name(self):
+        """Consume an ID token and return its interned text."""
+        return self.symbols.intern(self._expect(ID))
+
+    def _error(self):
+        text = self.tokens.text(self.pos)
+        raise ParseError(f"line {self.tokens.lines[self.pos]}: unexpected input '{text}'")
+
+    # === Program structure ===
+
+    def compilation_unit(self):
+        functions = []
+        while self._la() != EOF:
+            if self._la() in TYPE_TOKENS and self._la(1) == ID and self._la(2) == LPAREN:
+                functions.append(self.func_def())
+            else:
+                # top-level declarations are parsed but, like ASTBuilder, dropped
+                self.var_decl()
+        return Program(functions, self.symbols)
+
+    def func_def(self):
+        return_type = self.type_()
+        name = self._name()
+        self._expect(LPAREN)
+        params = self.param_list() if self._la() != RPAREN else []
+        self._expect(RPAREN)
+        block = self.block_stmt()
+        return Function(return_type, name, params, block.items)
+
+    def param_list(self):
+        params = [self.param()]
+        while self._la() == COMMA:
+            self._next()
+            params.append(self.param())
+        return params
+
+    def param(self):
+        param_type = self.type_()
+        return Parameter(param_type, self._name())
+
+    def var_decl(self):
+        var_type = self.type_()
+        decls = []
+        while True:
+            name = self._name()
+            expr = None
+            if self._la() == ASSIGN:
+                self._next()
+                expr = self.expr()
+            decls.append(VariableDecl(var_type, name, expr))
+            if self._la() != COMMA:
+                break
+            self._next()
+        self._expect(SEMI)
+        return decls
+
+    def type_(self):
+        if self._la() not in TYPE_TOKENS:
+            self._error()
+        return self.symbols.intern(self._next())
+
+    # === Statements ===
+
+    def block_stmt(self):
+        self._expect(LBRACE)
+        stmts = []
+        while self._la() != RBRACE:
+            if self._la() in TYPE_TOKENS:
+                stmts.extend(self.var_decl())
+            else:
+                stmts.append(self.stmt())
+        self._next()
+        return Block(stmts)
+
+    def stmt(self):
+        t = self._la()
+        if t == LBRACE:
+            return self.block_stmt()
+        if t == IF:
+            return self.if_stmt()
+        if t == WHILE or t == FOR:
+            return self.loop_stmt()
+        if t == RETURN:
+            self._next()
+            value = self.expr() if self._la() != SEMI else None
+            self._expect(SEMI)
+            return Return(value)
+        if t == PRINTF or t == SCANF:
+            return self.io_stmt()
+        if t == SWITCH:
+            return self.switch_stmt()
+        if t == GOTO:
+            self._next()
+            label = self._name()
+            self._expect(SEMI)
+            return Goto(label)
+        if t == ID and self._la(1) == COLON:
+            name = self._name()
+            self._next()
+            return Label(name)
+        # exprStmt
+        expr = self.expr() if t != SEMI else None
+        self._expect(SEMI)
+        return ExpressionStmt(expr)
+
+    def if_stmt(self):
+        self._expect(IF)
+        self._expect(LPAREN)
+        cond = self.expr()
+        self._expect(RPAREN)
+        then_branch = self.stmt()
+        else_branch = None
+        if self._la() == ELSE:
+            self._next()
+            else_branch = self.stmt()
+        return IfStmt(cond, then_branch, else_branch)
+
+    def loop_stmt(self):
+        if self._la() == WHILE:
+            self._next()
+            self._expect(LPAREN)
+            cond = self.expr()
+            self._expect(RPAREN)
+            return WhileStmt(cond, self.stmt())
+
+        self._expect(FOR)
+        self._expect(LPAREN)
+        exprs = []
+        for closing in (SEMI, SEMI, RPAREN):
+            if self._la() != closing:
+                exprs.append(self.expr())
+            self._expect(closing)
+        # like ASTBuilder, optional clauses are taken in order of appearance
+        exprs += [None] * (3 - len(exprs))
+        return ForStmt(exprs[0], exprs[1], exprs[2], self.stmt())
+
+    def io_stmt(self):
+        is_printf = self._next() == "printf"
+        self._expect(LPAREN)
+        fmt = self._expect(STRING).strip('"')
+        args = []
+        while self._la() == COMMA:
+            self._next()
+            if is_printf:
+                args.append(self.expr())
+            else:
+                if self._la() == AMP:
+                    self._next()
+                args.append(self._name())
+        self._expect(RPAREN)
+        self._expect(SEMI)
+        return Print(fmt, args) if is_printf else Scan(fmt, args)
+
+    def switch_stmt(self):
+        self._expect(SWITCH)
+        self._expect(LPAREN)
+        expr = self.expr()
+        self._expect(RPAREN)
+        self._expect(LBRACE)
+        cases = []
+        default = None
+        while self._la() != RBRACE:
+            if self._la() == CASE:
+                self._next()
+                value = self.literal()
+                self._expect(COLON)
+                label = Label(f"case_{len(cases)}")
+                cases.append(SwitchCase(value, label, Block(self._case_body())))
+            elif self._la() == DEFAULT:
+                self._next()
+                self._expect(COLON)
+                default = Block(self._case_body())
+            else:
+                self._error()
+        self._next()
+        return Switch(expr, cases, default)
+
+    def _case_body(self):
+        stmts = []
+        while self._la() not in (CASE, DEFAULT, RBRACE):
+            stmts.append(self.stmt())
+        return stmts
+
+    def literal(self):
+        t = self._la()
+        if t == NUMBER:
+            return Literal(int(self._next()))
+        if t == CHAR:
+            return Literal(self._next())
+        if t == BOOL:
+            return Literal(self._next() == "true")
+        self._error()
+
+    # === Expressions ===
+
+    def expr(self):
+        start = self.pos
+        left = self.logic_or_expr()
+        if self._la() != ASSIGN:
+            return left
+        # ASTBuilder keeps the target's source text, whatever it parsed to
+        target_text = "".join(self.tokens.text(i) for i in range(start, self.pos))
+        target_text = self.symbols.intern(target_text)
+        self._next()
+        return Assignment(Variable(target_text), self.expr())
+
+    def logic_or_expr(self):
+        left = self.logic_and_expr()
+        while self._la() == OR:
+            self._next()
+            left = BinaryOp("||", left, self.logic_and_expr())
+        return left
+
+    def logic_and_expr(self):
+        left = self.equality_expr()
+        while self._la() == AND:
+            self._next()
+            left = BinaryOp("&&", left, self.equality_expr())
+        return left
+
+    def equality_expr(self):
+        left = self.relational_expr()
+        while self._la() in EQUALITY_OPS:
+            op = self._next()
+            left = BinaryOp(op, left, self.relational_expr())
+        return left
+
+    def relational_expr(self):
+        left = self.add_expr()
+        while self._la() in RELATIONAL_OPS:
+            op = self._next()
+            left = BinaryOp(op, left, self.add_expr())
+        return left
+
+    def add_expr(self):
+        left = self.mul_expr()
+        while self._la() in ADD_OPS:
+            op = self._next()
+            left = BinaryOp(op, left, self.mul_expr())
+        return left
+
+    def mul_expr(self):
+        left = self.unary_expr()
+        while self._la() in MUL_OPS:
+            op = self._next()
+            left = BinaryOp(op, left, self.unary_expr())
+        return left
+
+    def unary_expr(self):
+        if self._la() in UNARY_OPS:
+            op = self._next()
+            return UnaryOp(op, self.unary_expr())
+        return self.primary_expr()
+
+    def primary_expr(self):
+        t = self._la()
+        if t == ID:
+            name = self._name()
+            if self._la() != LPAREN:
+                return Variable(name)
+            self._next()
+            args = []
+            if self._la() != RPAREN:
+                args.append(self.expr())
+                while self._la() == COMMA:
+                    self._next()
+                    args.append(self.expr())
+            self._expect(RPAREN)
+            return FuncCall(name, args)
+        if t == NUMBER:
+            return Literal(int(self._next()))
+        if t == BOOL:
+            return Literal(self._next() == "true")
+        if t == CHAR:
+            return Literal(self._next().strip("'"))
+        if t == STRING:
+            return Literal(self._next().strip('"'))
+        if t == LPAREN:
+            self._next()
+            expr = self.expr()
+            self._expect(RPAREN)
+            return expr
+        self._error()
@@ -0,0 +1,263 @@
+import time
+
+from antlr4 import CommonTokenStream, InputStream
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from antlr4.Lexer import TokenSource
+from antlr4.Token import CommonToken, Token
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from deobfuscator.parser.ObfuMiniCLexer import ObfuMiniCLexer
+from deobfuscator.parser.ObfuMiniCParser import ObfuMiniCParser
+from deobfuscator.ast_builder import ASTBuilder
+from deobfuscator.streaming_ast_builder import StreamingASTBuilder
+from deobfuscator.mmap_stream import MmapInputStream, map_file
+from deobfuscator import fast_lexer, fast_parser
+
+FRONTENDS = ("antlr", "fast")
+LEXERS = ("antlr", "bulk")
+PARSE_MODES = ("sll", "ll", "auto")
+BUILDERS = ("visitor", "listener")
+
+
+class TokenArraySource(TokenSource):
+    """
+    ANTLR TokenSource over a fast_lexer.TokenArray, so CommonTokenStream
+    and ObfuMiniCParser can consume bulk-lexed input.  CommonToken objects
+    are only created as the stream pulls them.
+    """
+
+    def __init__(self, tokens, source_name="<bulk>"):
+        self.tokens = tokens
+        self.source_name = source_name
+        self.pos = 0
+        self._factory = CommonTokenFactory.DEFAULT
+
+    @property
+    def line(self):
+        return self.tokens.lines[self.pos]
+
+    @property
+    def column(self):
+        return self.tokens.column(self.pos)
+
+    def nextToken(self):
+        tokens = self.tokens
+        i = self.pos
+        if i < len(tokens) - 1:
+            self.pos += 1
+        t = CommonToken((self, None), tokens.types[i], Token.DEFAULT_CHANNEL,
+                        tokens.starts[i], tokens.stops[i])
+        t.line = tokens.lines[i]
+        t.column = tokens.column(i)
+        t.text = tokens.text(i)
+        return t
+
+    def getInputStream(self):
+        return None
+
+    def getSourceName(self):
+        return self.source_name
+
+
+def load_program(path, frontend="antlr", mode="ll", builder="visitor", timings=None,
+                 lexer="antlr", cache=None):
+    """
+    Read a Mini-C file and build its AST with the selected frontend:
+
+      - "antlr": generated ObfuMiniCParser (see build_program), fed either by
+                 ObfuMiniCLexer or, with lexer="bulk", by fast_lexer
+      - "fast":  fast_lexer + hand-written recursive-descent parser; `mode`,
+                 `builder` and `lexer` do not apply
+
+    With an ASTCache, a previously built Program for the same source bytes
+    is returned without running the frontend at all.
+    """
+    if frontend not in FRONTENDS:
+        raise ValueError(f"Unknown frontend: {frontend}")
+    if lexer not in LEXERS:
+        raise ValueError(f"Unknown lexer: {lexer}")
+    if timings is None:
+        timings = {}
+
+    if cache is None:
+        return _load_uncached(path, frontend, mode, builder, timings, lexer)
+
+    # hash the mapped file, and parse the same mapping on a miss
+    start = time.perf_counter()
+    with map_file(path) as buf:
+        key = cache.key(buf, _cache_options(frontend, mode, builder, lexer))
+        return _load_cached(cache, key, start, timings,
+                            lambda: _load_text(buf, path, frontend, mode, builder,
+                                               timings, lexer))
+
+
+def load_source(source, frontend="antlr", mode="ll", builder="visitor", timings=None,
+                lexer="antlr", cache=None):
+    """
+    load_program for Mini-C source already in memory, as str or bytes.
+    Bytes go to ObfuMiniCLexer as they are, without decoding the whole
+    source first.
+    """
+    if frontend not in FRONTENDS:
+        raise ValueError(f"Unknown frontend: {frontend}")
+    if lexer not in LEXERS:
+        raise ValueError(f"Unknown lexer: {lexer}")
+    if timings is None:
+        timings = {}
+
+    if cache is None:
+        return _load_text(source, "<string>", frontend, mode, builder, timings, lexer)
+
+    start = time.perf_counter()
+    key = cache.key(source.encode() if isinstance(source, str) else source,
+                    _cache_options(frontend, mode, builder, lexer))
+    return _load_cached(cache, key, start, timings,
+                        lambda: _load_text(source, "<string>", frontend, mode, builder,
+                                           timings, lexer))
+
+
+def _cache_options(frontend, mode, builder, lexer):
+    # The options a cached AST was built with; the fast frontend has none
+    if frontend == "fast":
+        return (frontend,)
+    return (frontend, mode, builder, lexer)
+
+
+def _load_cached(cache, key, start, timings, load):
+    # `start` is when the caller began reading and hashing the source
+    prog = cache.get(key)
+    timings["cache/get"] = time.perf_counter() - start
+    if prog is not None:
+        return prog
+
+    prog = load()
+    start = time.perf_counter()
+    cache.put(key, prog)
+    timings["cache/put"] = time.perf_counter() - start
+    return prog
+
+
+def _load_uncached(path, frontend, mode, builder, timings, lexer):
+    if frontend == "antlr" and lexer == "antlr":
+        with map_file(path) as buf:
+            return build_program(MmapInputStream.from_bytes(buf, path), mode, builder, timings)
+
+    with open(path, encoding="ascii") as f:
+        source = f.read()
+    return _load_text(source, path, frontend, mode, builder, timings, lexer)
+
+
+def _load_text(source, name, frontend, mode, builder, timings, lexer):
+    if frontend == "antlr" and lexer == "antlr":
+        if isinstance(source, str):
+            stream = InputStream(source)
+        else:
+            stream = MmapInputStream.from_bytes(source, name)
+        return build_program(stream, mode, builder, timings)
+
+    if not isinstance(source, str):
+        source = bytes(source).decode("ascii")
+
+    start = time.perf_counter()
+    tokens = fast_lexer.tokenize(source)
+    timings["lex/bulk"] = time.perf_counter() - start
+
+    if frontend == "antlr":
+        return build_program(TokenArraySource(tokens, name), mode, builder, timings)
+
+    start = time.perf_counter()
+    prog = fast_parser.FastParser(tokens).compilation_unit()
+    timings["parse/fast"] = time.perf_counter() - start
+    return prog
+
+
+def build_program(input_stream, mode="ll", builder="visitor", timings=None):
+    """
+    Parse an ANTLR input stream (or a TokenSource) and build the
+    deobfuscator AST.
+
+      - "visitor":  parse the full tree, then run ASTBuilder over it
+      - "listener": attach StreamingASTBuilder to the parser and build the
+                    AST while parsing, without keeping a parse tree
+    """
+    if builder not in BUILDERS:
+        raise ValueError(f"Unknown AST builder: {builder}")
+    if timings is None:
+        timings = {}
+
+    if builder == "listener":
+        listener = StreamingASTBuilder()
+        parse_compilation_unit(input_stream, mode, timings, listener)
+        return listener.program
+
+    tree = parse_compilation_unit(input_stream, mode, timings)
+    start = time.perf_counter()
+    prog = ASTBuilder().visit(tree)
+    timings["build"] = time.perf_counter() - start
+    return prog
+
+
+def parse_compilation_unit(input_stream, mode="ll", timings=None, listener=None):
+    """
+    Parse an ANTLR input stream into a compilationUnit parse tree.  An
+    already-lexed TokenSource (e.g. TokenArraySource) is used as is.
+
+      - "ll":   full-LL prediction (ANTLR default)
+      - "sll":  SLL prediction only; syntax errors are reported as usual
+      - "auto": SLL with a bail-out error strategy first, re-parsing with
+                full LL only if the SLL pass fails
+
+    If `timings` is a dict, the seconds spent in each stage are stored
+    under "parse/sll" and "parse/ll".
+
+    If `listener` is given it is registered as a parse listener and no
+    parse tree is built; the returned context then has no sub-rule children.
+    """
+    if mode not in PARSE_MODES:
+        raise ValueError(f"Unknown parse mode: {mode}")
+    if timings is None:
+        timings = {}
+
+    if isinstance(input_stream, TokenSource):
+        lexer = input_stream
+    else:
+        lexer = ObfuMiniCLexer(input_stream)
+    stream = CommonTokenStream(lexer)
+    parser = ObfuMiniCParser(stream)
+    if listener is not None:
+        parser.buildParseTrees = False
+        parser.addParseListener(listener)
+
+    if mode == "ll":
+        return _timed(parser, PredictionMode.LL, timings, "parse/ll")
+
+    if mode == "sll":
+        return _timed(parser, PredictionMode.SLL, timings, "parse/sll")
+
+    # auto: SLL first, bail out on the first syntax error
+    parser._errHandler = BailErrorStrategy()
+    parser.removeErrorListeners()
+    try:
+        return _timed(parser, PredictionMode.SLL, timings, "parse/sll")
+    except ParseCancellationException:
+        pass
+
+    # SLL failed: rewind and retry with full LL and normal error reporting
+    stream.seek(0)
+    parser.reset()
+    parser._errHandler = DefaultErrorStrategy()
+    parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+    if listener is not None:
+        listener.reset()
+    return _timed(parser, PredictionMode.LL, timings, "parse/ll")
+
+
+def _timed(parser, prediction_mode, timings, key):
+    parser._interp.predictionMode = prediction_mode
+    start = time.perf_counter()
+    try:
+        return parser.compilationUnit()
+    finally:
+        timings[key] = time.perf_counter() - start
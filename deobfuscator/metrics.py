@@ -0,0 +1,147 @@
+import json
+import logging
+from collections import Counter
+
+logger = logging.getLogger("deobfuscator")
+
+METRICS_FORMATS = ("table", "json", "prometheus")
+
+
+class PassMetrics:
+    """Counters of one pass, summed over all its runs."""
+
+    __slots__ = ("runs", "visited", "rewritten", "seconds", "rule_hits")
+
+    def __init__(self):
+        self.runs = 0
+        self.visited = 0
+        self.rewritten = 0
+        self.seconds = 0.0
+        self.rule_hits = Counter()
+
+    def to_dict(self):
+        return {"runs": self.runs, "visited": self.visited, "rewritten": self.rewritten,
+                "seconds": self.seconds, "rules": dict(self.rule_hits)}
+
+
+class Metrics:
+    """
+    What the passes of one pipeline run did, per pass: how often it ran,
+    how many nodes it visited and rewrote, how often each of its rules
+    applied, and the time it took.  Techniques count locally and add their
+    totals here once per pass, so nothing is formatted while the passes
+    run; log() reports the rule totals once, at INFO level.
+    """
+
+    __slots__ = ("passes",)
+
+    def __init__(self):
+        self.passes = {}
+
+    def __getitem__(self, name) -> PassMetrics:
+        m = self.passes.get(name)
+        if m is None:
+            m = self.passes[name] = PassMetrics()
+        return m
+
+    def add(self, name, visited=0, rewritten=0, hits=None):
+        m = self[name]
+        m.visited += visited
+        m.rewritten += rewritten
+        if hits:
+            m.rule_hits.update(hits)
+
+    def add_run(self, name, seconds):
+        m = self[name]
+        m.runs += 1
+        m.seconds += seconds
+
+    def merge(self, other: "Metrics"):
+        # run counts and times are not merged: workers report their
+        # counters, the PassManager times the pass as a whole
+        for name, m in other.passes.items():
+            self.add(name, m.visited, m.rewritten, m.rule_hits)
+
+    def merge_all(self, other: "Metrics"):
+        """merge() including run counts and times, e.g. to sum over files."""
+        self.merge(other)
+        for name, m in other.passes.items():
+            self[name].runs += m.runs
+            self[name].seconds += m.seconds
+
+    def log(self):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        for name, m in self.passes.items():
+            if m.rule_hits:
+                logger.info("%s: %s", name, format_hits(m.rule_hits))
+
+    def to_dict(self):
+        return {name: m.to_dict() for name, m in self.passes.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls()
+        for name, d in data.items():
+            m = metrics[name]
+            m.runs, m.visited, m.rewritten = d["runs"], d["visited"], d["rewritten"]
+            m.seconds = d["seconds"]
+            m.rule_hits.update(d["rules"])
+        return metrics
+
+    def render(self, fmt="table"):
+        if fmt == "table":
+            return self.format_table()
+        if fmt == "json":
+            return json.dumps(self.to_dict(), indent=2) + "\n"
+        if fmt == "prometheus":
+            return self.format_prometheus()
+        raise ValueError(f"Unknown metrics format: {fmt}")
+
+    def format_table(self):
+        rows = [("pass", "runs", "visited", "rewritten", "time (s)", "rewritten/ms")]
+        for name, m in self.passes.items():
+            rate = f"{m.rewritten / (m.seconds * 1000):.1f}" if m.seconds else "-"
+            rows.append((name, str(m.runs), str(m.visited), str(m.rewritten),
+                         f"{m.seconds:.4f}", rate))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = ["  ".join(cell.ljust(w) if i == 0 else cell.rjust(w)
+                           for i, (cell, w) in enumerate(zip(row, widths))).rstrip()
+                 for row in rows]
+        lines.insert(1, "  ".join("-" * w for w in widths))
+        for name, m in self.passes.items():
+            for rule, n in m.rule_hits.most_common():
+                lines.append(f"  {name}: {rule}: {n}")
+        return "\n".join(lines) + "\n"
+
+    def format_prometheus(self):
+        """Prometheus text exposition format, one counter family per metric."""
+        families = (
+            ("deobfuscator_pass_runs_total", "Times the pass ran.", "runs"),
+            ("deobfuscator_pass_nodes_visited_total", "AST nodes visited by the pass.",
+             "visited"),
+            ("deobfuscator_pass_nodes_rewritten_total", "AST nodes rewritten by the pass.",
+             "rewritten"),
+            ("deobfuscator_pass_seconds_total", "Seconds spent in the pass.", "seconds"),
+        )
+        lines = []
+        for metric, help_text, field in families:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, m in self.passes.items():
+                lines.append(f'{metric}{{pass="{_label(name)}"}} {getattr(m, field)}')
+        metric = "deobfuscator_rule_hits_total"
+        lines.append(f"# HELP {metric} Times a rewrite rule of the pass applied.")
+        lines.append(f"# TYPE {metric} counter")
+        for name, m in self.passes.items():
+            for rule, n in m.rule_hits.items():
+                lines.append(f'{metric}{{pass="{_label(name)}",rule="{_label(rule)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_hits(hits):
+    return ", ".join(f"{rule} x{n}" for rule, n in hits.items())
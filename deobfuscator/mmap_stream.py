@@ -0,0 +1,100 @@
+import codecs
+import contextlib
+import mmap
+import re
+
+from antlr4.InputStream import InputStream
+from antlr4.Token import Token
+
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+@contextlib.contextmanager
+def map_file(path):
+    """
+    Context manager giving a read-only mmap of `path`, or b"" for an empty
+    file; the mapping is closed on exit.
+    """
+    buf = _map(path)
+    try:
+        yield buf
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            return b""
+
+
+class MmapInputStream(InputStream):
+    """
+    Drop-in replacement for antlr4.FileStream backed by a read-only mmap.
+
+    Mini-C sources are ASCII, so each byte already is the code point the
+    lexer asks for: LA() indexes the mapping directly and getText() decodes
+    only the requested slice, instead of FileStream's decoded str plus a
+    code-point list of the whole file.  Files with non-ASCII bytes fall back
+    to decoding everything with `encoding`, as FileStream does.
+
+    A stream opened on a path owns its mapping until it is garbage
+    collected; from_bytes() over map_file() closes it at a known point.
+    """
+
+    def __init__(self, fileName: str, encoding: str = "ascii", errors: str = "strict"):
+        self.name = "<empty>"
+        self.fileName = fileName
+        self._index = 0
+        self.strdata = None
+        self.data = None
+        self._load(_map(fileName), encoding, errors)
+
+    @classmethod
+    def from_bytes(cls, data, fileName="<bytes>", encoding="ascii", errors="strict"):
+        """The same stream over source bytes already in memory."""
+        self = cls.__new__(cls)
+        self.name = "<empty>"
+        self.fileName = fileName
+        self._index = 0
+        self.strdata = None
+        self.data = None
+        self._load(bytes(data) if isinstance(data, memoryview) else data, encoding, errors)
+        return self
+
+    def _load(self, buf, encoding, errors):
+        self._ascii = _NON_ASCII.search(buf) is None
+        if self._ascii:
+            self._buf = buf
+        else:
+            self.strdata = codecs.decode(buf[:], encoding, errors)
+            self.data = self._buf = [ord(c) for c in self.strdata]
+        self._size = len(self._buf)
+
+    def LA(self, offset: int):
+        if offset == 0:
+            return 0  # undefined
+        if offset < 0:
+            offset += 1  # e.g., translate LA(-1) to use offset=0
+        pos = self._index + offset - 1
+        if pos < 0 or pos >= self._size:  # invalid
+            return Token.EOF
+        return self._buf[pos]
+
+    def getText(self, start: int, stop: int):
+        if not self._ascii:
+            return super().getText(start, stop)
+        if stop >= self._size:
+            stop = self._size - 1
+        if start >= self._size:
+            return ""
+        return self._buf[start:stop + 1].decode("ascii")
+
+    def __str__(self):
+        if not self._ascii:
+            return self.strdata
+        return self._buf[:].decode("ascii")
@@ -0,0 +1,133 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from deobfuscator import serialization
+from deobfuscator.ast import Function, Program
+from deobfuscator.metrics import Metrics, logger
+from deobfuscator.symbols import SymbolTable
+
+# Chunks per worker: enough to even out uneven function sizes without
+# paying the round trip once per function
+CHUNKS_PER_JOB = 4
+
+
+class FunctionPool:
+    """
+    Runs the per-function part of passes on worker processes.
+
+    Functions travel in the binary AST format, a contiguous chunk per task.
+    Each task runs every requested step on its chunk in order, capturing
+    what the techniques log, and sends the functions and their rule counts
+    back.  Results are copied into the parent's Function objects, so they
+    keep their identity; functions no step changed are left alone, so
+    their nodes do too.  The captured log records are handed to the
+    parent's loggers step by step in function order, the same as a serial
+    run would log them.
+    """
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self._executor = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def run(self, prog: Program, steps, functions=None, metrics=None):
+        """
+        Run `steps`, a list of (pass name, context), over every function of
+        `prog` or only `functions`, adding the rule counts to `metrics`.
+        Returns, per step, the set of changed functions (None if the pass
+        cannot tell) and the seconds workers spent in it.
+        """
+        funcs = list(prog.functions if functions is None else functions)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.jobs)
+        size = max(1, -(-len(funcs) // (self.jobs * CHUNKS_PER_JOB)))
+        chunks = [funcs[i:i + size] for i in range(0, len(funcs), size)]
+        level = logger.getEffectiveLevel()
+        futures = [self._executor.submit(_run_chunk, serialization.dumps(chunk), steps, level)
+                   for chunk in chunks]
+
+        changed = [set() for _ in steps]
+        seconds = [0.0] * len(steps)
+        records = [[] for _ in steps]
+        for chunk, future in zip(chunks, futures):
+            data, chunk_changed, chunk_seconds, chunk_records, chunk_metrics = future.result()
+            if None in chunk_changed:
+                touched = range(len(chunk))
+            else:
+                touched = sorted(set().union(*chunk_changed))
+            new_funcs = serialization.loads(data, prog.symbols)
+            for i in touched:
+                old, new = chunk[i], new_funcs[i]
+                for field in Function._fields:
+                    setattr(old, field, getattr(new, field))
+            for k in range(len(steps)):
+                if chunk_changed[k] is None:
+                    changed[k] = None
+                elif changed[k] is not None:
+                    changed[k].update(chunk[i] for i in chunk_changed[k])
+                seconds[k] += chunk_seconds[k]
+                records[k].extend(chunk_records[k])
+            if metrics is not None:
+                metrics.merge(chunk_metrics)
+        for step_records in records:
+            for record in step_records:
+                logging.getLogger(record.name).handle(record)
+        return changed, seconds
+
+
+_worker_passes = None
+
+
+class _RecordList(logging.Handler):
+    # Keeps a worker's log records, made picklable, for the parent
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+def _run_chunk(data, steps, level):
+    global _worker_passes
+    if _worker_passes is None:
+        from deobfuscator.pass_manager import default_pass_manager
+        _worker_passes = default_pass_manager().passes
+
+    symbols = SymbolTable()
+    funcs = serialization.loads(data, symbols)
+    prog = Program(funcs, symbols)
+    index = {id(f): i for i, f in enumerate(funcs)}
+    metrics = Metrics()
+    changed, seconds, records = [], [], []
+    saved = logger.handlers, logger.propagate, logger.level
+    logger.propagate = False
+    logger.setLevel(level)
+    try:
+        for name, context in steps:
+            p = _worker_passes[name]
+            handler = _RecordList()
+            logger.handlers = [handler]
+            start = time.perf_counter()
+            result = p.run_local(prog, None, context, metrics)
+            seconds.append(time.perf_counter() - start)
+            records.append(handler.records)
+            if result is None:
+                changed.append(None)
+            elif result is False:
+                changed.append([])
+            else:
+                changed.append(sorted(index[id(f)] for f in result))
+    finally:
+        logger.handlers, logger.propagate = saved[0], saved[1]
+        logger.setLevel(saved[2])
+    return serialization.dumps(funcs), changed, seconds, records, metrics
@@ -0,0 +1,429 @@
+import time
+
+from deobfuscator.ast import Program
+from deobfuscator.techniques.dead_code_remover import DeadCodeRemover
+from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier
+from deobfuscator.techniques.control_flow_simplifier import ControlFlowSimplifier
+from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
+from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+from deobfuscator.techniques.fused_simplifier import FusedSimplifier
+from deobfuscator.parallel import FunctionPool
+from deobfuscator.metrics import Metrics
+
+# Every pass of default_pass_manager(), in the order it schedules them
+PASS_NAMES = ("dead", "expr", "control", "inline", "rename")
+
+# How often run_fixpoint lets a single pass run before giving up on it
+DEFAULT_MAX_ITERATIONS = 10
+
+
+class Pass:
+    """
+    One deobfuscation stage.
+
+    `requires` names passes that must run before this one when both are
+    scheduled (they are not pulled in otherwise).  `invalidates` names
+    passes whose work this one can undo or expose more of, so they have to
+    run again if scheduled after it.
+
+    `run(prog, functions=None, metrics=None)` works on every function, or
+    only on the given ones, adds its rule counts to `metrics`, and returns
+    the set of functions it changed; None means "unknown, assume
+    everything" and False "nothing".  With scope
+    "program" the pass can be enabled by a change anywhere, so it is
+    always re-run on the whole program.
+
+    A pass with `fuses` does the work of those passes, in that order, in
+    one walk; it stands in for them when they are scheduled back to back
+    and fusion is requested.
+
+    Function-scope passes can run on worker processes.  A program-scope
+    pass can too if it splits into `prepare(prog, metrics)`, its global phase,
+    run in the parent, and `local(prog, functions, context, metrics)`, run
+    on the workers with whatever `prepare` returned.
+
+    After a pass the manager re-indexes the functions it changed in the
+    program's call graph, if one was built, unless the pass has
+    `keeps_calls`: it updates the call graph itself.
+    """
+
+    def __init__(self, name, run, requires=(), invalidates=(), description="",
+                 fuses=(), scope="function", prepare=None, local=None, keeps_calls=False):
+        self.name = name
+        self.run = run
+        self.requires = tuple(requires)
+        self.invalidates = tuple(invalidates)
+        self.description = description or name
+        self.fuses = tuple(fuses)
+        self.scope = scope
+        self.prepare = prepare
+        self.local = local
+        self.keeps_calls = keeps_calls
+
+    def __repr__(self):
+        return f"Pass({self.name!r})"
+
+    @property
+    def parallel(self):
+        return self.scope == "function" or self.local is not None
+
+    def run_local(self, prog, functions, context, metrics=None):
+        if self.local is not None:
+            return self.local(prog, functions, context, metrics)
+        return self.run(prog, functions, metrics)
+
+
+class Cancelled(Exception):
+    """Raised by PassManager when its `cancelled` callback returns true."""
+
+
+class PassManager:
+    """
+    Orders registered passes by their prerequisites and runs them, keeping
+    per-pass timings.  A pass is skipped when it has already run and no
+    pass that invalidates it has changed the program since.
+
+    With `jobs` > 1 the per-function work of consecutive parallel passes
+    goes to a FunctionPool as one batch; `close()` shuts it down.
+
+    If `cancelled` is set to a callable, it is polled before every pass
+    and a true result stops the run with Cancelled.
+
+    Passes add their counters to `metrics` as they run; the manager adds
+    each pass's run count and time.
+    """
+
+    def __init__(self, jobs=1):
+        self.passes = {}
+        self.timings = {}
+        self.batch_timings = {}
+        self.runs = {}
+        self.skipped = []
+        self.capped = []
+        self._valid = set()
+        self.pool = FunctionPool(jobs) if jobs > 1 else None
+        self.cancelled = None
+        self.metrics = Metrics()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+    def register(self, p: Pass):
+        if p.name in self.passes:
+            raise ValueError(f"pass '{p.name}' is already registered")
+        self.passes[p.name] = p
+        return p
+
+    def schedule(self, names, fuse=False):
+        """
+        Requested passes in dependency order, ties kept in registration
+        order.  With `fuse`, runs of passes that a fused pass covers are
+        replaced by it.
+        """
+        wanted = []
+        for name in names:
+            if name not in self.passes:
+                raise KeyError(f"unknown pass '{name}'")
+            if name not in wanted:
+                wanted.append(name)
+        rank = {name: i for i, name in enumerate(self.passes)}
+        pending = sorted(wanted, key=rank.get)
+        order = []
+        done = set()
+        while pending:
+            for name in pending:
+                if all(dep in done or dep not in wanted for dep in self.passes[name].requires):
+                    break
+            else:
+                raise ValueError(f"cyclic pass prerequisites among {pending}")
+            pending.remove(name)
+            order.append(self.passes[name])
+            done.add(name)
+        if fuse:
+            order = self._fuse(order)
+        return order
+
+    def _fuse(self, order):
+        fused = [p for p in self.passes.values() if p.fuses]
+        out = []
+        i = 0
+        while i < len(order):
+            for f in fused:
+                n = len(f.fuses)
+                if tuple(p.name for p in order[i:i + n]) == f.fuses:
+                    out.append(f)
+                    i += n
+                    break
+            else:
+                out.append(order[i])
+                i += 1
+        return out
+
+    def run(self, prog: Program, names, fuse=False):
+        """Run the requested passes over `prog` in scheduled order."""
+        order = self.schedule(names, fuse)
+        if self.pool is None:
+            for p in order:
+                self.run_pass(prog, p)
+            return prog
+        i = 0
+        while i < len(order):
+            # a pass with a global phase has to start a new batch, so its
+            # prepare() sees everything scheduled before it already done
+            batch = []
+            while i < len(order) and order[i].parallel and not (batch and order[i].prepare):
+                batch.append(order[i])
+                i += 1
+            if not batch:
+                self.run_pass(prog, order[i])
+                i += 1
+                continue
+            batch = [p for p in batch if not self._is_valid(p)]
+            if batch:
+                self._execute_batch(prog, batch)
+        return prog
+
+    def run_fixpoint(self, prog: Program, names, fuse=False,
+                     max_iterations=DEFAULT_MAX_ITERATIONS):
+        """
+        Run the requested passes until none of them changes anything.
+
+        After the first run of each pass, a pass is only re-run when a pass
+        that invalidates it reports changes, and then only on the functions
+        that changed.  The earliest pending pass in schedule order always
+        goes first, so a pass only runs once everything before it has
+        settled.  No pass runs more than `max_iterations` times; the ones
+        that would have are listed in `capped`.
+        """
+        order = self.schedule(names, fuse)
+        pending = [None] * len(order)  # None: every function
+        while True:
+            for i, todo in enumerate(pending):
+                if todo is None or todo:
+                    break
+            else:
+                return prog
+            p = order[i]
+            pending[i] = set()
+            functions = None if todo is None else [f for f in prog.functions if f in todo]
+            changed, dirty = self._execute(prog, p, functions)
+            if not changed:
+                continue
+            enabled = set()
+            for c in self._covered(p):
+                enabled.update(c.invalidates)
+            for j, q in enumerate(order):
+                if q.name not in enabled and not enabled.intersection(q.fuses):
+                    continue
+                if self.runs.get(q.name, 0) >= max_iterations:
+                    if q.name not in self.capped:
+                        self.capped.append(q.name)
+                    continue
+                if dirty is None or q.scope == "program":
+                    pending[j] = None
+                elif pending[j] is not None:
+                    pending[j] |= dirty
+
+    def run_pass(self, prog: Program, p: Pass):
+        if self._is_valid(p):
+            return False
+        return self._execute(prog, p)[0]
+
+    def _is_valid(self, p):
+        if all(c.name in self._valid for c in self._covered(p)):
+            self.skipped.append(p.name)
+            return True
+        return False
+
+    def _covered(self, p):
+        return [self.passes[name] for name in p.fuses] or [p]
+
+    def _check_cancelled(self):
+        if self.cancelled is not None and self.cancelled():
+            raise Cancelled()
+
+    def _execute(self, prog, p, functions=None):
+        self._check_cancelled()
+        if self.pool is not None and p.parallel:
+            return self._execute_batch(prog, [p], functions)[0]
+        start = time.perf_counter()
+        result = p.run(prog, functions, self.metrics)
+        if not p.keeps_calls:
+            self._update_call_graph(prog, result)
+        return self._record(p, time.perf_counter() - start, result)
+
+    def _execute_batch(self, prog, batch, functions=None):
+        self._check_cancelled()
+        start = time.perf_counter()
+        steps = []
+        for p in batch:
+            context = None
+            if p.prepare is not None:
+                t = time.perf_counter()
+                context = p.prepare(prog, self.metrics)
+                self.timings[p.name] = self.timings.get(p.name, 0.0) + time.perf_counter() - t
+            steps.append((p.name, context))
+        results, seconds = self.pool.run(prog, steps, functions, self.metrics)
+        # the changed functions came back from the workers as new nodes
+        for result in results:
+            self._update_call_graph(prog, result)
+        label = "+".join(p.name for p in batch)
+        self.batch_timings[label] = self.batch_timings.get(label, 0.0) + time.perf_counter() - start
+        return [self._record(p, sec, result) for p, sec, result in zip(batch, seconds, results)]
+
+    def _record(self, p, seconds, result):
+        self.timings[p.name] = self.timings.get(p.name, 0.0) + seconds
+        self.metrics.add_run(p.name, seconds)
+        self.runs[p.name] = self.runs.get(p.name, 0) + 1
+        if result is None:
+            changed, dirty = True, None
+        elif result is False:
+            changed, dirty = False, set()
+        else:
+            changed, dirty = bool(result), set(result)
+        # A fused pass leaves the program as its passes would one by one
+        for c in self._covered(p):
+            if changed:
+                self._valid.difference_update(c.invalidates)
+            self._valid.add(c.name)
+        return changed, dirty
+
+    def _update_call_graph(self, prog, result):
+        graph = getattr(prog, "call_graph", None)
+        if graph is None or result is False:
+            return
+        if result is None:
+            graph.reset(prog.functions)
+        else:
+            graph.update(result)
+
+    def invalidate(self, names=None):
+        """Forget that passes have run, e.g. after editing the program by hand."""
+        if names is None:
+            self._valid.clear()
+        else:
+            self._valid.difference_update(names)
+
+
+def _publish(metrics, name, technique, rewritten=None):
+    if metrics is not None:
+        if rewritten is None:
+            rewritten = sum(technique.rule_hits.values())
+        metrics.add(name, technique.visited, rewritten, technique.rule_hits)
+
+
+def _dead(prog, functions=None, metrics=None):
+    dc = DeadCodeRemover()
+    dc.remove(prog, functions)
+    _publish(metrics, "dead", dc, dc.rewrites)
+    return dc.changed
+
+
+def _expr(prog, functions=None, metrics=None):
+    es = ExpressionSimplifier()
+    es.simplify(prog, functions)
+    _publish(metrics, "expr", es, es.rewrites)
+    return es.changed
+
+
+def _control(prog, functions=None, metrics=None):
+    cf = ControlFlowSimplifier()
+    for func in prog.functions if functions is None else functions:
+        cf.visit(func)
+    _publish(metrics, "control", cf)
+    return cf.changed
+
+
+def _inline(prog, functions=None, metrics=None):
+    ic = InlineReconstructor()
+    ic.reconstruct(prog, functions)
+    _publish(metrics, "inline", ic)
+    return ic.changed
+
+
+def _rename(prog, functions=None, metrics=None):
+    # function names and call sites are renamed program-wide; call sites
+    # are found through the call graph kept current after every pass
+    rn = SemanticNameRecoverer()
+    rn.recover(prog, call_graph=getattr(prog, "call_graph", None))
+    _publish(metrics, "rename", rn)
+    return None
+
+
+def _rename_prepare(prog, metrics=None):
+    rn = SemanticNameRecoverer()
+    rn.symbols = prog.symbols
+    func_name_map = rn.map_function_names(prog)
+    _publish(metrics, "rename", rn)
+    return func_name_map
+
+
+def _rename_local(prog, functions, func_name_map, metrics=None):
+    rn = SemanticNameRecoverer()
+    rn.symbols = prog.symbols
+    for func in prog.functions if functions is None else functions:
+        rn.recover_function(func, func_name_map)
+    _publish(metrics, "rename", rn)
+    return None
+
+
+def _dead_expr(prog, functions=None, metrics=None):
+    fs = FusedSimplifier()
+    fs.simplify(prog, functions)
+    _publish(metrics, "dead+expr", fs, fs.rewrites)
+    return fs.changed
+
+
+def default_pass_manager(jobs=1) -> PassManager:
+    pm = PassManager(jobs)
+    pm.register(Pass(
+        "dead", _dead,
+        invalidates=("expr",),
+        description="removing dead code",
+    ))
+    # The rules are not re-applied to their own results, so a changed
+    # function can simplify further on another run
+    pm.register(Pass(
+        "expr", _expr,
+        requires=("dead",),
+        invalidates=("dead", "expr"),
+        description="simplifying expressions",
+    ))
+    # Nothing re-enables control: it takes any top-level switch on a
+    # variable for a dispatcher, so a second run over an already
+    # simplified function could tear apart a genuine switch.  Reordering
+    # the blocks only moves statements, so it exposes nothing new to the
+    # statement-local dead code and expression rules either.
+    pm.register(Pass(
+        "control", _control,
+        requires=("dead", "expr"),
+        invalidates=("inline", "rename"),
+        description="simplifying control flow",
+    ))
+    # Matching compares against every function body, so a change anywhere
+    # can enable a reconstruction anywhere
+    pm.register(Pass(
+        "inline", _inline,
+        requires=("control",),
+        invalidates=("dead", "expr", "rename"),
+        description="reconstructing inlined functions",
+        scope="program",
+    ))
+    # Naming runs last: the renamer numbers locals in order of appearance,
+    # so it has to see the body after flattening and inlining are undone.
+    pm.register(Pass(
+        "rename", _rename,
+        requires=("dead", "expr", "control", "inline"),
+        description="recovering readable names",
+        scope="program",
+        prepare=_rename_prepare,
+        local=_rename_local,
+        keeps_calls=True,
+    ))
+    pm.register(Pass(
+        "dead+expr", _dead_expr,
+        fuses=("dead", "expr"),
+        description="removing dead code and simplifying expressions",
+    ))
+    return pm
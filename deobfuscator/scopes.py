@@ -0,0 +1,270 @@
+"""
+Per-function symbol table and def-use index.
+
+FunctionSymbols(func) walks a function once and resolves every identifier
+to a Symbol through C-style block scopes: the parameters and the body's
+top level form the function scope, every Block opens a nested one, and a
+declaration is visible from where it appears to the end of its scope.
+Names used without a visible declaration become orphan Symbols, one per
+name.  Each Symbol keeps its declaring node and every site that spells
+it, so a rename is a direct update of those sites, and passes can ask
+what a function declares, uses or calls without walking it again.
+
+A site is either a node whose `name` holds the identifier (Parameter,
+VariableDecl, Variable) or a (container, key) pair for a bare identifier
+string: a Scan argument or an Assignment target that was never wrapped
+in a Variable.  The index describes the function as it was built; renames
+through FunctionSymbols.rename() keep it valid, and so does replacing
+statements when the Symbols they declared are dropped with forget() and
+every identifier that moved is re-recorded with replace_site().  `calls`
+is not updated by either; other edits need a new index.
+"""
+from typing import Dict, List, Optional
+
+from deobfuscator.ast import *
+
+
+class Symbol:
+    """One variable of a function: its declaration and every site naming it."""
+
+    __slots__ = ("name", "decl", "scope", "sites")
+
+    def __init__(self, name: str, decl, scope: Optional["Scope"]):
+        self.name = name
+        # Parameter or VariableDecl; None for an orphan
+        self.decl = decl
+        # scope it is declared in; None for an orphan
+        self.scope = scope
+        # the declaration first, then the uses in walk order
+        self.sites = [] if decl is None else [decl]
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {len(self.sites)} sites)"
+
+    @property
+    def is_param(self):
+        return isinstance(self.decl, Parameter)
+
+    @property
+    def uses(self):
+        return self.sites if self.decl is None else self.sites[1:]
+
+
+class Scope:
+    """A function body or block and the Symbols declared directly in it."""
+
+    __slots__ = ("parent", "node", "symbols")
+
+    def __init__(self, parent: Optional["Scope"], node):
+        self.parent = parent
+        # the Function or Block that opens the scope
+        self.node = node
+        # in declaration order; a dict used as an ordered set, so a
+        # forgotten Symbol is dropped in O(1)
+        self.symbols: Dict[Symbol, None] = {}
+
+    def lookup(self, name: str) -> Optional[Symbol]:
+        """The innermost Symbol named `name` declared here or in an outer scope."""
+        scope = self
+        while scope is not None:
+            for symbol in reversed(scope.symbols):
+                if symbol.name == name:
+                    return symbol
+            scope = scope.parent
+        return None
+
+
+class FunctionSymbols:
+    """
+    Symbol table and def-use index of one function.
+
+      - scope:   the function scope; nested scopes hang off it by parent
+      - params:  parameter Symbols in order
+      - locals:  declared local Symbols in declaration order
+      - orphans: Symbols for names used without a declaration, in
+                 first-use order
+      - calls:   FuncCall nodes in the body, in walk order
+      - declarations: Parameter/VariableDecl node -> its Symbol
+    """
+
+    __slots__ = ("function", "scope", "params", "_locals", "orphans", "calls",
+                 "declarations", "_visible", "_orphans", "_sites")
+
+    def __init__(self, func: Function):
+        self.function = func
+        self.scope = Scope(None, func)
+        self.params = []
+        # ordered set, like Scope.symbols
+        self._locals = {}
+        self.orphans = []
+        self.calls = []
+        self.declarations = {}
+        # name -> stack of visible Symbols while walking
+        self._visible = {}
+        self._orphans = {}
+        # site key -> (Symbol, position in its sites), built on the first
+        # replace_site()
+        self._sites = None
+        for p in func.params:
+            self.params.append(self._declare(p, self.scope))
+        for s in func.body:
+            self._stmt(s, self.scope)
+        self._visible = self._orphans = None
+
+    @property
+    def locals(self) -> List[Symbol]:
+        return list(self._locals)
+
+    @property
+    def symbols(self) -> List[Symbol]:
+        return self.params + self.locals + self.orphans
+
+    def names(self):
+        """Every name the function declares or uses."""
+        return {symbol.name for symbol in self.symbols}
+
+    def rename(self, symbol: Symbol, new: str) -> int:
+        """Rename `symbol` at every site; returns the number of sites changed."""
+        if symbol.name == new:
+            return 0
+        for site in symbol.sites:
+            if type(site) is tuple:
+                container, key = site
+                if type(key) is int:
+                    container[key] = new
+                else:
+                    setattr(container, key, new)
+            else:
+                site.name = new
+        symbol.name = new
+        return len(symbol.sites)
+
+    def forget(self, decls):
+        """
+        Drop the Symbols declared by the local VariableDecls `decls`, which
+        were removed from the function together with every use of them.
+        """
+        for decl in decls:
+            symbol = self.declarations.pop(decl)
+            del symbol.scope.symbols[symbol]
+            del self._locals[symbol]
+            if self._sites is not None:
+                for site in symbol.sites:
+                    del self._sites[_site_key(site)]
+
+    def replace_site(self, old, new):
+        """
+        Record that the identifier spelled at site `old` is now at site
+        `new`, which takes the old site's place among its Symbol's sites.
+        """
+        if self._sites is None:
+            self._sites = {_site_key(site): (symbol, i) for symbol in self.symbols
+                           for i, site in enumerate(symbol.sites)}
+        symbol, i = entry = self._sites.pop(_site_key(old))
+        symbol.sites[i] = new
+        self._sites[_site_key(new)] = entry
+
+    # -------------------------
+    # Building
+    # -------------------------
+    def _declare(self, decl, scope: Scope) -> Symbol:
+        symbol = Symbol(decl.name, decl, scope)
+        scope.symbols[symbol] = None
+        self.declarations[decl] = symbol
+        self._visible.setdefault(decl.name, []).append(symbol)
+        return symbol
+
+    def _use(self, name, site):
+        if not name:
+            return
+        stack = self._visible.get(name)
+        if stack:
+            symbol = stack[-1]
+        else:
+            symbol = self._orphans.get(name)
+            if symbol is None:
+                symbol = self._orphans[name] = Symbol(name, None, None)
+                self.orphans.append(symbol)
+        symbol.sites.append(site)
+
+    def _block(self, block: Block, scope: Scope):
+        # declarations go out of view at the end of their block
+        inner = Scope(scope, block)
+        for s in block.items:
+            self._stmt(s, inner)
+        for symbol in inner.symbols:
+            self._visible[symbol.decl.name].pop()
+
+    def _stmt(self, s, scope: Scope):
+        if s is None:
+            return
+        if isinstance(s, VariableDecl):
+            self._locals[self._declare(s, scope)] = None
+            self._expr(s.init_expr, s, "init_expr")
+        elif isinstance(s, Assignment):
+            self._target(s)
+            self._expr(s.value, s, "value")
+        elif isinstance(s, ExpressionStmt):
+            self._expr(s.expr, s, "expr")
+        elif isinstance(s, Return):
+            self._expr(s.value, s, "value")
+        elif isinstance(s, IfStmt):
+            self._expr(s.condition, s, "condition")
+            self._stmt(s.then_branch, scope)
+            self._stmt(s.else_branch, scope)
+        elif isinstance(s, WhileStmt):
+            self._expr(s.condition, s, "condition")
+            self._stmt(s.body, scope)
+        elif isinstance(s, ForStmt):
+            self._expr(s.init, s, "init")
+            self._expr(s.cond, s, "cond")
+            self._expr(s.update, s, "update")
+            self._stmt(s.body, scope)
+        elif isinstance(s, Block):
+            self._block(s, scope)
+        elif isinstance(s, Print):
+            for i, a in enumerate(s.args):
+                self._expr(a, s.args, i)
+        elif isinstance(s, Scan):
+            for i, a in enumerate(s.args):
+                self._use(a, (s.args, i))
+        elif isinstance(s, Switch):
+            self._expr(s.expr, s, "expr")
+            for case in s.cases:
+                self._stmt(case.body, scope)
+            self._stmt(s.default, scope)
+
+    def _target(self, node):
+        if isinstance(node.target, Variable):
+            self._use(node.target.name, node.target)
+        elif isinstance(node.target, str):
+            self._use(node.target, (node, "target"))
+
+    def _expr(self, e, holder, key):
+        # `holder` and `key` locate `e`, for a bare identifier string
+        if e is None:
+            return
+        if isinstance(e, Variable):
+            self._use(e.name, e)
+        elif isinstance(e, BinaryOp):
+            self._expr(e.left, e, "left")
+            self._expr(e.right, e, "right")
+        elif isinstance(e, UnaryOp):
+            self._expr(e.operand, e, "operand")
+        elif isinstance(e, FuncCall):
+            self.calls.append(e)
+            for i, a in enumerate(e.args):
+                self._expr(a, e.args, i)
+        elif isinstance(e, Assignment):
+            self._target(e)
+            self._expr(e.value, e, "value")
+        elif isinstance(e, str):
+            self._use(e, (holder, key))
+
+
+def _site_key(site):
+    # sites are nodes or (container, key) pairs whose container may be a
+    # list, so both are keyed by identity
+    if type(site) is tuple:
+        return id(site[0]), site[1]
+    return id(site)
@@ -0,0 +1,261 @@
+"""
+Compact binary encoding of deobfuscator.ast trees.
+
+Layout (all integers are unsigned LEB128 varints unless noted):
+
+    b"MCAST" FORMAT_VERSION(1 byte)
+    string count, then per string: byte length + UTF-8 bytes
+    one encoded value (normally the Program)
+
+Values are written in post-order, each identified by a one-byte tag:
+None, False, True, int (zigzag varint), str (index into the string table),
+list (items first, then tag + length), or one of the node kinds below
+(its `_fields` in order first, then the tag).  Encoding and decoding
+are each a single loop over an explicit stack, so neither needs
+recursion however deeply expressions nest.  Identifiers, types,
+operators and format strings are stored once per file no matter how
+often they occur.
+"""
+import gc
+from operator import attrgetter
+
+from deobfuscator.ast import *
+from deobfuscator.symbols import SymbolTable
+
+MAGIC = b"MCAST"
+FORMAT_VERSION = 1
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_STR = 4
+TAG_LIST = 5
+TAG_NODE = 6
+
+# Tag order is part of the format: append new kinds, never reorder.
+NODE_CLASSES = (
+    Program, Function, Parameter, VariableDecl, ExpressionStmt, Return,
+    IfStmt, WhileStmt, ForStmt, Block, Print, Scan, Assignment, BinaryOp,
+    UnaryOp, Literal, Variable, FuncCall, Label, Goto, SwitchCase, Switch,
+)
+
+_KIND_BY_CLASS = {cls: (TAG_NODE + i, cls._fields) for i, cls in enumerate(NODE_CLASSES)}
+
+
+def dumps(node) -> bytes:
+    strings = {}
+    body = bytearray()
+    _encode(node, body, strings)
+
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _write_varint(out, len(strings))
+    for s in strings:
+        data = s.encode("utf-8")
+        _write_varint(out, len(data))
+        out += data
+    out += body
+    return bytes(out)
+
+
+def dump(node, fp):
+    fp.write(dumps(node))
+
+
+def loads(data: bytes, symbols: SymbolTable = None):
+    """
+    Decode one value.  Strings are interned into `symbols` when given (so
+    decoded nodes share names with an existing Program); a decoded
+    Program otherwise gets a fresh table built from the string table.
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a serialized Mini-C AST")
+    version = data[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported AST format version {version} (expected {FORMAT_VERSION})")
+    buf = bytes(data)
+    pos = len(MAGIC) + 1
+    count, pos = _read_varint(buf, pos)
+    strings = []
+    for _ in range(count):
+        n, pos = _read_varint(buf, pos)
+        strings.append(buf[pos:pos + n].decode("utf-8"))
+        pos += n
+    if symbols is not None:
+        strings = [symbols.intern(s) for s in strings]
+    # A decoded tree holds no reference cycles, so the collections its
+    # allocations would trigger find nothing; they are half of the time
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        node = _decode(buf, pos, strings)
+    finally:
+        if enabled:
+            gc.enable()
+    if isinstance(node, Program):
+        # decoded strings are already shared through the string table
+        node.symbols = symbols if symbols is not None else SymbolTable(strings)
+    return node
+
+
+def load(fp, symbols: SymbolTable = None):
+    return loads(fp.read(), symbols)
+
+
+# === Encoding ===
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+# Per node class: a getter for its field values, whether it has a single
+# field (the getter then returns the value itself) and its closing tag
+_ENCODE_KINDS = {cls: (attrgetter(*fields), len(fields) == 1, bytes((tag,)))
+                 for cls, (tag, fields) in _KIND_BY_CLASS.items()}
+
+# Encoded references to the first 128 strings
+_STR_REFS = [bytes((TAG_STR, i)) for i in range(0x80)]
+
+
+def _encode(root, out, strings):
+    # Post-order without recursion: `stack` holds, for every open node or
+    # list, the iterator over its parent's remaining children and the
+    # bytes that close the parent.  Leaves are written as they are met.
+    kinds = _ENCODE_KINDS
+    str_refs = _STR_REFS
+    append = out.append
+    stack = []
+    children = iter((root,))
+    close = b""
+    while True:
+        for value in children:
+            cls = type(value)
+            if cls is str:
+                idx = strings.get(value)
+                if idx is None:
+                    idx = strings[value] = len(strings)
+                if idx < 0x80:
+                    out += str_refs[idx]
+                else:
+                    append(TAG_STR)
+                    _write_varint(out, idx)
+            elif cls in kinds:
+                get, single, tag = kinds[cls]
+                if single:
+                    field = get(value)
+                    if type(field) is str:
+                        # Variable, Label, Goto: no need to open the node
+                        idx = strings.get(field)
+                        if idx is None:
+                            idx = strings[field] = len(strings)
+                        if idx < 0x80:
+                            out += str_refs[idx]
+                            out += tag
+                            continue
+                    field = (field,)
+                else:
+                    field = get(value)
+                stack.append((children, close))
+                children = iter(field)
+                close = tag
+                break
+            elif value is None:
+                append(TAG_NONE)
+            elif isinstance(value, list):
+                stack.append((children, close))
+                children = iter(value)
+                close = bytearray((TAG_LIST,))
+                _write_varint(close, len(value))
+                break
+            elif value is True:
+                append(TAG_TRUE)
+            elif value is False:
+                append(TAG_FALSE)
+            elif isinstance(value, int):
+                append(TAG_INT)
+                _write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+            elif isinstance(value, str):
+                # a str subclass
+                idx = strings.get(value)
+                if idx is None:
+                    idx = strings[value] = len(strings)
+                append(TAG_STR)
+                _write_varint(out, idx)
+            else:
+                raise TypeError(f"cannot serialize {type(value).__name__}")
+        else:
+            out += close
+            if not stack:
+                return
+            children, close = stack.pop()
+
+
+# === Decoding ===
+
+def _read_varint(buf, pos):
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    n = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _decode(buf, pos, strings):
+    kinds = [(cls, len(cls._fields)) for cls in NODE_CLASSES]
+    stack = []
+    push = stack.append
+    end = len(buf)
+    while pos < end:
+        tag = buf[pos]
+        pos += 1
+        if tag >= TAG_NODE:
+            try:
+                cls, n = kinds[tag - TAG_NODE]
+            except IndexError:
+                raise ValueError(f"corrupt AST data: unknown tag {tag} at offset {pos - 1}")
+            if n == 1:
+                push(cls(stack.pop()))
+            else:
+                args = stack[-n:]
+                del stack[-n:]
+                push(cls(*args))
+        elif tag == TAG_STR:
+            idx = buf[pos]
+            if idx < 0x80:
+                pos += 1
+            else:
+                idx, pos = _read_varint(buf, pos)
+            push(strings[idx])
+        elif tag == TAG_NONE:
+            push(None)
+        elif tag == TAG_LIST:
+            n, pos = _read_varint(buf, pos)
+            if n:
+                items = stack[-n:]
+                del stack[-n:]
+                push(items)
+            else:
+                push([])
+        elif tag == TAG_INT:
+            n, pos = _read_varint(buf, pos)
+            push((n >> 1) if not n & 1 else -((n + 1) >> 1))
+        elif tag == TAG_TRUE:
+            push(True)
+        elif tag == TAG_FALSE:
+            push(False)
+        else:
+            raise ValueError(f"corrupt AST data: unknown tag {tag} at offset {pos - 1}")
+    if len(stack) != 1:
+        raise ValueError("corrupt AST data: expected exactly one top-level value")
+    return stack[0]
@@ -0,0 +1,83 @@
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from deobfuscator.client import DEFAULT_HOST, DEFAULT_PORT
+
+
+class DeobfuscationServer(ThreadingHTTPServer):
+    """
+    Local HTTP daemon in front of a pool of warm worker processes.
+
+    POST /deobfuscate takes a JSON object with at least "source" (see
+    client.request) and answers with whatever `run(request)` returns on a
+    worker, as JSON; a request the pipeline fails on gets a 422 with
+    {"error"}.  GET /health answers {"ok": true}.  Workers are started and
+    warmed with `initializer` up front, so no request pays for imports.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, run, jobs=1, initializer=None):
+        super().__init__(address, _Handler)
+        self.run = run
+        self.pool = ProcessPoolExecutor(jobs, initializer=initializer)
+        # Start every worker now rather than on the first requests
+        for future in [self.pool.submit(_ping) for _ in range(jobs)]:
+            future.result()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"ok": True})
+        else:
+            self._reply(404, {"error": f"no such endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/deobfuscate":
+            return self._reply(404, {"error": f"no such endpoint: {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request.get("source"), str):
+                raise ValueError("'source' must be a string")
+        except (ValueError, AttributeError) as e:
+            return self._reply(400, {"error": f"bad request: {e}"})
+        try:
+            result = self.server.pool.submit(self.server.run, request).result()
+        except Exception as e:
+            return self._reply(422, {"error": f"{type(e).__name__}: {e}"})
+        self._reply(200, result)
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[*] {self.address_string()} {format % args}\n")
+
+
+def _ping():
+    return True
+
+
+def serve(run, host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=1, initializer=None):
+    """Run a DeobfuscationServer until interrupted."""
+    with DeobfuscationServer((host, port), run, jobs, initializer) as server:
+        print(f"[✓] Serving on http://{host}:{port} with {jobs} warm worker(s)")
+        sys.stdout.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
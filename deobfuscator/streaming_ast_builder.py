@@ -0,0 +1,256 @@
+from deobfuscator.parser.ObfuMiniCListener import ObfuMiniCListener
+from deobfuscator.ast import (
+    Program,
+    Function,
+    Parameter,
+    VariableDecl,
+    ExpressionStmt,
+    Return,
+    IfStmt,
+    WhileStmt,
+    ForStmt,
+    Block,
+    Print,
+    Scan,
+    Assignment,
+    BinaryOp,
+    UnaryOp,
+    FuncCall,
+    Variable,
+    Literal,
+    Goto,
+    Label,
+    Switch,
+    SwitchCase,
+)
+from deobfuscator.symbols import SymbolTable
+
+_PASS = object()
+
+
+class StreamingASTBuilder(ObfuMiniCListener):
+    """
+    Parse listener that builds the same AST as ASTBuilder while the parser
+    runs, so it can be used with `parser.buildParseTrees = False`.
+
+    Without parse trees a context only holds its own tokens, never its
+    sub-rule contexts.  Every rule therefore gets a frame on a value stack
+    (pushed on enter); sub-rules append their AST value to the parent frame
+    on exit, and each exitX combines its frame with the context's tokens.
+    Finished contexts are not referenced anywhere and are freed right away.
+    Rules without an exitX handler (stmt, expr, switchBlock) pass their
+    single child value through.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.program = None
+        self.symbols = SymbolTable()
+        self._frames = [[]]
+        self._result = _PASS
+
+    # === Value stack ===
+
+    def enterEveryRule(self, ctx):
+        self._frames.append([])
+
+    def exitEveryRule(self, ctx):
+        frame = self._frames.pop()
+        result = self._result
+        self._result = _PASS
+        if result is _PASS:
+            result = frame[0] if frame else None
+        self._frames[-1].append(result)
+
+    def _values(self):
+        return self._frames[-1]
+
+    def _name(self, node):
+        return self.symbols.intern(node.getText())
+
+    # === Program structure ===
+
+    def exitCompilationUnit(self, ctx):
+        functions = [v for v in self._values() if isinstance(v, Function)]
+        self.program = self._result = Program(functions, self.symbols)
+
+    def exitFuncDef(self, ctx):
+        values = self._values()
+        return_type = values[0]
+        params = values[1] if len(values) == 3 else []
+        block = values[-1]
+        self._result = Function(
+            return_type, self._name(ctx.ID()), params,
+            block.items if isinstance(block, Block) else []
+        )
+
+    def exitParamList(self, ctx):
+        self._result = list(self._values())
+
+    def exitParam(self, ctx):
+        self._result = Parameter(self._values()[0], self._name(ctx.ID()))
+
+    def exitType(self, ctx):
+        self._result = self._name(ctx)
+
+    def exitVarDecl(self, ctx):
+        var_type, inits = self._values()
+        self._result = [VariableDecl(var_type, name, expr) for name, expr in inits]
+
+    def exitInitList(self, ctx):
+        self._result = list(self._values())
+
+    def exitInit(self, ctx):
+        values = self._values()
+        self._result = (self._name(ctx.ID()), values[0] if values else None)
+
+    # === Statements ===
+
+    def exitBlockStmt(self, ctx):
+        stmts = []
+        for result in self._values():
+            if result is None:
+                continue
+            if isinstance(result, list):
+                stmts.extend(result)
+            else:
+                stmts.append(result)
+        self._result = Block(stmts)
+
+    def exitExprStmt(self, ctx):
+        values = self._values()
+        self._result = ExpressionStmt(values[0] if values else None)
+
+    def exitReturnStmt(self, ctx):
+        values = self._values()
+        self._result = Return(values[0] if values else None)
+
+    def exitIfStmt(self, ctx):
+        values = self._values()
+        else_branch = values[2] if ctx.ELSE() else None
+        self._result = IfStmt(values[0], values[1], else_branch)
+
+    def exitLoopStmt(self, ctx):
+        values = self._values()
+        if ctx.WHILE():
+            self._result = WhileStmt(values[0], values[1])
+        else:
+            # like ASTBuilder, optional clauses are taken in order of appearance
+            exprs = values[:-1]
+            init = exprs[0] if len(exprs) > 0 else None
+            cond = exprs[1] if len(exprs) > 1 else None
+            update = exprs[2] if len(exprs) > 2 else None
+            self._result = ForStmt(init, cond, update, values[-1])
+
+    def exitIoStmt(self, ctx):
+        fmt = ctx.STRING().getText().strip('"')
+        if ctx.PRINTF():
+            self._result = Print(fmt, list(self._values()))
+        else:
+            args = [self.symbols.intern(tok.getText().replace("&", "")) for tok in ctx.ID()]
+            self._result = Scan(fmt, args)
+
+    def exitSwitchStmt(self, ctx):
+        values = self._values()
+        cases = []
+        default = None
+        for block in values[1:]:
+            if isinstance(block, SwitchCase):
+                block.label = Label(f"case_{len(cases)}")
+                cases.append(block)
+            else:
+                default = block
+        self._result = Switch(values[0], cases, default)
+
+    def exitCaseBlock(self, ctx):
+        values = self._values()
+        self._result = SwitchCase(values[0], None, Block(values[1:]))
+
+    def exitDefaultBlock(self, ctx):
+        self._result = Block(list(self._values()))
+
+    def exitGotoStmt(self, ctx):
+        self._result = Goto(self._name(ctx.ID()))
+
+    def exitLabelStmt(self, ctx):
+        self._result = Label(self._name(ctx.ID()))
+
+    def exitLiteral(self, ctx):
+        if ctx.NUMBER():
+            self._result = Literal(int(ctx.NUMBER().getText()))
+        elif ctx.CHAR():
+            self._result = Literal(ctx.CHAR().getText())
+        elif ctx.BOOL():
+            self._result = Literal(ctx.BOOL().getText() == "true")
+        else:
+            self._result = None
+
+    # === Expressions ===
+
+    def exitAssignExpr(self, ctx):
+        values = self._values()
+        if len(values) == 2:
+            # the target's sub-tree is gone; recover its text from the tokens
+            eq = ctx.getChild(0).symbol
+            target_text = ctx.parser.getTokenStream().getText(
+                ctx.start.tokenIndex, eq.tokenIndex - 1
+            )
+            self._result = Assignment(Variable(self.symbols.intern(target_text)), values[1])
+
+    def exitLogicOrExpr(self, ctx):
+        self._result = self._fold_fixed("||")
+
+    def exitLogicAndExpr(self, ctx):
+        self._result = self._fold_fixed("&&")
+
+    def exitEqualityExpr(self, ctx):
+        self._result = self._fold(ctx)
+
+    def exitRelationalExpr(self, ctx):
+        self._result = self._fold(ctx)
+
+    def exitAddExpr(self, ctx):
+        self._result = self._fold(ctx)
+
+    def exitMulExpr(self, ctx):
+        self._result = self._fold(ctx)
+
+    def exitUnaryExpr(self, ctx):
+        values = self._values()
+        if ctx.getChildCount() == 1:
+            self._result = UnaryOp(ctx.getChild(0).getText(), values[0])
+
+    def exitPrimaryExpr(self, ctx):
+        values = self._values()
+        if ctx.ID() and ctx.LPAREN():
+            self._result = FuncCall(self._name(ctx.ID()), values[0] if values else [])
+        elif ctx.ID():
+            self._result = Variable(self._name(ctx.ID()))
+        elif ctx.NUMBER():
+            self._result = Literal(int(ctx.NUMBER().getText()))
+        elif ctx.BOOL():
+            self._result = Literal(ctx.BOOL().getText() == "true")
+        elif ctx.CHAR():
+            self._result = Literal(ctx.CHAR().getText().strip("'"))
+        elif ctx.STRING():
+            self._result = Literal(ctx.STRING().getText().strip('"'))
+
+    def exitArgList(self, ctx):
+        self._result = list(self._values())
+
+    def _fold_fixed(self, op):
+        values = self._values()
+        left = values[0]
+        for right in values[1:]:
+            left = BinaryOp(op, left, right)
+        return left
+
+    def _fold(self, ctx):
+        # only operator tokens are attached to binary-expression contexts
+        values = self._values()
+        left = values[0]
+        for i, right in enumerate(values[1:]):
+            left = BinaryOp(ctx.getChild(i).getText(), left, right)
+        return left
@@ -0,0 +1,44 @@
+class SymbolTable:
+    """
+    Per-program intern table for identifiers.
+
+    `intern(name)` returns the one shared str object for that spelling and
+    gives it a small integer id (`id(name)`, `name(sid)`).  Because every
+    occurrence in the AST is the same object, name equality checks in the
+    passes are pointer comparisons and dict lookups hit on identity, and
+    repeated identifiers are stored once.
+    """
+
+    __slots__ = ("_ids", "_names")
+
+    def __init__(self, names=()):
+        self._ids = {}
+        self._names = []
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name: str) -> str:
+        sid = self._ids.get(name)
+        if sid is None:
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+            return name
+        return self._names[sid]
+
+    def id(self, name: str) -> int:
+        sid = self._ids.get(name)
+        if sid is None:
+            sid = self._ids[self.intern(name)]
+        return sid
+
+    def name(self, sid: int) -> str:
+        return self._names[sid]
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
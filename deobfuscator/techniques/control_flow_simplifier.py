@@ -1,17 +1,29 @@
+import logging
+from collections import Counter
+
 from deobfuscator.ast import *
 
+logger = logging.getLogger(__name__)
+
 class ControlFlowSimplifier:
 
+    def __init__(self):
+        # functions whose flattening was undone
+        self.changed = set()
+        self.visited = 0
+        self.rule_hits = Counter()
 
     def visit(self, node):
         if node is None: return None
+        self.visited += 1
         method_name = f'visit_{type(node).__name__}'
         visitor = getattr(self, method_name, self.generic_visit)
         return visitor(node)
 
     def generic_visit(self, node):
         if not isinstance(node, ASTNode): return node
-        for field, value in vars(node).items():
+        for field in node._fields:
+            value = getattr(node, field)
             if isinstance(value, list):
                 new_list = [self.visit(item) for item in value]
                 setattr(node, field, new_list)
@@ -32,12 +44,14 @@ class ControlFlowSimplifier:
     def visit_Function(self, node: Function):
 
         flat_body = self._flatten_body(node.body)
+        self.visited += len(flat_body)
 
         artifacts = self._find_flattening_artifacts(flat_body)
         if not artifacts:
             return node
 
-        print(f"INFO: Control flow flattening detected in function '{node.name}'. Simplifying...")
+        logger.debug("control in %s: switch dispatcher unflattened", node.name)
+        self.rule_hits["switch dispatcher unflattened"] += 1
         state_var_name, switch_node = artifacts
 
         code_blocks = self._extract_code_blocks(flat_body)
@@ -53,6 +67,7 @@ class ControlFlowSimplifier:
         
         final_body.extend(reordered_stmts)
         node.body = final_body
+        self.changed.add(node)
         return node
 
     def _find_flattening_artifacts(self, body: list):
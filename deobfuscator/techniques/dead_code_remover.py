@@ -1,16 +1,54 @@
+from collections import Counter
+
 from deobfuscator.ast import *
 
+# Rule names, as counted in DeadCodeRemover.rule_hits
+IF_ZERO = "if (0) removed"
+UNUSED_DECL = "unused_* declaration dropped"
+UNUSED_ASSIGN = "unused_* assignment dropped"
+NO_OP = "no-op expression statement dropped"
+WRAPPED = "body wrapped in block"
+UNUSED_OPERAND = "unused_* operand pruned"
+EMPTY_ARG = "empty call argument dropped"
+
 class DeadCodeRemover:
-    def remove(self, prog: Program):
-        for func in prog.functions:
+    def __init__(self):
+        self._unused = {}
+        # number of rewrites made so far, and the functions they were made in
+        self.rewrites = 0
+        self.changed = set()
+        # statements and expressions looked at, and times each rule applied
+        self.visited = 0
+        self.rule_hits = Counter()
+
+    def remove(self, prog: Program, functions=None):
+        """Clean up every function of `prog`, or only those in `functions`."""
+        self.prepare(prog)
+        for func in prog.functions if functions is None else functions:
+            before = self.rewrites
             func.body = self._remove_block(func.body)
+            if self.rewrites != before:
+                self.changed.add(func)
+
+    def prepare(self, prog: Program):
+        # Classify every interned identifier once; the passes below then only
+        # do dict hits on the shared name objects
+        self._unused = {name: name.startswith("unused_") for name in prog.symbols}
+
+    def _is_unused(self, name):
+        hit = self._unused.get(name)
+        if hit is None:
+            hit = self._unused[name] = name.startswith("unused_")
+        return hit
 
     def _remove_block(self, stmts):
         new = []
+        self.visited += len(stmts)
         for s in stmts:
             # If (0) → dead
             if isinstance(s, IfStmt):
                 if isinstance(s.condition, Literal) and s.condition.value == 0:
+                    self.rule_hits[IF_ZERO] += 1
                     continue
                 s.then_branch = self._wrap(s.then_branch)
                 if s.else_branch:
@@ -19,7 +57,8 @@ class DeadCodeRemover:
 
             # Drop unused_* vars entirely
             elif isinstance(s, VariableDecl):
-                if s.name.startswith("unused_"):
+                if self._is_unused(s.name):
+                    self.rule_hits[UNUSED_DECL] += 1
                     continue
                 if s.init_expr:
                     s.init_expr = self._simplify_expr(s.init_expr)
@@ -28,7 +67,8 @@ class DeadCodeRemover:
             # Drop assignments to unused_*
             elif isinstance(s, Assignment):
                 target_name = s.target if isinstance(s.target, str) else getattr(s.target, "name", "")
-                if target_name.startswith("unused_"):
+                if self._is_unused(target_name):
+                    self.rule_hits[UNUSED_ASSIGN] += 1
                     continue
                 s.value = self._simplify_expr(s.value)
                 new.append(s)
@@ -36,14 +76,18 @@ class DeadCodeRemover:
             # ExpressionStmt cleanup
             elif isinstance(s, ExpressionStmt):
                 if s.expr is None: 
+                    self.rule_hits[NO_OP] += 1
                     continue
                 if isinstance(s.expr, Literal): 
+                    self.rule_hits[NO_OP] += 1
                     continue
-                if isinstance(s.expr, Variable) and s.expr.name.startswith("unused_"):
+                if isinstance(s.expr, Variable) and self._is_unused(s.expr.name):
+                    self.rule_hits[NO_OP] += 1
                     continue
                 if isinstance(s.expr, Assignment):
                     target_name = s.expr.target if isinstance(s.expr.target, str) else getattr(s.expr.target, "name", "")
-                    if target_name.startswith("unused_"):
+                    if self._is_unused(target_name):
+                        self.rule_hits[UNUSED_ASSIGN] += 1
                         continue
                 s.expr = self._simplify_expr(s.expr)
                 new.append(s)
@@ -66,27 +110,46 @@ class DeadCodeRemover:
 
             else:
                 new.append(s)
+        self.rewrites += len(stmts) - len(new)
         return new
 
     def _wrap(self, s):
         if isinstance(s, Block):
             s.items = self._remove_block(s.items)
             return s
+        self.rewrites += 1
+        self.rule_hits[WRAPPED] += 1
         return Block(self._remove_block([s]))
 
     def _simplify_expr(self, expr):
         if expr is None: return None
-        if isinstance(expr, Variable) and expr.name.startswith("unused_"):
+        self.visited += 1
+        if isinstance(expr, Variable) and self._is_unused(expr.name):
+            self.rewrites += 1
+            self.rule_hits[UNUSED_OPERAND] += 1
             return None
+        # Nodes are updated in place, so what is left keeps its identity
+        # (the call graph points at FuncCall nodes)
         if isinstance(expr, BinaryOp):
-            return BinaryOp(expr.op, self._simplify_expr(expr.left), self._simplify_expr(expr.right))
+            expr.left = self._simplify_expr(expr.left)
+            expr.right = self._simplify_expr(expr.right)
+            return expr
         if isinstance(expr, UnaryOp):
-            return UnaryOp(expr.op, self._simplify_expr(expr.operand))
+            expr.operand = self._simplify_expr(expr.operand)
+            return expr
         if isinstance(expr, FuncCall):
-            return FuncCall(expr.name, [self._simplify_expr(a) for a in expr.args if a])
+            args = [a for a in expr.args if a]
+            if len(args) != len(expr.args):
+                self.rewrites += len(expr.args) - len(args)
+                self.rule_hits[EMPTY_ARG] += len(expr.args) - len(args)
+            expr.args = [self._simplify_expr(a) for a in args]
+            return expr
         if isinstance(expr, Assignment):
             target_name = expr.target if isinstance(expr.target, str) else getattr(expr.target, "name", "")
-            if target_name.startswith("unused_"):
+            if self._is_unused(target_name):
+                self.rewrites += 1
+                self.rule_hits[UNUSED_ASSIGN] += 1
                 return None
-            return Assignment(expr.target, self._simplify_expr(expr.value))
+            expr.value = self._simplify_expr(expr.value)
+            return expr
         return expr
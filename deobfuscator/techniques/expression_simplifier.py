@@ -1,73 +1,122 @@
+import logging
+from collections import Counter
+
 from deobfuscator.ast import *
+from deobfuscator.metrics import format_hits
+
+logger = logging.getLogger(__name__)
+
+# Node types generic_visit descends into when they sit directly in a field
+# (list items are always visited)
+VISITED_FIELD_TYPES = (Program, Function, VariableDecl, BinaryOp, UnaryOp,
+                       Literal, IfStmt, WhileStmt, ForStmt, Block, Return,
+                       ExpressionStmt, Print, Assignment)
 
 class ExpressionSimplifier:
-    def simplify(self, prog: Program):
+    def __init__(self):
+        # number of rewrites made so far, and the functions they were made in
+        self.rewrites = 0
+        self.changed = set()
+        # nodes visited, and times each algebraic rule was applied
+        self.visited = 0
+        self.rule_hits = Counter()
+
+    def simplify(self, prog: Program, functions=None):
         """
         Entry point: walk over all functions/statements in the program
-        and simplify expressions.
+        (or only those in `functions`) and simplify expressions.
         """
-        return self.visit(prog)
+        for func in prog.functions if functions is None else functions:
+            self.visit(func)
+        return prog
 
     def visit(self, node):
         if node is None:
             return None
+        self.visited += 1
 
         method_name = f'visit_{type(node).__name__}'
         visitor = getattr(self, method_name, self.generic_visit)
         return visitor(node)
 
     def generic_visit(self, node):
-        for field, value in vars(node).items():
+        for field in getattr(node, "_fields", ()):
+            value = getattr(node, field)
             if isinstance(value, list):
                 new_list = []
                 for item in value:
                     new_item = self.visit(item)
                     if new_item:
                         new_list.append(new_item)
+                self.rewrites += len(value) - len(new_list)
                 setattr(node, field, new_list)
-            elif isinstance(value, (Program, Function, VariableDecl, BinaryOp,
-                                    UnaryOp, Literal, IfStmt, WhileStmt, ForStmt,
-                                    Block, Return, ExpressionStmt, Print, Assignment)):
+            elif isinstance(value, VISITED_FIELD_TYPES):
                 setattr(node, field, self.visit(value))
         return node
 
+    def visit_Function(self, node):
+        before = self.rewrites
+        hits = Counter(self.rule_hits) if logger.isEnabledFor(logging.DEBUG) else None
+        self.generic_visit(node)
+        if self.rewrites != before:
+            self.changed.add(node)
+            if hits is not None:
+                log_function_hits(node, self.rule_hits - hits)
+        return node
+
     def visit_BinaryOp(self, node):
         node.left = self.visit(node.left)
         node.right = self.visit(node.right)
+        return self.rewrite_BinaryOp(node)
 
+    def rewrite_BinaryOp(self, node):
+        """Apply the BinaryOp rules to a node whose operands are already simplified."""
         # Simplify "a - (-b)" -> "a + b"
         if (node.op == '-' and isinstance(node.right, UnaryOp) and node.right.op == '-'):
-            print("INFO: Simplifying pattern a - (-b) to a + b")
+            self.rule_hits["a - (-b) -> a + b"] += 1
+            self.rewrites += 1
             return BinaryOp('+', node.left, node.right.operand)
 
         # Simplify "a + 0" -> "a"
         if (node.op == '+' and isinstance(node.right, Literal) and node.right.value == 0):
-            print("INFO: Simplifying pattern a + 0 to a")
+            self.rule_hits["a + 0 -> a"] += 1
+            self.rewrites += 1
             return node.left
 
         # Simplify "a - 0" -> "a"
         if (node.op == '-' and isinstance(node.right, Literal) and node.right.value == 0):
-            print("INFO: Simplifying pattern a - 0 to a")
+            self.rule_hits["a - 0 -> a"] += 1
+            self.rewrites += 1
             return node.left
 
         # Simplify "a * 1" -> "a"
         if (node.op == '*' and isinstance(node.right, Literal) and node.right.value == 1):
-            print("INFO: Simplifying pattern a * 1 to a")
+            self.rule_hits["a * 1 -> a"] += 1
+            self.rewrites += 1
             return node.left
 
         # Simplify "a * 0" -> 0
         if (node.op == '*' and isinstance(node.right, Literal) and node.right.value == 0):
-            print("INFO: Simplifying pattern a * 0 to 0")
+            self.rule_hits["a * 0 -> 0"] += 1
+            self.rewrites += 1
             return Literal(0)
 
         return node
 
     def visit_UnaryOp(self, node):
         node.operand = self.visit(node.operand)
+        return self.rewrite_UnaryOp(node)
 
+    def rewrite_UnaryOp(self, node):
         # Simplify double negation: !!a -> a
         if node.op == '!' and isinstance(node.operand, UnaryOp) and node.operand.op == '!':
-            print("INFO: Simplifying !!a to a")
+            self.rule_hits["!!a -> a"] += 1
+            self.rewrites += 1
             return node.operand.operand
 
         return node
+
+
+def log_function_hits(func, hits):
+    if hits:
+        logger.debug("expr in %s: %s", func.name, format_hits(hits))
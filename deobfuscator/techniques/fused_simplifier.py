@@ -0,0 +1,217 @@
+import logging
+from collections import Counter
+
+from deobfuscator.ast import *
+from deobfuscator.techniques.dead_code_remover import (
+    DeadCodeRemover, EMPTY_ARG, IF_ZERO, NO_OP, UNUSED_ASSIGN, UNUSED_DECL, UNUSED_OPERAND,
+    WRAPPED,
+)
+from deobfuscator.techniques.expression_simplifier import (
+    ExpressionSimplifier, VISITED_FIELD_TYPES, log_function_hits, logger,
+)
+
+
+class FusedSimplifier:
+    """
+    DeadCodeRemover followed by ExpressionSimplifier in a single walk.
+
+    Each statement gets its dead-code decision (if (0), unused_* decls and
+    assignments) first, then its expressions are rebuilt bottom-up with the
+    unused_* pruning and the algebraic rules applied at the same node, so
+    every node is visited once instead of once per technique.  The result,
+    including the rule counts, is the same as running the two techniques
+    one after the other.
+    """
+
+    def __init__(self):
+        self.dead = DeadCodeRemover()
+        self.expr = ExpressionSimplifier()
+        self.changed = set()
+        self._visited = 0
+
+    @property
+    def rewrites(self):
+        return self.dead.rewrites + self.expr.rewrites
+
+    @property
+    def visited(self):
+        return self._visited + self.dead.visited + self.expr.visited
+
+    @property
+    def rule_hits(self):
+        return self.dead.rule_hits + self.expr.rule_hits
+
+    def simplify(self, prog: Program, functions=None):
+        self.dead.prepare(prog)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for func in prog.functions if functions is None else functions:
+            before = self.rewrites
+            hits = Counter(self.expr.rule_hits) if debug else None
+            func.body = self._block(func.body)
+            if self.rewrites != before:
+                self.changed.add(func)
+                if debug:
+                    log_function_hits(func, self.expr.rule_hits - hits)
+        return prog
+
+    def _block(self, stmts):
+        new = []
+        self._visited += len(stmts)
+        for s in stmts:
+            s = self._stmt(s)
+            if s:
+                new.append(s)
+        self.dead.rewrites += len(stmts) - len(new)
+        return new
+
+    def _wrap(self, s):
+        if isinstance(s, Block):
+            s.items = self._block(s.items)
+            return s
+        self.dead.rewrites += 1
+        self.dead.rule_hits[WRAPPED] += 1
+        return Block(self._block([s]))
+
+    def _stmt(self, s):
+        dead = self.dead
+        if isinstance(s, IfStmt):
+            if isinstance(s.condition, Literal) and s.condition.value == 0:
+                dead.rule_hits[IF_ZERO] += 1
+                return None
+            if isinstance(s.condition, VISITED_FIELD_TYPES):
+                s.condition = self._visit(s.condition)
+            s.then_branch = self._wrap(s.then_branch)
+            if s.else_branch:
+                s.else_branch = self._wrap(s.else_branch)
+            return s
+
+        if isinstance(s, VariableDecl):
+            if dead._is_unused(s.name):
+                dead.rule_hits[UNUSED_DECL] += 1
+                return None
+            if s.init_expr:
+                s.init_expr = self._field(s.init_expr)
+            return s
+
+        if isinstance(s, Assignment):
+            if dead._is_unused(self._target_name(s.target)):
+                dead.rule_hits[UNUSED_ASSIGN] += 1
+                return None
+            s.value = self._field(s.value)
+            return s
+
+        if isinstance(s, ExpressionStmt):
+            e = s.expr
+            if e is None or isinstance(e, Literal):
+                dead.rule_hits[NO_OP] += 1
+                return None
+            if isinstance(e, Variable) and dead._is_unused(e.name):
+                dead.rule_hits[NO_OP] += 1
+                return None
+            if isinstance(e, Assignment) and dead._is_unused(self._target_name(e.target)):
+                dead.rule_hits[UNUSED_ASSIGN] += 1
+                return None
+            s.expr = self._field(e)
+            return s
+
+        if isinstance(s, Block):
+            s.items = self._block(s.items)
+            return s
+
+        if isinstance(s, WhileStmt):
+            s.condition = self._field(s.condition)
+            s.body = self._wrap(s.body)
+            return s
+
+        if isinstance(s, ForStmt):
+            if s.init: s.init = self._field(s.init)
+            if s.cond: s.cond = self._field(s.cond)
+            if s.update: s.update = self._field(s.update)
+            s.body = self._wrap(s.body)
+            return s
+
+        # Statements the dead-code rules leave alone only get simplified
+        if isinstance(s, Return):
+            if isinstance(s.value, VISITED_FIELD_TYPES):
+                s.value = self._visit(s.value)
+            return s
+        if isinstance(s, Print):
+            s.args = self._visit_list(s.args)
+            return s
+        return self.expr.visit(s)
+
+    def _target_name(self, target):
+        return target if isinstance(target, str) else getattr(target, "name", "")
+
+    def _visit(self, e):
+        # ExpressionSimplifier.visit without the dead-code rules, with the
+        # common expression kinds dispatched inline
+        self._visited += 1
+        t = type(e)
+        if t is BinaryOp:
+            e.left = self._visit(e.left)
+            e.right = self._visit(e.right)
+            return self.expr.rewrite_BinaryOp(e)
+        if t is Variable or t is Literal or e is None:
+            return e
+        if t is UnaryOp:
+            e.operand = self._visit(e.operand)
+            return self.expr.rewrite_UnaryOp(e)
+        if t is FuncCall:
+            e.args = self._visit_list(e.args)
+            return e
+        return self.expr.visit(e)
+
+    def _visit_list(self, items):
+        new = []
+        for item in items:
+            item = self._visit(item)
+            if item:
+                new.append(item)
+        self.expr.rewrites += len(items) - len(new)
+        return new
+
+    def _field(self, e):
+        # ExpressionSimplifier only descends into some node types held
+        # directly in a field; the rest just get the unused_* pruning
+        if isinstance(e, VISITED_FIELD_TYPES):
+            return self._expr(e)
+        return self.dead._simplify_expr(e)
+
+    def _expr(self, e):
+        if e is None:
+            return None
+        self._visited += 1
+        if isinstance(e, Variable):
+            if self.dead._is_unused(e.name):
+                self.dead.rewrites += 1
+                self.dead.rule_hits[UNUSED_OPERAND] += 1
+                return None
+            return e
+        if isinstance(e, BinaryOp):
+            e.left = self._expr(e.left)
+            e.right = self._expr(e.right)
+            return self.expr.rewrite_BinaryOp(e)
+        if isinstance(e, UnaryOp):
+            e.operand = self._expr(e.operand)
+            return self.expr.rewrite_UnaryOp(e)
+        if isinstance(e, FuncCall):
+            args = []
+            for a in e.args:
+                if a:
+                    a = self._expr(a)
+                    if a:
+                        args.append(a)
+                else:
+                    self.dead.rule_hits[EMPTY_ARG] += 1
+            self.dead.rewrites += len(e.args) - len(args)
+            e.args = args
+            return e
+        if isinstance(e, Assignment):
+            if self.dead._is_unused(self._target_name(e.target)):
+                self.dead.rewrites += 1
+                self.dead.rule_hits[UNUSED_ASSIGN] += 1
+                return None
+            e.value = self._field(e.value)
+            return e
+        return self.expr.visit(e)
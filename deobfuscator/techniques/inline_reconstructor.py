@@ -1,5 +1,10 @@
 from deobfuscator.ast import *
-from copy import deepcopy
+from deobfuscator.scopes import FunctionSymbols
+from collections import Counter
+
+# Longest argument list an inlined call is looked for with
+MAX_INLINED_ARGS = 7
+
 
 class InlineReconstructor:
     """
@@ -10,137 +15,235 @@ class InlineReconstructor:
       int b_1 = ARG2;
       int result_N = (a_0 + b_1);
       target = result_N;
-    It will try to find a function whose body (ignoring names) matches
-    the small block, and rewrite it into: target = func(ARG1, ARG2);
+    It will find a function whose body is `int r = EXPR; return r;` with
+    the same EXPR up to the parameter names, and rewrite the block into:
+    target = func(ARG1, ARG2);
+    The result may also be declared without EXPR (`int result_N;`); the
+    block then goes to the first function with as many parameters that
+    declares a variable from its parameters and returns it.  The
+    assignment to the target is matched bare or, as the parsers give it,
+    in an ExpressionStmt, and the call is written back the same way.
+
+    Functions are indexed up front by the structure of EXPR with their
+    parameters replaced by their positions (see structure()), so a
+    block is matched with one dict lookup; the dict compares the
+    structures exactly on a hash hit.  With `indexed` False every
+    function is tried in turn instead, which gives the same matches.
+    The block is only replaced when its placeholders and result are used
+    nowhere else in the function, as recorded by a FunctionSymbols of the
+    function that is kept in step with each replacement.
     """
-    def reconstruct(self, prog: Program):
-        for func in prog.functions:
-            func.body = self._process_block(func.body, prog)
+    def __init__(self, indexed: bool = True):
+        self.indexed = indexed
+        # functions in which an inlined sequence was replaced by a call
+        self.changed = set()
+        self._current = None
+        self._table = None
+        self._functions = []
+        self._index = {}
+        self._by_arity = {}
+        # statements examined, and sequences replaced
+        self.visited = 0
+        self.rule_hits = Counter()
+
+    def reconstruct(self, prog: Program, functions=None):
+        self._functions = prog.functions
+        if self.indexed:
+            self._index = self.index_functions(prog)
+            self._by_arity = {}
+            for f in reversed(prog.functions):
+                if returns_from_params(f):
+                    self._by_arity[len(f.params)] = f
+        for func in prog.functions if functions is None else functions:
+            self._current = func
+            self._table = None
+            func.body = self._process_block(func.body)
 
-    def _process_block(self, stmts, prog: Program):
+    def index_functions(self, prog: Program):
+        """(parameter count, structure of EXPR) -> first function returning EXPR."""
+        index = {}
+        for f in prog.functions:
+            key = function_key(f)
+            if key is not None:
+                index.setdefault(key, f)
+        return index
+
+    def _process_block(self, stmts):
         i = 0
         out = []
         while i < len(stmts):
             # try match pattern at i
-            match_len, replacement = self._match_inlined_sequence(stmts, i, prog)
+            self.visited += 1
+            match_len, replacement = self._match_inlined_sequence(stmts, i)
             if match_len:
+                self._replaced(stmts[i:i + match_len], replacement)
                 out.append(replacement)
+                self.rule_hits["inlined call reconstructed"] += 1
+                self.changed.add(self._current)
                 i += match_len
             else:
                 s = stmts[i]
                 if isinstance(s, Block):
-                    s.items = self._process_block(s.items, prog)
+                    s.items = self._process_block(s.items)
                 out.append(s)
                 i += 1
         return out
 
-    def _match_inlined_sequence(self, stmts, idx, prog):
-        # minimum seq length check
-        # pattern: one or more varDecls that initialize param placeholders,
-        # then a varDecl (result), then an Assignment assigning that result to target var
+    def _match_inlined_sequence(self, stmts, idx):
+        # pattern: one or more VariableDecls initializing the parameter
+        # placeholders, the result VariableDecl, then `target = result`
         j = idx
-        param_inits = []
-        while j < len(stmts) and isinstance(stmts[j], VariableDecl):
-            # variable with initializer
-            if stmts[j].init_expr is None:
-                break
-            param_inits.append(stmts[j])
+        while (j < len(stmts) and j - idx <= MAX_INLINED_ARGS
+               and isinstance(stmts[j], VariableDecl) and stmts[j].init_expr is not None):
             j += 1
-            # break if too many
-            if len(param_inits) > 6:
-                break
-        # need at least two param_inits and then one varDecl result and assignment
-        if len(param_inits) < 1 or j >= len(stmts) or not isinstance(stmts[j], Assignment):
-            # maybe next is a result varDecl then assignment
-            if j < len(stmts) and isinstance(stmts[j], VariableDecl):
-                result_decl = stmts[j]
-                k = j + 1
-                if k < len(stmts) and isinstance(stmts[k], Assignment):
-                    # candidate
-                    pass
-                else:
-                    return 0, None
-            else:
-                return 0, None
-
-        # more robust path: attempt to find sequence: param_inits (>=1), result_decl (VariableDecl),
-        # assign_to_target (Assignment where value is Variable(result_decl.name))
-        # We'll accept the simpler pattern
-        # require at least 2 declarations including result
-        if len(param_inits) < 1:
+        if j == idx or j >= len(stmts):
             return 0, None
-
-        # ensure next is result decl
-        if j >= len(stmts) or not isinstance(stmts[j], VariableDecl):
-            return 0, None
-        result_decl = stmts[j]
-        k = j + 1
-        if k >= len(stmts) or not isinstance(stmts[k], Assignment):
+        if (isinstance(stmts[j], VariableDecl) and j - idx <= MAX_INLINED_ARGS
+                and j + 1 < len(stmts)):
+            # the result declared without an initializer
+            result_decl, end = stmts[j], j + 1
+            param_inits = stmts[idx:j]
+        elif j - idx >= 2:
+            result_decl, end = stmts[j - 1], j
+            param_inits = stmts[idx:j - 1]
+        else:
             return 0, None
-        assign_stmt = stmts[k]
-        # check assignment value is Variable of result_decl.name
-        if not isinstance(assign_stmt.value, Variable) or assign_stmt.value.name != result_decl.name:
-            # sometimes assignment uses the result value directly; try allowing assignment target = result_decl.init_expr
-            # we'll require equality of textual shape - skip for now
+        assign = assignment(stmts[end])
+        if (assign is None or not isinstance(assign.value, Variable)
+                or assign.value.name != result_decl.name):
             return 0, None
 
-        # we have a candidate sequence length
-        seq_len = (k - idx) + 1
-
-        # Build arg expressions from param_inits initializers
-        arg_exprs = [d.init_expr for d in param_inits]
-        # find matching function in prog whose body equivalently returns combination of params
-        candidate = self._find_matching_function(prog, result_decl, param_inits)
-        if candidate is None:
+        candidate = self._find_matching_function(param_inits, result_decl)
+        if candidate is None or not self._only_used_in(param_inits, result_decl, assign):
             return 0, None
 
         # build replacement assignment: target = FuncCall(candidate.name, arg_exprs)
-        target = assign_stmt.target if isinstance(assign_stmt.target, Variable) else Variable(assign_stmt.target.name if hasattr(assign_stmt.target, 'name') else str(assign_stmt.target))
+        arg_exprs = [d.init_expr for d in param_inits]
+        target = assign.target if isinstance(assign.target, Variable) else Variable(assign.target.name if hasattr(assign.target, 'name') else str(assign.target))
         new_assign = Assignment(target, FuncCall(candidate.name, arg_exprs))
-        return seq_len, new_assign
-
-    def _find_matching_function(self, prog: Program, result_decl: VariableDecl, param_inits):
-        """
-        Find function whose body structure matches (simple heuristic):
-         - function has same number of params as len(param_inits)
-         - body has a VariableDecl (result) initialized by BinaryOp using param names
-         - then a Return returning that result
-        This is narrow but will match many of the small functions produced by the obfuscator.
-        """
-        for f in prog.functions:
-            # skip trivially the same function (we do not want to match self)
-            if not f.body:
-                continue
-            # need same param count
-            if len(f.params) != len(param_inits):
-                continue
-            # try to find in function body a VariableDecl followed by Return of that var
-            for idx, s in enumerate(f.body):
-                if isinstance(s, VariableDecl) and (idx + 1) < len(f.body) and isinstance(f.body[idx+1], Return):
-                    ret = f.body[idx+1]
-                    # check returned variable name equals decl name
-                    if isinstance(ret.value, Variable) and ret.value.name == s.name:
-                        # candidate; now verify initialization uses function params
-                        # extract variable names used in s.init_expr
-                        names = self._collect_names(s.init_expr)
-                        param_names = [p.name for p in f.params]
-                        # if param names subset of names, consider match
-                        if set(names).intersection(set(param_names)):
-                            return f
+        if assign is not stmts[end]:
+            new_assign = ExpressionStmt(new_assign)
+        return end - idx + 1, new_assign
+
+    def _find_matching_function(self, param_inits, result_decl):
+        if result_decl.init_expr is None:
+            if self.indexed:
+                return self._by_arity.get(len(param_inits))
+            return next((f for f in self._functions if len(f.params) == len(param_inits)
+                         and returns_from_params(f)), None)
+        placeholders = {d.name: i for i, d in enumerate(param_inits)}
+        key = (len(param_inits), structure(result_decl.init_expr, placeholders))
+        if self.indexed:
+            return self._index.get(key)
+        return next((f for f in self._functions if function_key(f) == key), None)
+
+    def _replaced(self, block, replacement):
+        # Keep the symbol table in step with the function.  The block's
+        # declarations had no uses outside it, so every other name still
+        # resolves as before, and the arguments move over as they are;
+        # only identifiers that were bare strings change sites.
+        table = self._table
+        table.forget(block[:-1])
+        old, new = assignment(block[-1]), assignment(replacement)
+        if new.target is not old.target:
+            table.replace_site((old, "target"), new.target)
+        for i, (decl, arg) in enumerate(zip(block, new.value.args)):
+            if type(arg) is str:
+                table.replace_site((decl, "init_expr"), (new.value.args, i))
+
+    def _only_used_in(self, param_inits, result_decl, assign):
+        # The block's declarations go away with it, so nothing outside it
+        # may use them
+        if self._table is None:
+            self._table = FunctionSymbols(self._current)
+        symbol = self._table.declarations.get
+        inner = {id(v) for v in variables(result_decl.init_expr)}
+        for d in param_inits:
+            s = symbol(d)
+            if s is None or any(id(site) not in inner for site in s.uses):
+                return False
+        s = symbol(result_decl)
+        return s is not None and s.uses == [assign.value]
+
+
+def assignment(stmt):
+    """The Assignment `stmt` is, bare or in an ExpressionStmt; else None."""
+    if isinstance(stmt, ExpressionStmt):
+        stmt = stmt.expr
+    return stmt if isinstance(stmt, Assignment) else None
+
+
+def function_key(f: Function):
+    """(parameter count, structure of EXPR) for `int r = EXPR; return r;`, else None."""
+    if len(f.body) != 2 or not f.params:
         return None
+    decl, ret = f.body
+    if (isinstance(decl, VariableDecl) and decl.init_expr is not None
+            and isinstance(ret, Return) and isinstance(ret.value, Variable)
+            and ret.value.name == decl.name):
+        params = {p.name: i for i, p in enumerate(f.params)}
+        return len(f.params), structure(decl.init_expr, params)
+    return None
+
+
+def returns_from_params(f: Function):
+    """
+    Whether `f`'s body declares a variable from its parameters and
+    returns it right after: what a block with an uninitialized result is
+    matched against.
+    """
+    names = {p.name for p in f.params}
+    for decl, ret in zip(f.body, f.body[1:]):
+        if (isinstance(decl, VariableDecl) and isinstance(ret, Return)
+                and isinstance(ret.value, Variable) and ret.value.name == decl.name
+                and any(v.name in names for v in variables(decl.init_expr))):
+            return True
+    return False
+
+
+def structure(expr, params):
+    """
+    Hashable shape of `expr` with the names in `params` (name -> position)
+    replaced by their positions, so expressions that differ only in those
+    names compare and hash equal.
+    """
+    if expr is None:
+        return None
+    if isinstance(expr, Variable):
+        i = params.get(expr.name)
+        return ("v", expr.name) if i is None else ("p", i)
+    if isinstance(expr, str):
+        i = params.get(expr)
+        return ("v", expr) if i is None else ("p", i)
+    if isinstance(expr, Literal):
+        # type too: 1, 1.0 and True are equal as values
+        return ("l", type(expr.value), expr.value)
+    if isinstance(expr, BinaryOp):
+        return ("b", expr.op, structure(expr.left, params), structure(expr.right, params))
+    if isinstance(expr, UnaryOp):
+        return ("u", expr.op, structure(expr.operand, params))
+    if isinstance(expr, FuncCall):
+        return ("c", expr.name, tuple(structure(a, params) for a in expr.args))
+    if isinstance(expr, Assignment):
+        return ("=", structure(expr.target, params), structure(expr.value, params))
+    # anything else only ever equals itself
+    return ("?", id(expr))
+
 
-    def _collect_names(self, expr):
-        if expr is None:
-            return set()
-        if isinstance(expr, Variable):
-            return {expr.name}
-        if isinstance(expr, BinaryOp):
-            return self._collect_names(expr.left) | self._collect_names(expr.right)
-        if isinstance(expr, UnaryOp):
-            return self._collect_names(expr.operand)
-        if isinstance(expr, FuncCall):
-            s = set()
-            for a in expr.args:
-                s |= self._collect_names(a)
-            return s
-        return set()
+def variables(expr):
+    """Variable nodes in `expr`."""
+    found = []
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if isinstance(e, Variable):
+            found.append(e)
+        elif isinstance(e, BinaryOp):
+            stack += (e.left, e.right)
+        elif isinstance(e, UnaryOp):
+            stack.append(e.operand)
+        elif isinstance(e, FuncCall):
+            stack += e.args
+        elif isinstance(e, Assignment):
+            stack += (e.target, e.value)
+    return found
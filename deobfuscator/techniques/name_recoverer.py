@@ -1,6 +1,11 @@
 # deobfuscator/techniques/semantic_name_recoverer.py
+from collections import Counter
+
 from deobfuscator.ast import *
-from typing import List, Dict, Set
+from deobfuscator.call_graph import CallGraph
+from deobfuscator.symbols import SymbolTable
+from deobfuscator.scopes import FunctionSymbols
+from typing import List, Dict, Set, Optional
 
 class SemanticNameRecoverer:
     """
@@ -10,16 +15,50 @@ class SemanticNameRecoverer:
       - rename declared locals -> t0,t1.. then friendly names (x,y,m...)
       - rename undeclared-but-used (orphans) -> tN and then friendly names
       - update all function call names to mapped function names
+
+    With `composed` (the default) each function is indexed once with
+    FunctionSymbols, every variable gets its final name up front and is
+    renamed at its recorded sites, following block scopes: two variables
+    of the same name in different blocks are named apart, and Scan
+    arguments and switch defaults are renamed too.  Otherwise each
+    (old, new) name pair rewrites the whole body in turn, which is
+    O(names x body size) and matches names regardless of scope.
     """
 
-    def __init__(self):
+    def __init__(self, composed: bool = True):
+        self.composed = composed
         self.func_count = 0
         self.skip_names = {"main", "printf", "scanf", "puts", "putchar",
                            "strlen", "malloc", "free", "NULL"}
         self.friendly_locals = ["x", "y", "m", "n", "z"]
+        self.symbols = SymbolTable()
+        # nodes visited, and names rewritten by kind
+        self.visited = 0
+        self.rule_hits = Counter()
 
-    def recover(self, prog: Program):
+    def recover(self, prog: Program, call_graph: Optional[CallGraph] = None):
+        """
+        `call_graph` is passed by a caller that has kept the program's
+        CallGraph current (PassManager does).  Without it the graph is
+        rebuilt: one left on `prog` by passes run on their own can miss
+        calls added since, or hold calls that are gone.
+        """
+        prog.call_graph = call_graph if call_graph is not None else CallGraph(prog.functions)
+        # New names go through the program's symbol table so every
+        # occurrence shares one str object with the names already in the AST
+        self.symbols = prog.symbols
         # 1) Build function name map first (original -> new) so we can update call sites later
+        func_name_map = self.map_function_names(prog)
+
+        # 2) For each function, recover local names and params
+        for f in prog.functions:
+            self._rename_function(f)
+
+        # 3) After all functions renamed, update all function call names across program
+        self._update_all_func_calls(prog, func_name_map)
+
+    def map_function_names(self, prog: Program) -> Dict[str, str]:
+        """Rename function definitions and return the original -> new name map."""
         func_name_map: Dict[str, str] = {}
         for f in prog.functions:
             original = f.name
@@ -27,34 +66,92 @@ class SemanticNameRecoverer:
                 func_name_map[original] = original
             else:
                 self.func_count += 1
-                new_name = f"func{self.func_count}"
+                new_name = self.symbols.intern(f"func{self.func_count}")
                 func_name_map[original] = new_name
                 f.name = new_name
+                self.rule_hits["function renamed"] += 1
+        return func_name_map
 
-        # 2) For each function, recover local names and params
-        for f in prog.functions:
-            self._rename_function(f)
-
-        # 3) After all functions renamed, update all function call names across program
-        self._update_all_func_calls(prog, func_name_map)
+    def recover_function(self, func: Function, func_name_map: Dict[str, str]):
+        """
+        Steps 2 and 3 of recover() for one function: they only touch that
+        function, so with the map from map_function_names() functions can
+        be done independently.
+        """
+        self._rename_function(func)
+        self._update_func_calls(func, func_name_map)
 
     # -------------------------
     # Per-function renaming
     # -------------------------
     def _rename_function(self, func: Function):
+        if not self.composed:
+            return self._rename_function_pairwise(func)
+        table = FunctionSymbols(func)
+
+        # 1. Parameters -> a, b, c, p3...
+        final = {}
+        for i, symbol in enumerate(table.params):
+            final[symbol] = self.symbols.intern(self._param_name(i))
+        used_final = set(final.values())
+
+        # 2. Declared locals in declaration order, then orphans in first-use
+        # order -> t0, t1... (_unused_N for unused*)
+        t_symbols = []
+        counter = 0
+        for symbol in table.locals + table.orphans:
+            if symbol.name in self.skip_names:
+                continue
+            if symbol.name.startswith("unused"):
+                final[symbol] = self.symbols.intern(f"_unused_{counter}")
+            else:
+                t_symbols.append(symbol)
+            counter += 1
+
+        # 3. tN -> friendly names (avoid collision with params)
+        for idx, symbol in enumerate(t_symbols):
+            chosen = self._friendly_name(idx, used_final)
+            final[symbol] = chosen
+            used_final.add(chosen)
+
+        # 4. Rename every symbol at its recorded sites
+        for symbol, new in final.items():
+            changed = table.rename(symbol, new)
+            if changed and symbol.is_param:
+                self.rule_hits["parameter renamed"] += 1
+                changed -= 1
+            self.rule_hits["identifier rewritten"] += changed
+        self.visited += sum(len(symbol.sites) for symbol in table.symbols)
+
+    def _param_name(self, i: int) -> str:
+        return ("a", "b", "c")[i] if i < 3 else f"p{i}"
+
+    def _friendly_name(self, idx: int, used_final: Set[str]) -> str:
+        chosen = None
+        if idx < len(self.friendly_locals):
+            cand = self.friendly_locals[idx]
+            if cand not in used_final:
+                chosen = cand
+        if not chosen:
+            # fallback to v#
+            k = 0
+            while True:
+                cand = f"v{k}"
+                if cand not in used_final:
+                    chosen = cand
+                    break
+                k += 1
+        return self.symbols.intern(chosen)
+
+    def _rename_function_pairwise(self, func: Function):
         # 1. Parameter rename: record old -> new and set on Function.params
         param_old = [p.name for p in func.params]
         param_new = []
         for i, p in enumerate(func.params):
-            if i == 0:
-                new = "a"
-            elif i == 1:
-                new = "b"
-            elif i == 2:
-                new = "c"
-            else:
-                new = f"p{i}"
+            new = self.symbols.intern(self._param_name(i))
             param_new.append(new)
+            if p.name != new:
+                self.rule_hits["parameter renamed"] += 1
             p.name = new
         param_map = {old: new for old, new in zip(param_old, param_new)}
 
@@ -86,9 +183,9 @@ class SemanticNameRecoverer:
             if name in self.skip_names:
                 continue
             if name.startswith("unused"):
-                mapping_temp[name] = f"_unused_{counter}"
+                mapping_temp[name] = self.symbols.intern(f"_unused_{counter}")
             else:
-                mapping_temp[name] = f"t{counter}"
+                mapping_temp[name] = self.symbols.intern(f"t{counter}")
             counter += 1
 
         # 6. Continue counter for undeclared (orphans)
@@ -96,15 +193,12 @@ class SemanticNameRecoverer:
             if name in mapping_temp or name in self.skip_names:
                 continue
             if name.startswith("unused"):
-                mapping_temp[name] = f"_unused_{counter}"
+                mapping_temp[name] = self.symbols.intern(f"_unused_{counter}")
             else:
-                mapping_temp[name] = f"t{counter}"
+                mapping_temp[name] = self.symbols.intern(f"t{counter}")
             counter += 1
 
         # 7. Apply t-mapping (normalize both declarations and uses)
-        for old, new in mapping_temp.items():
-            self._apply_mapping_to_block(func.body, old, new)
-
         # 8. Convert tN -> friendly names (avoid collision with params)
         t_names = [v for k, v in sorted(mapping_temp.items(), key=lambda kv: int(kv[1][1:]) if kv[1].startswith('t') else 10**9)]
         # Keep ordering unique and t* only
@@ -113,29 +207,14 @@ class SemanticNameRecoverer:
         used_final = set(param_new)
         idx = 0
         for t in t_names_filtered:
-            chosen = None
-            if idx < len(self.friendly_locals):
-                cand = self.friendly_locals[idx]
-                if cand not in used_final:
-                    chosen = cand
-            if not chosen:
-                # fallback to v#
-                k = 0
-                while True:
-                    cand = f"v{k}"
-                    if cand not in used_final:
-                        chosen = cand
-                        break
-                    k += 1
+            chosen = self._friendly_name(idx, used_final)
             local_map[t] = chosen
             used_final.add(chosen)
             idx += 1
 
-        for old, new in local_map.items():
-            self._apply_mapping_to_block(func.body, old, new)
-
-        # 9. Finally propagate parameter renaming to the body
-        for old, new in param_map.items():
+        # 9. Apply the t-mapping, then the friendly names, then the
+        # parameter renaming to the body
+        for old, new in [*mapping_temp.items(), *local_map.items(), *param_map.items()]:
             self._apply_mapping_to_block(func.body, old, new)
 
     # -------------------------
@@ -222,195 +301,171 @@ class SemanticNameRecoverer:
     # -------------------------
     # Mapping application (robust)
     # -------------------------
+    # Statements are updated in place; expressions are too, and the
+    # _apply_mapping_to_expr/_replace_func_calls_in_expr return the same
+    # object unless a raw identifier string had to become a Variable, so
+    # a rename allocates nothing for the nodes it leaves unchanged.
     def _apply_mapping_to_block(self, stmts, old: str, new: str):
-        for i, s in enumerate(stmts):
-            stmts[i] = self._apply_mapping_to_stmt(s, old, new)
+        for s in stmts:
+            self._apply_mapping_to_stmt(s, old, new)
+
+    def _apply_mapping_to_target(self, node, old: str, new: str):
+        # normalize string targets
+        if isinstance(node.target, str):
+            if node.target == old:
+                node.target = Variable(new)
+                self.rule_hits["identifier rewritten"] += 1
+            else:
+                node.target = Variable(node.target)
+        elif isinstance(node.target, Variable):
+            if node.target.name == old:
+                node.target.name = new
+                self.rule_hits["identifier rewritten"] += 1
 
     def _apply_mapping_to_stmt(self, s, old: str, new: str):
         if s is None:
-            return s
+            return
+        self.visited += 1
         if isinstance(s, VariableDecl):
             if s.name == old:
                 s.name = new
+                self.rule_hits["identifier rewritten"] += 1
             if s.init_expr:
                 s.init_expr = self._apply_mapping_to_expr(s.init_expr, old, new)
-            return s
-        if isinstance(s, Assignment):
-            # normalize string targets
-            if isinstance(s.target, str):
-                if s.target == old:
-                    s.target = Variable(new)
-                else:
-                    s.target = Variable(s.target)
-            elif isinstance(s.target, Variable):
-                if s.target.name == old:
-                    s.target.name = new
+        elif isinstance(s, Assignment):
+            self._apply_mapping_to_target(s, old, new)
             s.value = self._apply_mapping_to_expr(s.value, old, new)
-            return s
-        if isinstance(s, ExpressionStmt):
+        elif isinstance(s, ExpressionStmt):
             s.expr = self._apply_mapping_to_expr(s.expr, old, new)
-            return s
-        if isinstance(s, Return):
+        elif isinstance(s, Return):
             s.value = self._apply_mapping_to_expr(s.value, old, new)
-            return s
-        if isinstance(s, IfStmt):
+        elif isinstance(s, IfStmt):
             s.condition = self._apply_mapping_to_expr(s.condition, old, new)
-            s.then_branch = self._apply_mapping_to_stmt(s.then_branch, old, new)
+            self._apply_mapping_to_stmt(s.then_branch, old, new)
             if s.else_branch:
-                s.else_branch = self._apply_mapping_to_stmt(s.else_branch, old, new)
-            return s
-        if isinstance(s, WhileStmt):
+                self._apply_mapping_to_stmt(s.else_branch, old, new)
+        elif isinstance(s, WhileStmt):
             s.condition = self._apply_mapping_to_expr(s.condition, old, new)
-            s.body = self._apply_mapping_to_stmt(s.body, old, new)
-            return s
-        if isinstance(s, ForStmt):
+            self._apply_mapping_to_stmt(s.body, old, new)
+        elif isinstance(s, ForStmt):
             if s.init: s.init = self._apply_mapping_to_expr(s.init, old, new)
             if s.cond: s.cond = self._apply_mapping_to_expr(s.cond, old, new)
             if s.update: s.update = self._apply_mapping_to_expr(s.update, old, new)
-            s.body = self._apply_mapping_to_stmt(s.body, old, new)
-            return s
-        if isinstance(s, Block):
-            new_items = []
-            for it in s.items:
-                mapped = self._apply_mapping_to_stmt(it, old, new)
-                if mapped is None:
-                    continue
-                new_items.append(mapped)
-            s.items = new_items
-            return s
-        if isinstance(s, Print):
-            s.args = [self._apply_mapping_to_expr(a, old, new) for a in s.args]
-            return s
-        if isinstance(s, Switch):
+            self._apply_mapping_to_stmt(s.body, old, new)
+        elif isinstance(s, Block):
+            self._apply_mapping_to_block(s.items, old, new)
+        elif isinstance(s, Print):
+            _rewrite_items(s.args, self._apply_mapping_to_expr, old, new)
+        elif isinstance(s, Switch):
             s.expr = self._apply_mapping_to_expr(s.expr, old, new)
             for case in s.cases:
                 if case.body and isinstance(case.body, Block):
-                    new_items = []
-                    for st in case.body.items:
-                        mapped = self._apply_mapping_to_stmt(st, old, new)
-                        if mapped is None:
-                            continue
-                        new_items.append(mapped)
-                    case.body.items = new_items
-            return s
-        return s
+                    self._apply_mapping_to_block(case.body.items, old, new)
 
     def _apply_mapping_to_expr(self, e, old: str, new: str):
         if e is None:
             return None
-        if isinstance(e, str):
+        self.visited += 1
+        if isinstance(e, Variable):
+            if e.name == old:
+                e.name = new
+                self.rule_hits["identifier rewritten"] += 1
+        elif isinstance(e, BinaryOp):
+            e.left = self._apply_mapping_to_expr(e.left, old, new)
+            e.right = self._apply_mapping_to_expr(e.right, old, new)
+        elif isinstance(e, UnaryOp):
+            e.operand = self._apply_mapping_to_expr(e.operand, old, new)
+        elif isinstance(e, FuncCall):
+            # keep function name as-is here (function name mapping is applied globally later)
+            _rewrite_items(e.args, self._apply_mapping_to_expr, old, new)
+        elif isinstance(e, Assignment):
+            self._apply_mapping_to_target(e, old, new)
+            e.value = self._apply_mapping_to_expr(e.value, old, new)
+        elif isinstance(e, str):
             # raw identifier string: convert to Variable (rename if needed)
             if e == old:
+                self.rule_hits["identifier rewritten"] += 1
                 return Variable(new)
             return Variable(e)
-        if isinstance(e, Variable):
-            if e.name == old:
-                return Variable(new)
-            return e
-        if isinstance(e, BinaryOp):
-            left = self._apply_mapping_to_expr(e.left, old, new)
-            right = self._apply_mapping_to_expr(e.right, old, new)
-            return BinaryOp(e.op, left, right)
-        if isinstance(e, UnaryOp):
-            operand = self._apply_mapping_to_expr(e.operand, old, new)
-            return UnaryOp(e.op, operand)
-        if isinstance(e, FuncCall):
-            # keep function name as-is here (function name mapping is applied globally later)
-            args = [self._apply_mapping_to_expr(a, old, new) for a in e.args]
-            return FuncCall(e.name, args)
-        if isinstance(e, Assignment):
-            # normalize target
-            targ = e.target
-            if isinstance(targ, str):
-                if targ == old:
-                    targ = Variable(new)
-                else:
-                    targ = Variable(targ)
-            elif isinstance(targ, Variable) and targ.name == old:
-                targ = Variable(new)
-            val = self._apply_mapping_to_expr(e.value, old, new)
-            return Assignment(targ, val)
         return e
 
     # -------------------------
     # Function call name update (global)
     # -------------------------
     def _update_all_func_calls(self, prog: Program, func_name_map: Dict[str, str]):
-        # walk all functions and replace function call names
-        for f in prog.functions:
-            new_items = []
-            for s in f.body:
-                new_items.append(self._replace_func_calls_in_stmt(s, func_name_map))
-            f.body = new_items
+        # the call graph knows every call site, nothing is walked
+        renamed = CallGraph.of(prog).rename(func_name_map)
+        self.visited += renamed
+        self.rule_hits["call site renamed"] += renamed
+
+    def _update_func_calls(self, f: Function, func_name_map: Dict[str, str]):
+        for s in f.body:
+            self._replace_func_calls_in_stmt(s, func_name_map)
 
     def _replace_func_calls_in_stmt(self, s, func_name_map: Dict[str, str]):
         if s is None:
-            return s
+            return
+        self.visited += 1
         if isinstance(s, VariableDecl):
             if s.init_expr:
                 s.init_expr = self._replace_func_calls_in_expr(s.init_expr, func_name_map)
-            return s
-        if isinstance(s, Assignment):
+        elif isinstance(s, Assignment):
             s.value = self._replace_func_calls_in_expr(s.value, func_name_map)
-            return s
-        if isinstance(s, ExpressionStmt):
+        elif isinstance(s, ExpressionStmt):
             s.expr = self._replace_func_calls_in_expr(s.expr, func_name_map)
-            return s
-        if isinstance(s, Return):
+        elif isinstance(s, Return):
             s.value = self._replace_func_calls_in_expr(s.value, func_name_map)
-            return s
-        if isinstance(s, IfStmt):
+        elif isinstance(s, IfStmt):
             s.condition = self._replace_func_calls_in_expr(s.condition, func_name_map)
-            s.then_branch = self._replace_func_calls_in_stmt(s.then_branch, func_name_map)
+            self._replace_func_calls_in_stmt(s.then_branch, func_name_map)
             if s.else_branch:
-                s.else_branch = self._replace_func_calls_in_stmt(s.else_branch, func_name_map)
-            return s
-        if isinstance(s, WhileStmt):
+                self._replace_func_calls_in_stmt(s.else_branch, func_name_map)
+        elif isinstance(s, WhileStmt):
             s.condition = self._replace_func_calls_in_expr(s.condition, func_name_map)
-            s.body = self._replace_func_calls_in_stmt(s.body, func_name_map)
-            return s
-        if isinstance(s, ForStmt):
+            self._replace_func_calls_in_stmt(s.body, func_name_map)
+        elif isinstance(s, ForStmt):
             if s.init: s.init = self._replace_func_calls_in_expr(s.init, func_name_map)
             if s.cond: s.cond = self._replace_func_calls_in_expr(s.cond, func_name_map)
             if s.update: s.update = self._replace_func_calls_in_expr(s.update, func_name_map)
-            s.body = self._replace_func_calls_in_stmt(s.body, func_name_map)
-            return s
-        if isinstance(s, Block):
-            s.items = [self._replace_func_calls_in_stmt(it, func_name_map) for it in s.items]
-            return s
-        if isinstance(s, Print):
-            s.args = [self._replace_func_calls_in_expr(a, func_name_map) for a in s.args]
-            return s
-        if isinstance(s, Switch):
+            self._replace_func_calls_in_stmt(s.body, func_name_map)
+        elif isinstance(s, Block):
+            for it in s.items:
+                self._replace_func_calls_in_stmt(it, func_name_map)
+        elif isinstance(s, Print):
+            _rewrite_items(s.args, self._replace_func_calls_in_expr, func_name_map)
+        elif isinstance(s, Switch):
             s.expr = self._replace_func_calls_in_expr(s.expr, func_name_map)
             for case in s.cases:
                 if case.body and isinstance(case.body, Block):
-                    case.body.items = [self._replace_func_calls_in_stmt(st, func_name_map) for st in case.body.items]
-            return s
-        return s
+                    for st in case.body.items:
+                        self._replace_func_calls_in_stmt(st, func_name_map)
 
     def _replace_func_calls_in_expr(self, e, func_name_map: Dict[str, str]):
         if e is None:
             return None
-        if isinstance(e, Variable):
-            return e
+        self.visited += 1
         if isinstance(e, BinaryOp):
-            return BinaryOp(e.op,
-                            self._replace_func_calls_in_expr(e.left, func_name_map),
-                            self._replace_func_calls_in_expr(e.right, func_name_map))
-        if isinstance(e, UnaryOp):
-            return UnaryOp(e.op, self._replace_func_calls_in_expr(e.operand, func_name_map))
-        if isinstance(e, FuncCall):
-            name = e.name
-            if name in func_name_map:
-                name = func_name_map[name]
-            return FuncCall(name, [self._replace_func_calls_in_expr(a, func_name_map) for a in e.args])
-        if isinstance(e, Assignment):
-            targ = e.target
-            if isinstance(targ, str):
-                targ = Variable(targ)
-            elif isinstance(targ, Variable):
-                targ = targ
-            return Assignment(targ, self._replace_func_calls_in_expr(e.value, func_name_map))
+            e.left = self._replace_func_calls_in_expr(e.left, func_name_map)
+            e.right = self._replace_func_calls_in_expr(e.right, func_name_map)
+        elif isinstance(e, UnaryOp):
+            e.operand = self._replace_func_calls_in_expr(e.operand, func_name_map)
+        elif isinstance(e, FuncCall):
+            name = func_name_map.get(e.name, e.name)
+            if name != e.name:
+                e.name = name
+                self.rule_hits["call site renamed"] += 1
+            _rewrite_items(e.args, self._replace_func_calls_in_expr, func_name_map)
+        elif isinstance(e, Assignment):
+            if isinstance(e.target, str):
+                e.target = Variable(e.target)
+            e.value = self._replace_func_calls_in_expr(e.value, func_name_map)
         return e
 
+
+def _rewrite_items(items, rewrite, *args):
+    # rewrite() each item of the list in place, storing back only what changed
+    for i, item in enumerate(items):
+        new = rewrite(item, *args)
+        if new is not item:
+            items[i] = new
+
@@ -1,18 +1,18 @@
 from deobfuscator.ast_builder import ASTBuilder
 from deobfuscator.code_generator import CodeGenerator
-from antlr4 import FileStream, CommonTokenStream
+from antlr4 import CommonTokenStream
+from deobfuscator.mmap_stream import MmapInputStream
 from deobfuscator.parser.ObfuMiniCLexer import ObfuMiniCLexer
 from deobfuscator.parser.ObfuMiniCParser import ObfuMiniCParser
-from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier 
-from deobfuscator.techniques.control_flow_simplifier import ControlFlowSimplifier 
-from deobfuscator.techniques.dead_code_remover import DeadCodeRemover
-from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
-from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+from deobfuscator.pass_manager import PASS_NAMES, default_pass_manager
 from deobfuscator.ast_builder import ASTBuilder
 from deobfuscator.code_generator import CodeGenerator
+import logging
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
     # --- Parse input file ---
-    input_stream = FileStream("input/input.mc")
+    input_stream = MmapInputStream("input/input.mc")
     lexer = ObfuMiniCLexer(input_stream)
     stream = CommonTokenStream(lexer)
     parser = ObfuMiniCParser(stream)
@@ -22,25 +22,11 @@ def main():
     ast_builder = ASTBuilder()
     prog = ast_builder.visit(tree)
 
-    print("[deobfuscator] removing dead code...")
-    dc = DeadCodeRemover()
-    dc.remove(prog)
-
-    print("[deobfuscator] simplifying expressions...")
-    es = ExpressionSimplifier()
-    es.simplify(prog)
-
-    print("[deobfuscator] simplifying control flow...")
-    cf_simplifier = ControlFlowSimplifier()
-    cf_simplifier.visit(prog)
-
-    print("[deobfuscator] reconstructing inlined functions...")
-    ic = InlineReconstructor()
-    ic.reconstruct(prog)
-
-    print("[deobfuscator] recovering readable names...")
-    rn = SemanticNameRecoverer()
-    rn.recover(prog)
+    pm = default_pass_manager()
+    for p in pm.schedule(PASS_NAMES):
+        print(f"[deobfuscator] {p.description}...")
+        pm.run_pass(prog, p)
+    pm.metrics.log()
 
     # --- Generate code ---
     code_gen = CodeGenerator()
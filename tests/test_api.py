@@ -0,0 +1,96 @@
+"""
+deobfuscate() off the event loop: its result, and a cancelled or timed
+out call stopping the run on its thread before the next pass.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from deobfuscator import api
+from deobfuscator.api import deobfuscate, run_source
+from deobfuscator.pass_manager import Pass, PassManager
+
+SOURCE = "int main() { int a = 1 + 0; if (0) { a = 2; } return a; }"
+
+
+class Blocking:
+    """A pass manager whose first pass waits for `release` before returning."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.log = []
+
+    def __call__(self, jobs=1):
+        pm = PassManager(jobs)
+        pm.register(Pass("dead", self._block))
+        pm.register(Pass("expr", self._log, requires=("dead",)))
+        return pm
+
+    def _block(self, prog, functions=None, metrics=None):
+        self.log.append("dead")
+        self.started.set()
+        self.release.wait(10)
+        return False
+
+    def _log(self, prog, functions=None, metrics=None):
+        self.log.append("expr")
+        return False
+
+
+def run_blocked(monkeypatch, interrupt, timeout=None):
+    """Start deobfuscate() on a thread, interrupt it while its first pass runs."""
+    blocking = Blocking()
+    monkeypatch.setattr(api, "default_pass_manager", blocking)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(deobfuscate(SOURCE, ["dead", "expr"], executor=executor,
+                                                 timeout=timeout, frontend="fast"))
+        await loop.run_in_executor(None, blocking.started.wait, 10)
+        interrupt(task)
+        try:
+            await task
+        finally:
+            blocking.release.set()
+
+    executor = ThreadPoolExecutor(1)
+    try:
+        with pytest.raises((asyncio.CancelledError, asyncio.TimeoutError)) as raised:
+            asyncio.run(main())
+    finally:
+        # wait for the abandoned run to wind down
+        executor.shutdown(wait=True)
+    return raised.type, blocking.log
+
+
+def test_result():
+    async def main():
+        return await deobfuscate(SOURCE, ["dead", "expr"], frontend="fast")
+
+    result = asyncio.run(main())
+    assert result.code == run_source(SOURCE, ["dead", "expr"], "fast").code
+    assert result.ast is not None and result.runs == {"dead": 1, "expr": 1}
+
+
+def test_cancelled(monkeypatch):
+    raised, log = run_blocked(monkeypatch, lambda task: task.cancel())
+    assert raised is asyncio.CancelledError
+    assert log == ["dead"]
+
+
+def test_timeout(monkeypatch):
+    raised, log = run_blocked(monkeypatch, lambda task: None, timeout=0.5)
+    assert raised is asyncio.TimeoutError
+    assert log == ["dead"]
+
+
+def test_not_interrupted(monkeypatch):
+    # the same run, left alone, gets to its second pass
+    blocking = Blocking()
+    blocking.release.set()
+    monkeypatch.setattr(api, "default_pass_manager", blocking)
+    asyncio.run(deobfuscate(SOURCE, ["dead", "expr"], timeout=10, frontend="fast"))
+    assert blocking.log == ["dead", "expr"]
@@ -0,0 +1,106 @@
+import ast
+import os
+
+from deobfuscator import ast_cache
+from deobfuscator.ast_cache import ASTCache
+from deobfuscator.frontend import load_program, load_source
+
+SOURCE = "int main() { int a = 1 + 2; return a; }"
+
+
+def entries(cache):
+    return sorted(name for name in os.listdir(cache.directory) if name.endswith(ASTCache.SUFFIX))
+
+
+def test_hit(tmp_path):
+    cache = ASTCache(str(tmp_path))
+    path = tmp_path / "a.mc"
+    path.write_text(SOURCE)
+    timings = {}
+    load_program(str(path), "fast", cache=cache, timings=timings)
+    assert "cache/put" in timings
+    timings = {}
+    prog = load_program(str(path), "fast", cache=cache, timings=timings)
+    assert "cache/put" not in timings
+    assert prog.functions[0].name == "main"
+    # the same bytes given in memory hit the same entry
+    load_source(SOURCE.encode(), "fast", cache=cache)
+    assert len(entries(cache)) == 1
+
+
+def test_key_includes_frontend_options(tmp_path):
+    cache = ASTCache(str(tmp_path))
+    load_source(SOURCE, "fast", cache=cache)
+    load_source(SOURCE, "antlr", cache=cache)
+    load_source(SOURCE, "antlr", lexer="bulk", cache=cache)
+    load_source(SOURCE, "antlr", builder="listener", cache=cache)
+    assert len(entries(cache)) == 4
+    # options the fast frontend ignores do not split its entries
+    load_source(SOURCE, "fast", builder="listener", cache=cache)
+    assert len(entries(cache)) == 4
+
+
+def test_get_after_concurrent_eviction(tmp_path, monkeypatch):
+    cache = ASTCache(str(tmp_path))
+    key = cache.key(SOURCE.encode())
+    cache.put(key, load_source(SOURCE, "fast"))
+
+    def evicted(path):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(ast_cache.os, "utime", evicted)
+    assert cache.get(key).functions[0].name == "main"
+    assert cache.get(key) is None
+
+
+def test_evict_skips_vanished_entries(tmp_path, monkeypatch):
+    cache = ASTCache(str(tmp_path), max_bytes=0)
+    for i in range(3):
+        cache.put(cache.key(SOURCE.encode(), (str(i),)), load_source(SOURCE, "fast"))
+    assert entries(cache) == []
+
+    real_scandir = os.scandir
+
+    class Vanished:
+        name = "gone" + ASTCache.SUFFIX
+        path = str(tmp_path / name)
+
+        def stat(self):
+            raise FileNotFoundError(self.path)
+
+    class Listing:
+        def __init__(self, path):
+            self.it = real_scandir(path)
+
+        def __enter__(self):
+            return iter([Vanished(), *self.it])
+
+        def __exit__(self, *exc):
+            self.it.close()
+
+    monkeypatch.setattr(ast_cache.os, "scandir", Listing)
+    cache.put(cache.key(SOURCE.encode()), load_source(SOURCE, "fast"))
+    assert entries(cache) == []
+
+
+def test_version_covers_frontend_modules():
+    # every deobfuscator module frontend.py builds an AST through
+    package = os.path.dirname(ast_cache.__file__)
+    seen, todo = set(), ["frontend.py"]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        with open(os.path.join(package, name)) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and (node.module or "").startswith("deobfuscator"):
+                modules = ([f"{node.module}.{a.name}" for a in node.names]
+                           if node.module == "deobfuscator" else [node.module])
+                for module in modules:
+                    path = os.path.join(*module.split(".")[1:]) + ".py"
+                    if os.path.exists(os.path.join(package, path)):
+                        todo.append(path)
+    assert seen <= set(ast_cache._FRONTEND_FILES)
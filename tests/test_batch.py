@@ -0,0 +1,42 @@
+import functools
+import glob
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+
+@pytest.fixture
+def corpus_dir(tmp_path):
+    in_dir = tmp_path / "in"
+    (in_dir / "sub").mkdir(parents=True)
+    for i, path in enumerate(CORPUS):
+        shutil.copy(path, in_dir / ("sub" if i % 2 else "") / f"{i}.mc")
+    return in_dir
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_workers_log(corpus_dir, tmp_path, monkeypatch, capsys, start_method):
+    # workers started either way send each file's log back with its result
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", functools.partial(
+        ProcessPoolExecutor, mp_context=multiprocessing.get_context(start_method)))
+    cli.configure_logging("info")
+    summary = cli.run_batch(str(corpus_dir), str(tmp_path / "out"), ["dead", "expr"], jobs=2)
+    assert summary["failed"] == 0 and summary["files"] == len(CORPUS)
+    for result in summary["results"]:
+        assert "INFO: " in result["log"]
+        assert result["metrics"]
+    serial = cli.run_batch(str(corpus_dir), str(tmp_path / "serial"), ["dead", "expr"])
+    assert [r["log"] for r in serial["results"]] == [r["log"] for r in summary["results"]]
+    assert counts(serial["metrics"]) == counts(summary["metrics"])
+
+
+def counts(metrics):
+    return {name: {k: v for k, v in m.items() if k != "seconds"} for name, m in metrics.items()}
@@ -0,0 +1,160 @@
+"""
+The call graph PassManager keeps on the Program has to match one built
+from scratch after any sequence of passes.
+"""
+import glob
+import os
+
+import pytest
+
+from deobfuscator.ast import *
+from deobfuscator.call_graph import CallGraph
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.frontend import load_program, load_source
+from deobfuscator.pass_manager import default_pass_manager
+from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
+from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+# Inlined add() and sub() blocks; the one in between has its operands
+# swapped and matches nothing
+INLINED = """
+int add(int p, int q) { int r = (p + q); return r; }
+int sub(int p, int q) { int r = (p - q); return r; }
+int g(int k) {
+    int a_0 = k;
+    int b_1 = add(k, 3);
+    int result_2 = (a_0 + b_1);
+    k = result_2;
+    int a_3 = k;
+    int b_4 = 7;
+    int result_5 = (b_4 - a_3);
+    k = result_5;
+    int a_6 = k;
+    int b_7 = 7;
+    int result_8 = (a_6 - b_7);
+    k = result_8;
+    return k;
+}
+int main() { return g(add(1, 2)); }
+"""
+
+STAGES = ["dead", "expr", "control", "inline", "rename"]
+
+
+def inlined_program():
+    return load_source(INLINED, "fast")
+
+
+def index(graph, prog):
+    """
+    Everything the graph answers, with call sites by identity; callers
+    and sites come in no particular order.
+    """
+    names = {f.name for f in prog.functions}
+    names.update(name for f in prog.functions for name in graph.callees(f))
+    return ({f.name: graph.callees(f) for f in prog.functions},
+            {name: ({id(c) for c in graph.sites(name)}, sorted(f.name for f in graph.callers(name)))
+             for name in sorted(names)},
+            len(graph))
+
+
+def assert_current(prog):
+    assert index(prog.call_graph, prog) == index(CallGraph(prog.functions), prog)
+
+
+@pytest.mark.parametrize("mode", ["serial", "fused", "fixpoint", "jobs"])
+@pytest.mark.parametrize("load", [*(lambda p=p: load_program(p, "fast") for p in CORPUS),
+                                  inlined_program],
+                         ids=[*map(os.path.basename, CORPUS), "inlined"])
+def test_kept_current(load, mode):
+    prog = load()
+    CallGraph.of(prog)
+    pm = default_pass_manager(2 if mode == "jobs" else 1)
+    try:
+        for stages in (STAGES[:4], STAGES[4:]):
+            if mode == "fixpoint":
+                pm.run_fixpoint(prog, stages)
+            else:
+                pm.run(prog, stages, fuse=mode == "fused")
+            assert_current(prog)
+    finally:
+        pm.close()
+
+
+def test_inlined_calls_indexed():
+    prog = inlined_program()
+    graph = CallGraph.of(prog)
+    assert len(graph.sites("add")) == 2 and graph.sites("sub") == []
+    pm = default_pass_manager()
+    pm.run(prog, STAGES[:4])
+    assert pm.metrics["inline"].rewritten == 2
+    assert sorted(f.name for f in graph.callers("add")) == ["g", "main"]
+    assert len(graph.sites("add")) == 3
+    assert [f.name for f in graph.callers("sub")] == ["g"]
+    assert graph.callees(prog.functions[2]) == ["add", "sub"]
+
+
+def test_update_and_rename():
+    prog = load_source("int f() { return 1; } int g() { return f() + f(); } "
+                       "int main() { return g() + f(); }", "fast")
+    f, g, main = prog.functions
+    graph = CallGraph(prog.functions)
+    assert [c.name for c in graph.sites("f")] == ["f", "f", "f"]
+    assert graph.callees(main) == ["g", "f"]
+
+    # g() stops calling f() and calls main() instead
+    g.body[0].value = FuncCall("main", [])
+    graph.update([g])
+    assert graph.callers("f") == [main]
+    assert graph.callers("main") == [g]
+
+    # renames are simultaneous: f -> g and g -> f swap
+    assert graph.rename({"f": "g", "g": "f", "main": "main"}) == 2
+    call = main.body[0].value
+    assert (call.left.name, call.right.name) == ("f", "g")
+    assert graph.callees(main) == ["f", "g"]
+    assert graph.callers("g") == [main]
+    assert index(graph, prog) == index(CallGraph(prog.functions), prog)
+
+
+def test_recover_rebuilds_stale_graph():
+    # passes run on their own do not maintain the graph on the Program
+    prog = inlined_program()
+    CallGraph.of(prog)
+    InlineReconstructor().reconstruct(prog)
+    SemanticNameRecoverer().recover(prog)
+    names = {f.name for f in prog.functions}
+    graph = CallGraph(prog.functions)
+    assert all(set(graph.callees(f)) <= names for f in prog.functions)
+    assert len(graph.sites("func1")) == 3
+    assert_current(prog)
+
+
+def bare_program(prog):
+    # a Program that never went through __init__: no call_graph slot set
+    bare = Program.__new__(Program)
+    bare.functions, bare.symbols = prog.functions, prog.symbols
+    return bare
+
+
+@pytest.mark.parametrize("mode", ["serial", "fused", "jobs"])
+def test_program_without_call_graph(mode):
+    expected = inlined_program()
+    default_pass_manager().run(expected, STAGES)
+    prog = bare_program(inlined_program())
+    pm = default_pass_manager(2 if mode == "jobs" else 1)
+    try:
+        pm.run(prog, STAGES, fuse=mode == "fused")
+    finally:
+        pm.close()
+    assert CodeGenerator().generate(prog) == CodeGenerator().generate(expected)
+    if mode != "jobs":
+        # the rename pass built the graph and left it on the Program; the
+        # workers rename call sites function by function instead
+        assert_current(prog)
+
+    prog = bare_program(inlined_program())
+    assert len(CallGraph.of(prog).sites("add")) == 2 and CallGraph.of(prog) is prog.call_graph
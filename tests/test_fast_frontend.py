@@ -0,0 +1,111 @@
+"""
+Differential tests: the hand-written frontend (fast_lexer + FastParser),
+the bulk lexer and the listener-driven builder must build the same AST
+as the ANTLR frontend with its visitor, and the bulk lexer the same
+tokens as ObfuMiniCLexer.
+"""
+import contextlib
+import glob
+import os
+
+import pytest
+from antlr4 import InputStream, Token
+
+from deobfuscator.fast_lexer import LexError, tokenize
+from deobfuscator.fast_parser import ParseError
+from deobfuscator.frontend import load_program, load_source
+from deobfuscator.parser.ObfuMiniCLexer import ObfuMiniCLexer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+EDGE_CASES = [
+    "",
+    "int g = 1, h, k = g + 2;",
+    "int main() { ; ; return; }",
+    "int f(int a, char b, bool c) { return -+-!a; }",
+    "int main() { int x; x = y = 3; for (;;) { } for (x = 0; x < 3; x = x + 1) x;"
+    " while (x) if (x) x; else { x; } }",
+    'int main() { printf("a\\"b %d\\n", 1, \'c\', true); scanf("%d %d", &x, y); return 0; }',
+    "int main() { switch (x) { case 1: case 'a': x; default: goto L; } L: return 1 - 2 - 3 * 4 / 5 % 6; }",
+    "/* a\n comment */ int main() { // line comment\n return a || b && c == d != e < f <= g > h >= i; }",
+    "int main() { return f(g(1), (2), h()); }",
+]
+
+# source, line of the first syntax error
+ERROR_CASES = [
+    ("int main( { }", 1),
+    ("int main() {\n return 1 @ 2; }", 2),
+    ("int main() {\n\n return 1 }", 3),
+    ("int main() { x = ; }", 1),
+    ("int main() {", 1),
+]
+
+
+def shape(node):
+    """Nested tuples of node types and field values, for comparing ASTs."""
+    if isinstance(node, list):
+        return [shape(item) for item in node]
+    fields = getattr(type(node), "_fields", None)
+    if fields is None:
+        return node
+    return (type(node).__name__,) + tuple((f, shape(getattr(node, f))) for f in fields)
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_corpus(path):
+    expected = shape(load_program(path, "antlr"))
+    assert shape(load_program(path, "fast")) == expected
+    assert shape(load_program(path, "antlr", lexer="bulk")) == expected
+
+
+@pytest.mark.parametrize("source", EDGE_CASES)
+def test_edge_cases(source):
+    expected = shape(load_source(source, "antlr"))
+    assert shape(load_source(source, "fast")) == expected
+    assert shape(load_source(source, "antlr", lexer="bulk")) == expected
+
+
+@pytest.mark.parametrize("mode", ["sll", "ll"])
+@pytest.mark.parametrize("source", [*CORPUS, *EDGE_CASES],
+                         ids=[*map(os.path.basename, CORPUS), *map(str, range(len(EDGE_CASES)))])
+def test_listener(source, mode):
+    if source in CORPUS:
+        with open(source) as f:
+            source = f.read()
+    expected = shape(load_source(source, "antlr", mode=mode))
+    assert shape(load_source(source, "antlr", mode=mode, builder="listener")) == expected
+
+
+def antlr_tokens(source):
+    lexer = ObfuMiniCLexer(InputStream(source))
+    tokens = []
+    while True:
+        t = lexer.nextToken()
+        tokens.append((t.type, t.start, t.stop, t.line, t.column, t.text))
+        if t.type == Token.EOF:
+            return tokens
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+@pytest.mark.parametrize("minify", [False, True], ids=["lines", "one-line"])
+def test_tokens(path, minify):
+    with open(path) as f:
+        source = f.read()
+    if minify:
+        source = " ".join(line.strip() for line in source.splitlines())
+    tokens = tokenize(source)
+    bulk = [(tokens.types[i], tokens.starts[i], tokens.stops[i], tokens.lines[i],
+             tokens.column(i), tokens.text(i)) for i in range(len(tokens))]
+    assert bulk == antlr_tokens(source)
+
+
+@pytest.mark.parametrize("source, line", ERROR_CASES)
+def test_errors(source, line, capsys):
+    with pytest.raises((LexError, ParseError), match=f"^line {line}:"):
+        load_source(source, "fast")
+    # ANTLR reports the error and recovers, possibly into a tree its
+    # builder cannot handle
+    with contextlib.suppress(AttributeError):
+        load_source(source, "antlr")
+    assert f"line {line}:" in capsys.readouterr().err
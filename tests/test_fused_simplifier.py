@@ -0,0 +1,106 @@
+"""
+FusedSimplifier re-implements DeadCodeRemover and ExpressionSimplifier
+in one walk; it has to give the same program and the same rule counts as
+running the two one after the other.
+"""
+import glob
+import os
+
+import pytest
+
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.frontend import load_program, load_source
+from deobfuscator.techniques import dead_code_remover
+from deobfuscator.techniques.control_flow_simplifier import ControlFlowSimplifier
+from deobfuscator.techniques.dead_code_remover import DeadCodeRemover
+from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier
+from deobfuscator.techniques.fused_simplifier import FusedSimplifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+# Hits every dead code and expression rule, some only on a second run
+RULES = """
+int f(int a, int b) {
+    int unused_1 = 5;
+    int c = a - (-b);
+    unused_1 = 3;
+    ;
+    7;
+    unused_1;
+    if (0) { c = 1; }
+    if (c) c = c + 0; else c = c - 0;
+    while (c) c = c * 1;
+    for (c = 0; c < 3; c = c + 1) c = c * 0;
+    c = !!c;
+    c = a + unused_1;
+    c = f(unused_1, b);
+    c = f(unused_2 = 1, (a - (-(b * 1))) + 0);
+    { int unused_3; { c = !(!(c - 0)); } }
+    return c;
+}
+int main() { return f(1, 2); }
+"""
+
+EXPR_RULES = {"a - (-b) -> a + b", "a + 0 -> a", "a - 0 -> a", "a * 1 -> a", "a * 0 -> 0",
+              "!!a -> a"}
+DEAD_RULES = {value for name, value in vars(dead_code_remover).items()
+              if name.isupper() and isinstance(value, str)}
+
+
+def shape(node):
+    if isinstance(node, list):
+        return [shape(item) for item in node]
+    fields = getattr(type(node), "_fields", None)
+    if fields is None:
+        return node
+    return (type(node).__name__,) + tuple((f, shape(getattr(node, f))) for f in fields)
+
+
+def sequential(prog):
+    dead = DeadCodeRemover()
+    dead.remove(prog)
+    expr = ExpressionSimplifier()
+    expr.simplify(prog)
+    return dead.rule_hits + expr.rule_hits, dead.rewrites + expr.rewrites, dead.changed | expr.changed
+
+
+def fused(prog):
+    fs = FusedSimplifier()
+    fs.simplify(prog)
+    return fs.rule_hits, fs.rewrites, fs.changed
+
+
+def runs(load, control):
+    """Both programs and their hits, rewrites and changed function names per round."""
+    results = []
+    for technique in (sequential, fused):
+        prog = load()
+        if control:
+            ControlFlowSimplifier().visit(prog)
+        rounds = []
+        for _ in range(2):
+            hits, rewrites, changed = technique(prog)
+            rounds.append((dict(hits), rewrites, sorted(f.name for f in changed)))
+        results.append((prog, rounds))
+    return results
+
+
+def assert_same(load, control):
+    (seq_prog, seq_rounds), (fused_prog, fused_rounds) = runs(load, control)
+    assert fused_rounds == seq_rounds
+    assert shape(fused_prog) == shape(seq_prog)
+    assert CodeGenerator().generate(fused_prog) == CodeGenerator().generate(seq_prog)
+    return seq_rounds
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+@pytest.mark.parametrize("control", [False, True], ids=["flat", "after-control"])
+def test_corpus(path, control):
+    assert_same(lambda: load_program(path, "fast"), control)
+
+
+def test_every_rule():
+    rounds = assert_same(lambda: load_source(RULES, "fast"), False)
+    hit = set(rounds[0][0]) | set(rounds[1][0])
+    assert hit == DEAD_RULES | EXPR_RULES
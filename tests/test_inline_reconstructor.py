@@ -0,0 +1,286 @@
+"""
+InlineReconstructor on parser output and on bare statements, the symbol
+table it keeps current across rewrites, and its structural index against
+trying every function in turn.
+"""
+import glob
+import os
+import random
+
+import pytest
+
+from deobfuscator.ast import *
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.frontend import load_program, load_source
+from deobfuscator.scopes import FunctionSymbols
+from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+# Inlined add() and sub() blocks; the one in between has its operands
+# swapped and matches nothing
+INLINED = """
+int add(int p, int q) { int r = (p + q); return r; }
+int sub(int p, int q) { int r = (p - q); return r; }
+int g(int k) {
+    int a_0 = k;
+    int b_1 = 3;
+    int result_2 = (a_0 + b_1);
+    k = result_2;
+    int a_3 = k;
+    int b_4 = 7;
+    int result_5 = (b_4 - a_3);
+    k = result_5;
+    int a_6 = k;
+    int b_7 = 7;
+    int result_8 = (a_6 - b_7);
+    k = result_8;
+    return k;
+}
+"""
+
+# Results declared without an initializer go to the first function with
+# as many parameters that declares a variable from them and returns it;
+# twice() returns its expression directly.  The last block's placeholder
+# is used after it, so it stays.
+UNINITIALIZED = """
+int twice(int p) { return p * 2; }
+int add(int p, int q) { int s = 1; int r = (q + p); return r; }
+int neg(int p) { int r = -p; return r; }
+int g(int k) {
+    int a_0 = k;
+    int b_1 = 3;
+    int result_2;
+    k = result_2;
+    int a_3 = k;
+    int result_4;
+    k = result_4;
+    int a_5 = k;
+    int result_6;
+    k = result_6;
+    k = a_5;
+    return k;
+}
+"""
+
+
+def bare_assignments(prog):
+    # the parser wraps `k = result;` in an ExpressionStmt
+    for func in prog.functions:
+        func.body = [s.expr if isinstance(s, ExpressionStmt) and isinstance(s.expr, Assignment)
+                     else s for s in func.body]
+    return prog
+
+
+def code_of(func):
+    return CodeGenerator().generate(Program([func])).split()
+
+
+def test_reconstruct():
+    prog = bare_assignments(load_source(INLINED, "fast"))
+    inl = InlineReconstructor()
+    inl.reconstruct(prog)
+    assert inl.rule_hits["inlined call reconstructed"] == 2
+    body = prog.functions[2].body
+    assert [type(s).__name__ for s in body] == ["Assignment"] + ["VariableDecl"] * 3 + [
+        "Assignment", "Assignment", "Return"]
+    assert (body[0].value.name, body[4].value.name, body[5].value.name) == ("add", "result_5", "sub")
+
+
+@pytest.mark.parametrize("frontend", ["fast", "antlr"])
+def test_parsed_input(frontend):
+    # the call is written back in an ExpressionStmt, as the parser gave it
+    prog = load_source(INLINED, frontend)
+    inl = InlineReconstructor()
+    inl.reconstruct(prog)
+    assert inl.rule_hits["inlined call reconstructed"] == 2
+    g = prog.functions[2]
+    assert [type(s).__name__ for s in g.body] == ["ExpressionStmt"] + ["VariableDecl"] * 3 + [
+        "ExpressionStmt", "ExpressionStmt", "Return"]
+    assert code_of(g) == """
+        int g(int k) {
+            k = add(k, 3);
+            int a_3 = k;
+            int b_4 = 7;
+            int result_5 = (b_4 - a_3);
+            k = result_5;
+            k = sub(k, 7);
+            return k;
+        }""".split()
+
+
+@pytest.mark.parametrize("bare", [False, True], ids=["parsed", "bare"])
+def test_uninitialized_result(bare):
+    prog = load_source(UNINITIALIZED, "fast")
+    if bare:
+        bare_assignments(prog)
+    inl = InlineReconstructor()
+    inl.reconstruct(prog)
+    assert inl.rule_hits["inlined call reconstructed"] == 2
+    assert code_of(prog.functions[3]) == """
+        int g(int k) {
+            k = add(k, 3);
+            k = neg(k);
+            int a_5 = k;
+            int result_6;
+            k = result_6;
+            k = a_5;
+            return k;
+        }""".split()
+
+
+def test_symbols_current_after_rewrite(monkeypatch):
+    # the sub() block is checked after the add() block is gone
+    declared = []
+    only_used_in = InlineReconstructor._only_used_in
+
+    def checked(self, *args):
+        result = only_used_in(self, *args)
+        declared.append({d.name for d in self._table.declarations})
+        return result
+
+    monkeypatch.setattr(InlineReconstructor, "_only_used_in", checked)
+    InlineReconstructor().reconstruct(load_source(INLINED, "fast"))
+    assert len(declared) == 2
+    assert {"a_0", "b_1", "result_2"} <= declared[0]
+    assert not {"a_0", "b_1", "result_2"} & declared[1]
+
+
+def site_key(site):
+    return (id(site[0]), site[1]) if type(site) is tuple else id(site)
+
+
+def table_state(table):
+    """
+    Everything a FunctionSymbols records but `calls`, with nodes by
+    identity; a moved site keeps its place, so sites are compared as sets.
+    """
+    scopes = {}
+    for symbol in table.symbols:
+        if symbol.scope is not None:
+            scopes[id(symbol.scope.node)] = [id(s.decl) for s in symbol.scope.symbols]
+    return ([(s.name, id(s.decl), s.decl is None or site_key(s.sites[0]),
+              sorted(map(site_key, s.sites), key=str),
+              symbol_scope(s)) for s in table.symbols],
+            [id(s.decl) for s in table.locals], scopes,
+            {id(decl): id(s.decl) for decl, s in table.declarations.items()})
+
+
+def symbol_scope(symbol):
+    return None if symbol.scope is None else id(symbol.scope.node)
+
+
+def test_bare_name_target():
+    # an Assignment target that was never wrapped in a Variable gets one
+    prog = bare_assignments(load_source(INLINED, "fast"))
+    g = prog.functions[2]
+    for s in g.body:
+        if isinstance(s, Assignment):
+            s.target = s.target.name
+    inl = InlineReconstructor()
+    inl.reconstruct(prog)
+    assert inl.rule_hits["inlined call reconstructed"] == 2
+    assert isinstance(g.body[0].target, Variable) and g.body[0].target.name == "k"
+    k = inl._table.params[0]
+    assert g.body[0].target in k.sites and g.body[5].target in k.sites
+    assert table_state(inl._table) == table_state(FunctionSymbols(g))
+
+
+def test_bare_name_argument():
+    # a placeholder initialized with a bare identifier string moves into
+    # the call's arguments, and so does its site
+    prog = load_source(INLINED, "fast")
+    g = prog.functions[2]
+    g.body[0].init_expr = "k"
+    inl = InlineReconstructor()
+    inl.reconstruct(prog)
+    call = g.body[0].expr.value
+    assert call.args[0] == "k"
+    assert (call.args, 0) in inl._table.params[0].sites
+    assert table_state(inl._table) == table_state(FunctionSymbols(g))
+
+
+def test_table_current_in_nested_blocks():
+    # a rewrite in a block drops the block scope's symbols, not just the
+    # declarations
+    source = INLINED.replace("int a_0", "{ int a_0").replace("k = result_2;", "k = result_2; }")
+    prog = load_source(source, "fast")
+    inl = InlineReconstructor()
+    inl.reconstruct(prog)
+    g = prog.functions[2]
+    assert inl.rule_hits["inlined call reconstructed"] == 2
+    assert table_state(inl._table) == table_state(FunctionSymbols(g))
+    assert [s.name for s in inl._table.locals] == ["a_3", "b_4", "result_5"]
+
+
+OPS = "+-*<"
+
+
+def random_program(rng):
+    """
+    Helpers of one to three parameters and a caller made of inlined blocks
+    of them: some exact, some with swapped operands or a placeholder used
+    afterwards, some with the result left uninitialized, some in blocks.
+    """
+    helpers = []
+    funcs = []
+    for i in range(rng.randint(1, 8)):
+        params = [f"p{j}" for j in range(rng.randint(1, 3))]
+        expr = f"({rng.choice(params)} {rng.choice(OPS)} {rng.choice(params + ['1', '2'])})"
+        if rng.random() < 0.3:
+            body = f"int s = 0; int r = {expr}; return r;"
+        else:
+            body = f"int r = {expr}; return r;"
+        helpers.append((params, expr))
+        funcs.append(f"int h{i}({', '.join('int ' + p for p in params)}) {{ {body} }}")
+    stmts = ["int k = 1;"]
+    for s in range(rng.randint(1, 30)):
+        params, expr = rng.choice(helpers)
+        names = {p: f"{p}_{s}" for p in params}
+        inits = " ".join(f"int {names[p]} = {rng.choice(['k', str(s), '(k + 1)'])};"
+                         for p in params)
+        result = expr
+        for p, n in names.items():
+            result = result.replace(p, n)
+        if rng.random() < 0.2 and len(params) > 1:
+            first, second = names[params[0]], names[params[1]]
+            result = result.replace(first, "@").replace(second, first).replace("@", second)
+        decl = f"int r_{s};" if rng.random() < 0.2 else f"int r_{s} = {result};"
+        block = f"{inits} {decl} k = r_{s};"
+        if rng.random() < 0.1:
+            block += f" k = k + {names[params[0]]};"
+        stmts.append(f"{{ {block} }}" if rng.random() < 0.2 else block)
+    funcs.append("int main() { " + " ".join(stmts) + " return k; }")
+    return "\n".join(funcs)
+
+
+def reconstructed(source, indexed):
+    prog = load_source(source, "fast")
+    inl = InlineReconstructor(indexed)
+    inl.reconstruct(prog)
+    main = prog.functions[-1]
+    if inl._table is not None:
+        assert table_state(inl._table) == table_state(FunctionSymbols(main))
+    return CodeGenerator().generate(prog), inl.rule_hits
+
+
+def test_indexed_matches_scan_on_random_programs():
+    rng = random.Random(25)
+    hits = 0
+    for _ in range(300):
+        source = random_program(rng)
+        indexed = reconstructed(source, True)
+        assert indexed == reconstructed(source, False), source
+        hits += indexed[1]["inlined call reconstructed"]
+    assert hits > 1000
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_indexed_matches_scan_on_corpus(path):
+    out = []
+    for indexed in (True, False):
+        prog = load_program(path, "fast")
+        InlineReconstructor(indexed).reconstruct(prog)
+        out.append(CodeGenerator().generate(prog))
+    assert out[0] == out[1]
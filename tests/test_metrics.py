@@ -0,0 +1,98 @@
+"""
+Metrics' table, JSON and Prometheus renderings, and the to_dict() /
+from_dict() round trip client.py and cli.py batch rely on.
+"""
+import json
+
+import pytest
+
+from deobfuscator.api import run_source
+from deobfuscator.metrics import METRICS_FORMATS, Metrics
+
+SOURCE = "int main() { int a = 1 + 0; int b = a * 1; if (0) { a = 2; } return a + b; }"
+
+
+def sample():
+    metrics = Metrics()
+    metrics.add("dead", visited=12, rewritten=1, hits={"if (0)": 1})
+    metrics.add_run("dead", 0.002)
+    metrics.add("expr", visited=30, rewritten=3, hits={"x + 0": 2, 'quote " and \\': 1})
+    metrics.add_run("expr", 0.0)
+    metrics.add_run("expr", 0.001)
+    return metrics
+
+
+def test_round_trip():
+    metrics = sample()
+    data = metrics.to_dict()
+    again = Metrics.from_dict(json.loads(json.dumps(data)))
+    assert again.to_dict() == data
+    for fmt in METRICS_FORMATS:
+        assert again.render(fmt) == metrics.render(fmt)
+
+
+def test_round_trip_of_a_run():
+    metrics = run_source(SOURCE, ["dead", "expr"], "fast").metrics
+    again = Metrics.from_dict(json.loads(json.dumps(metrics.to_dict())))
+    assert again.render("table") == metrics.render("table")
+    assert again["expr"].rule_hits == metrics["expr"].rule_hits
+
+
+def test_table():
+    lines = sample().render("table").splitlines()
+    assert lines[0].split() == ["pass", "runs", "visited", "rewritten", "time", "(s)",
+                                "rewritten/ms"]
+    assert set(lines[1]) == {"-", " "}
+    assert lines[2].split() == ["dead", "1", "12", "1", "0.0020", "0.5"]
+    assert lines[3].split() == ["expr", "2", "30", "3", "0.0010", "3.0"]
+    # columns line up: every row ends where the header does
+    assert len({len(line) for line in lines[:4]}) == 1
+    assert lines[4:] == ["  dead: if (0): 1", "  expr: x + 0: 2", '  expr: quote " and \\: 1']
+
+
+def test_table_without_time():
+    metrics = Metrics()
+    metrics.add("rename", visited=4)
+    assert metrics.render("table").splitlines()[2].split() == [
+        "rename", "0", "4", "0", "0.0000", "-"]
+
+
+def test_json():
+    text = sample().render("json")
+    assert text.endswith("\n")
+    assert json.loads(text) == {
+        "dead": {"runs": 1, "visited": 12, "rewritten": 1, "seconds": 0.002,
+                 "rules": {"if (0)": 1}},
+        "expr": {"runs": 2, "visited": 30, "rewritten": 3, "seconds": 0.001,
+                 "rules": {"x + 0": 2, 'quote " and \\': 1}},
+    }
+
+
+def test_prometheus():
+    lines = sample().render("prometheus").splitlines()
+    samples = [line for line in lines if not line.startswith("#")]
+    assert samples == [
+        'deobfuscator_pass_runs_total{pass="dead"} 1',
+        'deobfuscator_pass_runs_total{pass="expr"} 2',
+        'deobfuscator_pass_nodes_visited_total{pass="dead"} 12',
+        'deobfuscator_pass_nodes_visited_total{pass="expr"} 30',
+        'deobfuscator_pass_nodes_rewritten_total{pass="dead"} 1',
+        'deobfuscator_pass_nodes_rewritten_total{pass="expr"} 3',
+        'deobfuscator_pass_seconds_total{pass="dead"} 0.002',
+        'deobfuscator_pass_seconds_total{pass="expr"} 0.001',
+        'deobfuscator_rule_hits_total{pass="dead",rule="if (0)"} 1',
+        'deobfuscator_rule_hits_total{pass="expr",rule="x + 0"} 2',
+        'deobfuscator_rule_hits_total{pass="expr",rule="quote \\" and \\\\"} 1',
+    ]
+    # every family is declared once, as a counter, before its samples
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert len(families) == len(set(families)) == 5
+    for family in families:
+        assert f"# TYPE {family} counter" in lines
+        assert lines.index(f"# TYPE {family} counter") < min(
+            i for i, line in enumerate(lines) if line.startswith(family + "{"))
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError, match="Unknown metrics format: xml"):
+        sample().render("xml")
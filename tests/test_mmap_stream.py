@@ -0,0 +1,80 @@
+"""
+MmapInputStream has to give ObfuMiniCLexer and the AST builders exactly
+what antlr4.FileStream gives them.
+"""
+import glob
+import os
+
+import pytest
+from antlr4 import FileStream, Token
+
+from deobfuscator.frontend import build_program
+from deobfuscator.mmap_stream import MmapInputStream, map_file
+from deobfuscator.parser.ObfuMiniCLexer import ObfuMiniCLexer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+NON_ASCII = "int main() { /* déjà vu */ return 1; }\n"
+
+
+def shape(node):
+    if isinstance(node, list):
+        return [shape(item) for item in node]
+    fields = getattr(type(node), "_fields", None)
+    if fields is None:
+        return node
+    return (type(node).__name__,) + tuple((f, shape(getattr(node, f))) for f in fields)
+
+
+def tokens(stream):
+    lexer = ObfuMiniCLexer(stream)
+    found = []
+    while True:
+        t = lexer.nextToken()
+        found.append((t.type, t.start, t.stop, t.line, t.column, t.text))
+        if t.type == Token.EOF:
+            return found
+
+
+def assert_same_as_filestream(path, encoding="ascii"):
+    expected = tokens(FileStream(path, encoding))
+    assert tokens(MmapInputStream(path, encoding)) == expected
+    with map_file(path) as buf:
+        assert tokens(MmapInputStream.from_bytes(buf, path, encoding)) == expected
+    assert str(MmapInputStream(path, encoding)) == str(FileStream(path, encoding))
+    ast = shape(build_program(FileStream(path, encoding)))
+    assert shape(build_program(MmapInputStream(path, encoding))) == ast
+    return expected
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_corpus(path):
+    assert_same_as_filestream(path)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.mc"
+    path.write_bytes(b"")
+    with map_file(str(path)) as buf:
+        assert buf == b""
+    assert [t[0] for t in assert_same_as_filestream(str(path))] == [Token.EOF]
+
+
+def test_non_ascii(tmp_path):
+    path = tmp_path / "utf8.mc"
+    path.write_text(NON_ASCII, encoding="utf-8")
+    assert_same_as_filestream(str(path), "utf-8")
+    # Mini-C is ASCII: by default both refuse the file
+    with pytest.raises(UnicodeDecodeError):
+        FileStream(str(path), "ascii")
+    with pytest.raises(UnicodeDecodeError):
+        MmapInputStream(str(path))
+
+
+def test_get_text_bounds(tmp_path):
+    path = tmp_path / "a.mc"
+    path.write_text("int x;")
+    stream, expected = MmapInputStream(str(path)), FileStream(str(path))
+    for start, stop in ((0, 2), (4, 100), (6, 9), (3, 2)):
+        assert stream.getText(start, stop) == expected.getText(start, stop)
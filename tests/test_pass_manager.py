@@ -0,0 +1,208 @@
+"""
+PassManager scheduling, skipping of passes whose results are still
+valid and the fixed-point driver, on stub passes; the default passes on
+the corpus.
+"""
+import glob
+import itertools
+import os
+
+import pytest
+
+from deobfuscator.ast import Program
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.frontend import load_program, load_source
+from deobfuscator.pass_manager import PASS_NAMES, Pass, PassManager, default_pass_manager
+from deobfuscator.scopes import FunctionSymbols
+from deobfuscator.techniques.control_flow_simplifier import ControlFlowSimplifier
+from deobfuscator.techniques.dead_code_remover import DeadCodeRemover
+from deobfuscator.techniques.expression_simplifier import ExpressionSimplifier
+from deobfuscator.techniques.inline_reconstructor import InlineReconstructor
+from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+
+class Stubs:
+    """PassManager over passes that log their runs and report `changes[name]`."""
+
+    def __init__(self, *passes):
+        self.log = []
+        self.changes = {}
+        self.pm = PassManager()
+        for name, kwargs in passes:
+            self.pm.register(Pass(name, self._runner(name), **kwargs))
+
+    def _runner(self, name):
+        def run(prog, functions=None, metrics=None):
+            self.log.append(name)
+            return self.changes.get(name, False)
+        return run
+
+    def run(self, names, **kwargs):
+        self.log = []
+        self.pm.run(Program([]), names, **kwargs)
+        return self.log
+
+
+# Folding `a * 0` and `r - (-0)` exposes dead code and another rule that
+# a single run leaves behind
+UNSETTLED = """
+int f(int a) { int r = a; if (a * 0) { r = 2; } return r - (-0); }
+int main() { return f(3); }
+"""
+
+
+def names(passes):
+    return [p.name for p in passes]
+
+
+@pytest.mark.parametrize("n", range(1, len(PASS_NAMES) + 1))
+def test_default_order(n):
+    # whatever is asked for, in whatever order, runs in PASS_NAMES order
+    pm = default_pass_manager()
+    for subset in itertools.permutations(PASS_NAMES, n):
+        assert names(pm.schedule(subset)) == [p for p in PASS_NAMES if p in subset]
+    assert names(pm.schedule(reversed(PASS_NAMES), fuse=True)) == [
+        "dead+expr", "control", "inline", "rename"]
+    assert names(pm.schedule(["expr", "control"], fuse=True)) == ["expr", "control"]
+
+
+def test_schedule():
+    stubs = Stubs(("c", dict(requires=("b",))), ("b", dict(requires=("a",))), ("a", {}),
+                  ("d", {}))
+    schedule = stubs.pm.schedule
+    assert names(schedule(["d", "c", "a", "b"])) == ["a", "b", "c", "d"]
+    # prerequisites order the passes asked for but are not pulled in
+    assert names(schedule(["c", "d"])) == ["c", "d"]
+    # c only requires b: without it, registration order decides
+    assert names(schedule(["c", "a", "a"])) == ["c", "a"]
+    assert names(schedule(["c", "b", "a"])) == ["a", "b", "c"]
+    with pytest.raises(KeyError, match="unknown pass 'e'"):
+        schedule(["a", "e"])
+
+    cyclic = Stubs(("a", dict(requires=("b",))), ("b", dict(requires=("a",))))
+    with pytest.raises(ValueError, match="cyclic"):
+        cyclic.pm.schedule(["a", "b"])
+    assert names(cyclic.pm.schedule(["b"])) == ["b"]
+
+
+def test_skip_valid_passes():
+    stubs = Stubs(("a", dict(invalidates=("b",))), ("b", {}), ("c", dict(invalidates=("a",))))
+    assert stubs.run(["a", "b"]) == ["a", "b"]
+    # nothing changed since: both are still valid
+    assert stubs.run(["a", "b"]) == []
+    assert stubs.pm.skipped == ["a", "b"]
+    # c finds nothing to change, so a stays valid
+    assert stubs.run(["a", "c"]) == ["c"]
+    stubs.changes["c"] = None
+    assert stubs.run(["c"]) == []
+    stubs.pm.invalidate(["c"])
+    assert stubs.run(["a", "b", "c"]) == ["c"]
+    # c changed the program, which a has to see; b does not depend on c
+    assert stubs.run(["a", "b", "c"]) == ["a"]
+    # ...and a only invalidates b when it changes something itself
+    stubs.changes["a"] = {"f"}
+    stubs.pm.invalidate(["a"])
+    assert stubs.run(["a", "b"]) == ["a", "b"]
+    stubs.pm.invalidate()
+    assert stubs.run(["a", "b", "c"]) == ["a", "b", "c"]
+
+
+def test_fused_pass_validates_its_parts():
+    stubs = Stubs(("a", dict(invalidates=("b",))), ("b", {}), ("ab", dict(fuses=("a", "b"))))
+    assert stubs.run(["b", "a"], fuse=True) == ["ab"]
+    assert stubs.run(["a"]) == [] and stubs.run(["b"]) == []
+    stubs.pm.invalidate(["b"])
+    # one of the two still has to run: the fused pass stands in for it
+    assert stubs.run(["a", "b"], fuse=True) == ["ab"]
+
+
+def sequential(prog):
+    """The techniques one after another in PASS_NAMES order, as main.py used to run them."""
+    DeadCodeRemover().remove(prog)
+    ExpressionSimplifier().simplify(prog)
+    ControlFlowSimplifier().visit(prog)
+    InlineReconstructor().reconstruct(prog)
+    SemanticNameRecoverer().recover(prog)
+    return CodeGenerator().generate(prog)
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_corpus_output(path):
+    prog = load_program(path, "fast")
+    pm = default_pass_manager()
+    pm.run(prog, ["rename", "inline", "control", "expr", "dead"])
+    assert names(pm.schedule(PASS_NAMES)) == list(PASS_NAMES)
+    assert CodeGenerator().generate(prog) == sequential(load_program(path, "fast"))
+    assert sorted(pm.runs) == sorted(PASS_NAMES) and set(pm.runs.values()) == {1}
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_rename_sees_final_body(path):
+    # Renaming last numbers the locals that survive flattening and
+    # inlining: with rename before control, as cli.py used to run it,
+    # the dispatcher variables took the first names
+    prog = load_program(path, "fast")
+    default_pass_manager().run(prog, PASS_NAMES)
+    friendly = SemanticNameRecoverer().friendly_locals
+    for func in prog.functions:
+        table = FunctionSymbols(func)
+        found = [s.name for s in table.locals + table.orphans if not s.name.startswith("_unused")]
+        expected = friendly + [f"v{i}" for i in range(len(found))]
+        assert found == expected[:len(found)], func.name
+
+
+@pytest.mark.parametrize("fuse", [False, True], ids=["separate", "fused"])
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_fixpoint_corpus(path, fuse):
+    # the corpus settles in one run: iterating must not change the output
+    expected = load_program(path, "fast")
+    default_pass_manager().run(expected, PASS_NAMES)
+    prog = load_program(path, "fast")
+    pm = default_pass_manager()
+    pm.run_fixpoint(prog, PASS_NAMES, fuse=fuse)
+    assert CodeGenerator().generate(prog) == CodeGenerator().generate(expected)
+    assert pm.capped == []
+
+
+def test_fixpoint_settles():
+    prog = load_source(UNSETTLED, "fast")
+    pm = default_pass_manager()
+    pm.run_fixpoint(prog, PASS_NAMES)
+    assert CodeGenerator().generate(prog).split() == (
+        "int func1(int a) { int x = a; return x; } int main() { return func1(3); }").split()
+    assert pm.runs == {"dead": 3, "expr": 3, "control": 1, "inline": 1, "rename": 1}
+    # a single run leaves work behind
+    once = load_source(UNSETTLED, "fast")
+    default_pass_manager().run(once, PASS_NAMES)
+    assert "if (0)" in CodeGenerator().generate(once)
+
+
+def test_fixpoint_dirty_functions():
+    # re-runs only get the functions the invalidating pass changed
+    stubs = Stubs(("a", dict(invalidates=("b",))), ("b", dict(invalidates=("a",))))
+    seen = []
+    prog = load_source("int f() { return 1; } int g() { return 2; } int h() { return 3; }", "fast")
+    f, g, _ = prog.functions
+    changes = {"a": [{f, g}, {g}], "b": [{g}, False]}
+
+    def runner(name):
+        def run(prog, functions=None, metrics=None):
+            seen.append((name, None if functions is None else sorted(x.name for x in functions)))
+            return changes[name].pop(0)
+        return run
+
+    for p in stubs.pm.passes.values():
+        p.run = runner(p.name)
+    stubs.pm.run_fixpoint(prog, ["a", "b"])
+    assert seen == [("a", None), ("b", None), ("a", ["g"]), ("b", ["g"])]
+    assert stubs.pm.runs == {"a": 2, "b": 2}
+
+
+def test_fixpoint_cap():
+    stubs = Stubs(("a", dict(invalidates=("a",))))
+    stubs.changes["a"] = None
+    stubs.pm.run_fixpoint(Program([]), ["a"], max_iterations=4)
+    assert stubs.pm.runs["a"] == 4 and stubs.pm.capped == ["a"]
@@ -0,0 +1,207 @@
+"""
+FunctionSymbols' scope resolution and the composed renaming built on it,
+against the pairwise renaming on the corpus and on random programs whose
+names do not collide across scopes.
+"""
+import glob
+import os
+import random
+
+import pytest
+
+from deobfuscator.ast import ExpressionStmt, Scan, Switch, Variable
+from deobfuscator.code_generator import CodeGenerator
+from deobfuscator.frontend import load_source
+from deobfuscator.scopes import FunctionSymbols
+from deobfuscator.techniques.name_recoverer import SemanticNameRecoverer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+SIBLINGS = """
+int f(int q) {
+    int k = q;
+    { int k = 1; k = k + q; printf("%d", k); }
+    { int k = 2; printf("%d", k); }
+    return k;
+}
+"""
+BEFORE_DECL = "int f() { k = 1; int k = 2; return k; }"
+SCAN = 'int main() { int k; int j; scanf("%d %d", &k, &j); return k + j; }'
+SWITCH = """
+int main() {
+    int k = 0;
+    int j = 1;
+    switch (k) { case 1: j = 2; break; default: j = k + 3; }
+    return j;
+}
+"""
+
+
+def table(source):
+    prog = load_source(source, "fast")
+    return prog, FunctionSymbols(prog.functions[0])
+
+
+def recovered(source):
+    prog = load_source(source, "fast")
+    SemanticNameRecoverer().recover(prog)
+    return prog.functions[0]
+
+
+def test_sibling_blocks():
+    prog, symbols = table(SIBLINGS)
+    outer, first, second = symbols.locals
+    assert [s.name for s in symbols.locals] == ["k", "k", "k"]
+    assert outer.scope is symbols.scope
+    assert first.scope is not second.scope
+    assert first.scope.parent is second.scope.parent is symbols.scope
+    # decl, the target, its use in `k + q` and the printf argument
+    assert len(first.sites) == 4 and len(first.uses) == 3
+    assert len(second.uses) == 1
+    # the return sees the outer k again
+    assert outer.uses == [prog.functions[0].body[-1].value]
+    assert symbols.params[0].uses and symbols.orphans == []
+    assert symbols.scope.lookup("k") is outer and symbols.scope.lookup("q") is symbols.params[0]
+
+
+def test_use_before_declaration():
+    prog, symbols = table(BEFORE_DECL)
+    assign, decl, ret = prog.functions[0].body
+    (orphan,) = symbols.orphans
+    (local,) = symbols.locals
+    assert orphan.decl is None and orphan.scope is None
+    assert orphan.sites == [assign.expr.target]
+    assert local.decl is decl and local.uses == [ret.value]
+    assert symbols.declarations == {decl: local}
+
+
+def test_scan_and_switch_sites():
+    prog, symbols = table(SCAN)
+    scan = prog.functions[0].body[2]
+    k, j = symbols.locals
+    assert (scan.args, 0) in k.sites and (scan.args, 1) in j.sites
+    assert symbols.rename(k, "first") == 3
+    assert scan.args == ["first", "j"]
+
+    prog, symbols = table(SWITCH)
+    k, j = symbols.locals
+    switch = prog.functions[0].body[2]
+    assert isinstance(switch, Switch) and switch.default is not None
+    # k: decl, the switch expression, the default's `k + 3`
+    assert len(k.sites) == 3
+    symbols.rename(k, "first")
+    assert "first" in [node.name for node in walk(switch.default)]
+
+
+def walk(node):
+    """Every Variable under `node`."""
+    if isinstance(node, Variable):
+        yield node
+    if isinstance(node, list):
+        for item in node:
+            yield from walk(item)
+    for field in getattr(type(node), "_fields", ()):
+        yield from walk(getattr(node, field))
+
+
+def test_recover_scan_args():
+    func = recovered(SCAN)
+    scan = next(s for s in func.body if isinstance(s, Scan))
+    assert [s.name for s in func.body[:2]] == ["x", "y"]
+    assert scan.args == ["x", "y"]
+
+
+def test_recover_switch_default():
+    func = recovered(SWITCH)
+    switch = next(s for s in func.body if isinstance(s, Switch))
+    assert sorted({v.name for v in walk(switch.default)}) == ["x", "y"]
+    assert not {v.name for v in walk(func.body)} & {"k", "j"}
+
+
+def test_recover_sibling_blocks():
+    func = recovered(SIBLINGS)
+    assert func.params[0].name == "a"
+    outer, first, second = [func.body[0], func.body[1].items[0], func.body[2].items[0]]
+    assert [outer.name, first.name, second.name] == ["x", "y", "m"]
+    assert {v.name for v in walk(func.body[1])} == {"y", "a"}
+    assert {v.name for v in walk(func.body[2])} == {"m"}
+    assert func.body[-1].value.name == "x"
+
+
+def test_recover_use_before_declaration():
+    # declared locals are numbered before orphans
+    assign, decl, ret = recovered(BEFORE_DECL).body
+    assert isinstance(assign, ExpressionStmt)
+    assert (assign.expr.target.name, decl.name, ret.value.name) == ("y", "x", "x")
+
+
+def generate(source, composed):
+    prog = load_source(source, "fast")
+    SemanticNameRecoverer(composed).recover(prog)
+    return CodeGenerator().generate(prog)
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_composed_matches_pairwise_on_corpus(path):
+    with open(path) as f:
+        source = f.read()
+    assert generate(source, True) == generate(source, False)
+
+
+def random_program(rng):
+    """Functions whose every variable has its own name and is declared before use."""
+    counter = iter(range(10 ** 6))
+    functions = []
+
+    def name(prefix="w"):
+        return f"{prefix}{rng.choice('dfghjkl')}{next(counter)}"
+
+    def expr(visible, depth=0):
+        if depth > 2 or rng.random() < 0.4:
+            return rng.choice(visible) if visible and rng.random() < 0.7 else str(rng.randint(0, 9))
+        if functions and rng.random() < 0.15:
+            callee, arity = rng.choice(functions)
+            return f"{callee}({', '.join(expr(visible, depth + 1) for _ in range(arity))})"
+        op = rng.choice(["+", "-", "*", "<", "=="])
+        return f"({expr(visible, depth + 1)} {op} {expr(visible, depth + 1)})"
+
+    def block(visible, depth):
+        visible = list(visible)
+        lines = []
+        for _ in range(rng.randint(1, 5)):
+            kind = rng.random()
+            if kind < 0.35 or not visible:
+                var = name("unused_" if rng.random() < 0.1 else "w")
+                init = f" = {expr(visible)}" if rng.random() < 0.8 else ""
+                lines.append(f"int {var}{init};")
+                visible.append(var)
+            elif kind < 0.6:
+                lines.append(f"{rng.choice(visible)} = {expr(visible)};")
+            elif kind < 0.7:
+                lines.append(f'printf("%d", {expr(visible)});')
+            elif depth < 3 and kind < 0.8:
+                other = f" else {block(visible, depth + 1)}" if rng.random() < 0.5 else ""
+                lines.append(f"if ({expr(visible)}) {block(visible, depth + 1)}{other}")
+            elif depth < 3 and kind < 0.9:
+                lines.append(f"while ({expr(visible)}) {block(visible, depth + 1)}")
+            elif depth < 3:
+                lines.append(block(visible, depth + 1))
+        return "{ " + " ".join(lines) + " }"
+
+    for _ in range(rng.randint(1, 4)):
+        params = [name() for _ in range(rng.randint(0, 4))]
+        body = block(params, 0)
+        fname = name("fn")
+        functions.append((fname, len(params)))
+        args = ", ".join(f"int {p}" for p in params)
+        # the return goes inside the body's closing brace
+        yield f"int {fname}({args}) {body[:-1]} return {expr(params)}; }}"
+    yield f"int main() {{ return {functions[0][0]}({', '.join('1' for _ in range(functions[0][1]))}); }}"
+
+
+def test_composed_matches_pairwise_on_random_programs():
+    rng = random.Random(2024)
+    for _ in range(400):
+        source = "\n".join(random_program(rng))
+        assert generate(source, True) == generate(source, False), source
@@ -0,0 +1,73 @@
+import glob
+import os
+
+import pytest
+
+from deobfuscator import serialization
+from deobfuscator.ast import *
+from deobfuscator.frontend import load_program
+from deobfuscator.pass_manager import default_pass_manager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, "input", "*.mc")))
+
+
+def shape(node):
+    if isinstance(node, list):
+        return [shape(item) for item in node]
+    fields = getattr(type(node), "_fields", None)
+    if fields is None:
+        return node
+    return (type(node).__name__,) + tuple((f, shape(getattr(node, f))) for f in fields)
+
+
+def chain(depth):
+    """Program whose f() returns ((x + 0) + 1) + ... nested `depth` deep."""
+    expr = Variable("x")
+    for i in range(depth):
+        expr = BinaryOp("+", expr, Literal(i))
+    return Program([Function("int", "f", [Parameter("int", "x")], [Return(expr)]),
+                    Function("int", "main", [], [Return(FuncCall("f", [Literal(-7)]))])])
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_roundtrip(path):
+    prog = load_program(path, "fast")
+    data = serialization.dumps(prog)
+    decoded = serialization.loads(data)
+    assert shape(decoded) == shape(prog)
+    assert serialization.dumps(decoded) == data
+
+
+def test_values():
+    value = [None, True, False, 0, -1, 2 ** 40, -(2 ** 40), "x", [], [[Literal("s")]]]
+    assert shape(serialization.loads(serialization.dumps(value))) == shape(value)
+
+
+def test_deep_expression():
+    prog = chain(100_000)
+    decoded = serialization.loads(serialization.dumps(prog))
+    expr, depth = decoded.functions[0].body[0].value, 0
+    while isinstance(expr, BinaryOp):
+        assert expr.right.value == 99_999 - depth
+        expr, depth = expr.left, depth + 1
+    assert depth == 100_000 and expr.name == "x"
+
+
+def test_deep_expression_in_workers():
+    # chunks of functions go to the workers and back serialized
+    results = []
+    for jobs in (1, 2):
+        prog = chain(3000)
+        pm = default_pass_manager(jobs)
+        try:
+            pm.run(prog, ["dead"])
+        finally:
+            pm.close()
+        results.append(serialization.dumps(prog))
+    assert results[0] == results[1]
+
+
+def test_unsupported_value():
+    with pytest.raises(TypeError, match="cannot serialize object"):
+        serialization.dumps([Literal(1), object()])
@@ -0,0 +1,98 @@
+"""
+DeobfuscationServer's endpoints and status codes, deobfuscator.client
+against it, and client.py running in-process when nothing listens.
+"""
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+import cli
+import client as client_main
+from deobfuscator import client
+from deobfuscator.api import run_source
+from deobfuscator.server import DeobfuscationServer
+
+SOURCE = "int main() { int a = 1 + 0; if (0) { a = 2; } return a; }"
+
+
+@pytest.fixture(scope="module")
+def port():
+    server = DeobfuscationServer(("127.0.0.1", 0), cli._serve_one)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def call(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request(method, path, body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_health(port):
+    assert call(port, "GET", "/health") == (200, {"ok": True})
+
+
+@pytest.mark.parametrize("method,path", [("GET", "/"), ("GET", "/deobfuscate"),
+                                         ("POST", "/health")])
+def test_unknown_endpoint(port, method, path):
+    status, body = call(port, method, path, json.dumps({"source": SOURCE}))
+    assert status == 404 and path in body["error"]
+
+
+@pytest.mark.parametrize("body", ["{not json", "[1, 2]", '{"args": ["--all"]}',
+                                  '{"source": 3}', ""])
+def test_bad_request(port, body):
+    status, reply = call(port, "POST", "/deobfuscate", body)
+    assert status == 400 and reply["error"].startswith("bad request: ")
+
+
+@pytest.mark.parametrize("request_body,error", [
+    ({"source": SOURCE, "args": ["--no-such-flag"]}, "ValueError: unsupported arguments"),
+    ({"source": SOURCE, "stages": ["nope"]}, "KeyError"),
+    ({"source": "int main( {", "options": {"frontend": "fast"}}, "ParseError: line 1"),
+])
+def test_pipeline_error(port, request_body, error):
+    status, reply = call(port, "POST", "/deobfuscate", json.dumps(request_body))
+    assert status == 422 and reply["error"].startswith(error)
+
+
+def test_deobfuscate(port):
+    expected = run_source(SOURCE, ["dead", "expr"]).code
+    result = client.request(SOURCE, ["dead", "expr"], {"frontend": "fast"}, port=port)
+    assert result["code"] == expected
+    assert set(result["metrics"]) == {"dead", "expr"}
+    assert client.request(SOURCE, args=["--dead", "--expr"], port=port)["code"] == expected
+    with pytest.raises(client.ServerError, match="unsupported arguments"):
+        client.request(SOURCE, args=["--no-such-flag"], port=port)
+
+
+def test_client_falls_back_in_process(tmp_path, capsys):
+    port = free_port()
+    assert client.request(SOURCE, args=["--all"], port=port) is None
+    source, output = tmp_path / "in.mc", tmp_path / "out" / "clean.mc"
+    source.write_text(SOURCE)
+    client_main.main([str(source), "-o", str(output), "--server", f"127.0.0.1:{port}",
+                      "--dead", "--expr", "--metrics", "json"])
+    out = capsys.readouterr().out
+    assert f"No server at 127.0.0.1:{port}, running in-process" in out
+    assert output.read_text() == run_source(SOURCE, ["dead", "expr"]).code
+    assert '"dead"' in out